@@ -8,10 +8,12 @@ from werkzeug.exceptions import BadRequest, HTTPException
 
 load_dotenv()
 
+from commands import register_commands
 from config import config
 from models import db, init_app
 from models.auto import Auto  # noqa
 from models.blokace import Blokace  # noqa
+from models.bod_trasy import BodTrasy  # noqa
 from models.chat import Chat  # noqa
 from models.hodnoceni import Hodnoceni  # noqa
 from models.jizda import Jizda  # noqa
@@ -20,9 +22,17 @@ from models.oznameni import Oznameni  # noqa
 from models.pasazeri import pasazeri  # noqa
 from models.profil import Profil  # noqa
 from models.rezervace import Rezervace  # noqa
+from models.sablona_jizdy import SablonaJizdy  # noqa
+from models.slovo_bodu_trasy import SlovoBoduTrasy  # noqa
 from models.ucastnici_chatu import ucastnici_chatu  # noqa
+from models.ulozene_hledani import UlozeneHledani  # noqa
 from models.uzivatel import Uzivatel  # noqa
+from models.zmena_jizdy import ZmenaJizdy  # noqa
 from models.zprava import Zprava  # noqa
+from utils.cities import init_city_dataset
+from utils.ride_lifecycle import init_ride_lifecycle_sweeper
+from utils.ride_search_engine import init_ride_search_engine
+from utils.waitlist import init_waitlist_promoter
 
 try:
     from routes.auth import auth_bp
@@ -48,6 +58,7 @@ def create_app(config_name="development", test_config=None):
 
     CORS(app)
     init_app(app)
+    register_commands(app)
 
     try:
         app.register_blueprint(auth_bp, url_prefix="/api/auth")
@@ -93,6 +104,11 @@ def create_app(config_name="development", test_config=None):
         except Exception:
             app.logger.exception("Error creating tables")
 
+    init_city_dataset(app)
+    init_ride_search_engine(app)
+    init_ride_lifecycle_sweeper(app)
+    init_waitlist_promoter(app)
+
     return app
 
 
@@ -0,0 +1,137 @@
+"""Porovnání velikosti odpovědi a času serializace výpisu jízd ve view=full a view=summary.
+
+Spuštění ze složky backend:
+
+    python -m benchmarks.bench_ride_list_view
+"""
+import json
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from sqlalchemy.pool import StaticPool
+
+from app import create_app
+from models import db
+from models.auto import Auto
+from models.hodnoceni import Hodnoceni
+from models.jizda import Jizda
+from models.mezistanice import Mezistanice
+from models.pasazeri import pasazeri
+from models.profil import Profil
+from models.uzivatel import Uzivatel
+from utils.datetime_utils import utc_now
+from utils.jizdy import VIEW_FULL, VIEW_SUMMARY, serializovat_jizdy, with_ride_list_view_loading
+
+
+RIDICU = 50
+JIZD = 500
+PASAZERU_NA_JIZDU = 3
+ROUNDS = 20
+
+
+def create_bench_app():
+    return create_app(
+        test_config={
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": "sqlite://",
+            "SQLALCHEMY_ENGINE_OPTIONS": {
+                "connect_args": {"check_same_thread": False},
+                "poolclass": StaticPool,
+            },
+            "JWT_SECRET_KEY": "bench-jwt-secret",
+        }
+    )
+
+
+def seed(rng):
+    uzivatele = []
+    for index in range(RIDICU * 2):
+        uzivatel = Uzivatel(email=f"bench{index}@example.com", heslo="tajneheslo")
+        uzivatel.profil = Profil(uzivatel_id=None, jmeno=f"Uzivatel {index}", bio="Jezdim pravidelne.")
+        uzivatele.append(uzivatel)
+    db.session.add_all(uzivatele)
+    db.session.flush()
+
+    ridici = uzivatele[:RIDICU]
+    pasazeri_pool = uzivatele[RIDICU:]
+    auta = {}
+    for ridic in ridici:
+        auto = Auto(profil_id=ridic.profil.id, znacka="Skoda", model="Octavia", barva="modra", spz=f"1B{ridic.id:05d}")
+        db.session.add(auto)
+        auta[ridic.id] = auto
+    db.session.flush()
+
+    start = utc_now() + timedelta(days=1)
+    for index in range(JIZD):
+        ridic = ridici[index % RIDICU]
+        odjezd = start + timedelta(hours=index)
+        jizda = Jizda(
+            ridic_id=ridic.id,
+            auto_id=auta[ridic.id].id,
+            odkud="Brno",
+            kam="Praha",
+            cas_odjezdu=odjezd,
+            cas_prijezdu=odjezd + timedelta(hours=2),
+            cena=250,
+            pocet_mist=4,
+        )
+        jizda.mezistanice = [Mezistanice(misto="Jihlava", poradi=1), Mezistanice(misto="Humpolec", poradi=2)]
+        db.session.add(jizda)
+        db.session.flush()
+
+        for pasazer in rng.sample(pasazeri_pool, PASAZERU_NA_JIZDU):
+            db.session.execute(pasazeri.insert().values(jizda_id=jizda.id, pasazer_id=pasazer.id))
+            db.session.add(
+                Hodnoceni(
+                    jizda_id=jizda.id,
+                    autor_id=pasazer.id,
+                    cilovy_uzivatel_id=ridic.id,
+                    role="ridic",
+                    znamka=rng.randint(3, 5),
+                )
+            )
+    db.session.commit()
+
+
+def measure(view):
+    timings = []
+    payload = b""
+    for _ in range(ROUNDS):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        jizdy = (
+            with_ride_list_view_loading(Jizda.query.filter_by(status="aktivni"), view)
+            .order_by(Jizda.cas_odjezdu, Jizda.id)
+            .all()
+        )
+        payload = json.dumps({"jizdy": serializovat_jizdy(jizdy, view)}).encode()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(payload)
+
+
+def main():
+    app = create_bench_app()
+    with app.app_context():
+        db.create_all()
+        seed(random.Random(42))
+
+        print(f"{JIZD} jizd, {PASAZERU_NA_JIZDU} pasazeri na jizdu, median z {ROUNDS} opakovani")
+        print(f"{'view':>8} {'cas [ms]':>10} {'payload [kB]':>13}")
+        results = {}
+        for view in (VIEW_FULL, VIEW_SUMMARY):
+            results[view] = measure(view)
+            elapsed, size = results[view]
+            print(f"{view:>8} {elapsed:>10.1f} {size / 1024:>13.1f}")
+
+        full_time, full_size = results[VIEW_FULL]
+        summary_time, summary_size = results[VIEW_SUMMARY]
+        print(
+            f"summary: {100 * (1 - summary_size / full_size):.0f} % mensi payload,"
+            f" {100 * (1 - summary_time / full_time):.0f} % kratsi nacteni a serializace"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Porovnání latence search_cities (n-gram index) s původním lineárním průchodem.
+
+Spuštění ze složky backend:
+
+    python -m benchmarks.bench_search_cities
+"""
+import random
+import statistics
+import time
+
+from utils.cities import _file_order_search, _ranked_search, get_city_dataset, load_cities
+from utils.text_normalization import normalize_search_text
+
+
+QUERY_LENGTHS = (2, 3, 8)
+QUERIES_PER_LENGTH = 200
+ROUNDS = 5
+
+
+def linear_scan(query, *, include_address=True, limit=10):
+    normalized_query = normalize_search_text(query)
+    if len(normalized_query) < 2:
+        return []
+
+    matches = []
+    for city in load_cities():
+        in_name = normalized_query in city["_search_name"]
+        in_address = include_address and normalized_query in city["_search_address"]
+        if in_name or in_address:
+            matches.append(city)
+        if len(matches) >= limit:
+            break
+    return matches
+
+
+def sample_queries(length, count, rng):
+    names = [city["_search_name"] for city in load_cities() if len(city["_search_name"]) >= length]
+    queries = []
+    for _ in range(count):
+        name = rng.choice(names)
+        start = rng.randrange(len(name) - length + 1)
+        queries.append(name[start:start + length])
+    return queries
+
+
+def measure(search, queries):
+    timings = []
+    for _ in range(ROUNDS):
+        for query in queries:
+            started = time.perf_counter()
+            search(query)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    return statistics.median(timings), p99
+
+
+def main():
+    rng = random.Random(42)
+    dataset = get_city_dataset()
+    started = time.perf_counter()
+    dataset.warm()
+    print(f"Stavba indexu: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    # Měříme samotné vyhledávání, LRU výsledků by opakované dotazy zkreslila.
+    def indexed(query):
+        return _file_order_search(dataset, normalize_search_text(query), include_address=True, limit=10)
+
+    def ranked(query):
+        return _ranked_search(dataset, normalize_search_text(query), include_address=True, limit=10)
+
+    print(
+        f"{'delka':>5} {'scan p50':>10} {'scan p99':>10} {'index p50':>10} {'index p99':>10}"
+        f" {'rank p50':>10} {'rank p99':>10}  [us]"
+    )
+    for length in QUERY_LENGTHS:
+        queries = sample_queries(length, QUERIES_PER_LENGTH, rng)
+        scan_p50, scan_p99 = measure(linear_scan, queries)
+        index_p50, index_p99 = measure(indexed, queries)
+        rank_p50, rank_p99 = measure(ranked, queries)
+        print(
+            f"{length:>5} {scan_p50:>10.1f} {scan_p99:>10.1f} {index_p50:>10.1f} {index_p99:>10.1f}"
+            f" {rank_p50:>10.1f} {rank_p99:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import click
+
+from models import db
+from utils.cities import CITIES_WATCH_INTERVAL, build_city_index_artifact, get_city_dataset, reload_cities
+from utils.reservations import prepocitat_obsazenost_jizd
+from utils.ride_lifecycle import DEFAULT_SWEEP_BATCH_SIZE, dokoncit_probehle_jizdy
+from utils.waitlist import povysit_cekajici
+
+
+def register_commands(app):
+    """Zaregistruje servisní CLI příkazy dostupné přes `flask <prikaz>`."""
+
+    @app.cli.command("prepocitat-obsazenost")
+    @click.option("--jizda-id", "jizda_ids", type=int, multiple=True, help="Omezí přepočet na vybrané jízdy.")
+    def prepocitat_obsazenost_command(jizda_ids):
+        """Přepočítá citace obsazených míst a čekajících rezervací z tabulky rezervace."""
+        opraveno = prepocitat_obsazenost_jizd(jizda_ids or None)
+        db.session.commit()
+        click.echo(f"Opravených jízd: {opraveno}")
+
+    @app.cli.command("postavit-index-mest")
+    @click.option("--vystup", type=click.Path(dir_okay=False), default=None, help="Cesta k artefaktu indexu.")
+    def postavit_index_mest_command(vystup):
+        """Předpočítá binární index měst z data/cities.json pro rychlý start workerů."""
+        pocet, cesta = build_city_index_artifact(vystup)
+        click.echo(f"Index měst ({pocet} záznamů) zapsán do {cesta}")
+
+    @app.cli.command("obnovit-mesta")
+    def obnovit_mesta_command():
+        """Načte a ověří aktuální data/cities.json a vypíše ETag nového datasetu."""
+        reload_cities(force=True)
+        dataset = get_city_dataset()
+        click.echo(f"Dataset měst načten: {len(dataset.cities)} záznamů, ETag {dataset.etag}")
+        click.echo(f"Běžící workery změnu převezmou samy do {CITIES_WATCH_INTERVAL:g} s.")
+
+    @app.cli.command("dokoncit-jizdy")
+    @click.option("--davka", type=click.IntRange(min=1), default=DEFAULT_SWEEP_BATCH_SIZE, show_default=True,
+                  help="Počet jízd zpracovaných v jedné transakci.")
+    def dokoncit_jizdy_command(davka):
+        """Označí proběhlé jízdy jako dokončené a založí oznámení o chybějícím hodnocení."""
+        vysledek = dokoncit_probehle_jizdy(batch_size=davka)
+        click.echo(f"Dokončených jízd: {vysledek['dokonceno']}, nových oznámení: {vysledek['oznameni']}")
+
+    @app.cli.command("povysit-cekajici")
+    @click.option("--jizda-id", "jizda_ids", type=int, multiple=True, help="Omezí povýšení na vybrané jízdy.")
+    def povysit_cekajici_command(jizda_ids):
+        """Přijme čekající rezervace na jízdách s volnými místy, např. po restartu workeru."""
+        povyseno = povysit_cekajici(jizda_ids or None)
+        click.echo(f"Povýšených rezervací: {povyseno}")
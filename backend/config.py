@@ -20,6 +20,22 @@ class Config:
     MAIL_USERNAME = os.environ.get("MAIL_USERNAME")
     MAIL_PASSWORD = os.environ.get("MAIL_PASSWORD")
 
+    # Vyhledavani jizd: "sql" (vychozi) nebo "memory" pro in-memory index v kazdem workeru
+    RIDE_SEARCH_ENGINE = os.environ.get("RIDE_SEARCH_ENGINE") or "sql"
+    # Jak často si worker dorovná in-memory index ze změn ostatních procesů a jak často ho celý ověří (s).
+    RIDE_SEARCH_SYNC_INTERVAL = float(os.environ.get("RIDE_SEARCH_SYNC_INTERVAL") or 5)
+    RIDE_SEARCH_RECONCILE_INTERVAL = int(os.environ.get("RIDE_SEARCH_RECONCILE_INTERVAL") or 3600)
+    # Dataset měst se všemi indexy se načte při startu workeru, ne až při prvním dotazu na /api/mesta.
+    CITIES_WARM_ON_START = os.environ.get("CITIES_WARM_ON_START", "true").lower() in ["true", "on", "1"]
+
+    # Vlákna na pozadí (sweeper, povyšování čekajících, synchronizace indexu jízd) běží jen
+    # v obsluhujícím procesu, který to výslovně zapne; import aplikace v CLI ani v testech je nespouští.
+    RUN_BACKGROUND_WORKERS = os.environ.get("RUN_BACKGROUND_WORKERS", "false").lower() in ["true", "on", "1"]
+    # Interval sweeperu dokončených jízd v sekundách; 0 = vypnuto (výchozí), jízdy uzavírá cron přes `flask dokoncit-jizdy`.
+    RIDE_SWEEPER_INTERVAL = int(os.environ.get("RIDE_SWEEPER_INTERVAL") or 0)
+    # Prodleva v sekundách, během které se sbírají uvolněná místa jízdy před povýšením čekajících.
+    WAITLIST_PROMOTION_DELAY = float(os.environ.get("WAITLIST_PROMOTION_DELAY") or 2)
+
     # Upload
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = "uploads"
@@ -0,0 +1,109 @@
+"""add persisted route points for ride search
+
+Revision ID: a3e8f2c61d45
+Revises: d7a4c2e9f1b3
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from utils.text_normalization import normalize_search_text
+
+
+revision = "a3e8f2c61d45"
+down_revision = "d7a4c2e9f1b3"
+branch_labels = None
+depends_on = None
+
+
+def _backfill_route_points(bind):
+    jizda = sa.table(
+        "jizda",
+        sa.column("id", sa.Integer),
+        sa.column("odkud", sa.String),
+        sa.column("odkud_place_id", sa.String),
+        sa.column("kam", sa.String),
+        sa.column("kam_place_id", sa.String),
+    )
+    mezistanice = sa.table(
+        "mezistanice",
+        sa.column("jizda_id", sa.Integer),
+        sa.column("misto", sa.String),
+        sa.column("misto_place_id", sa.String),
+        sa.column("poradi", sa.Integer),
+    )
+    bod_trasy = sa.table(
+        "bod_trasy",
+        sa.column("jizda_id", sa.Integer),
+        sa.column("poradi", sa.Integer),
+        sa.column("role", sa.String),
+        sa.column("place_id", sa.String),
+        sa.column("normalizovany_text", sa.String),
+    )
+
+    stops_by_ride = {}
+    stop_rows = bind.execute(
+        sa.select(mezistanice).order_by(mezistanice.c.jizda_id, mezistanice.c.poradi)
+    )
+    for stop in stop_rows:
+        stops_by_ride.setdefault(stop.jizda_id, []).append(stop)
+
+    rows = []
+    for ride in bind.execute(sa.select(jizda)):
+        rows.append({
+            "jizda_id": ride.id,
+            "poradi": 0,
+            "role": "odkud",
+            "place_id": ride.odkud_place_id,
+            "normalizovany_text": normalize_search_text(ride.odkud),
+        })
+        stops = stops_by_ride.get(ride.id, [])
+        for index, stop in enumerate(stops, start=1):
+            rows.append({
+                "jizda_id": ride.id,
+                "poradi": index,
+                "role": "mezistanice",
+                "place_id": stop.misto_place_id,
+                "normalizovany_text": normalize_search_text(stop.misto),
+            })
+        rows.append({
+            "jizda_id": ride.id,
+            "poradi": len(stops) + 1,
+            "role": "kam",
+            "place_id": ride.kam_place_id,
+            "normalizovany_text": normalize_search_text(ride.kam),
+        })
+
+    if rows:
+        op.bulk_insert(bod_trasy, rows)
+
+
+def upgrade():
+    op.create_table(
+        "bod_trasy",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("jizda_id", sa.Integer(), nullable=False),
+        sa.Column("poradi", sa.Integer(), nullable=False),
+        sa.Column("role", sa.String(length=20), nullable=False),
+        sa.Column("place_id", sa.String(length=64), nullable=True),
+        sa.Column("normalizovany_text", sa.String(length=255), nullable=False),
+        sa.ForeignKeyConstraint(["jizda_id"], ["jizda.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    with op.batch_alter_table("bod_trasy", schema=None) as batch_op:
+        batch_op.create_index("ix_bod_trasy_place_id", ["place_id", "jizda_id", "poradi"], unique=False)
+        batch_op.create_index("ix_bod_trasy_normalizovany_text", ["normalizovany_text"], unique=False)
+        batch_op.create_index("ix_bod_trasy_jizda_poradi", ["jizda_id", "poradi"], unique=False)
+
+    # Existujici jizdy dostanou body trasy hned, aby vyhledavani po upgradu nic neztratilo.
+    _backfill_route_points(op.get_bind())
+
+
+def downgrade():
+    with op.batch_alter_table("bod_trasy", schema=None) as batch_op:
+        batch_op.drop_index("ix_bod_trasy_jizda_poradi")
+        batch_op.drop_index("ix_bod_trasy_normalizovany_text")
+        batch_op.drop_index("ix_bod_trasy_place_id")
+
+    op.drop_table("bod_trasy")
@@ -0,0 +1,67 @@
+"""add normalized text keys to saved searches
+
+Revision ID: a4c9e7b2d158
+Revises: f2d8a6c1e739
+Create Date: 2026-10-18 00:00:11.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from utils.text_normalization import normalize_search_text
+
+
+revision = "a4c9e7b2d158"
+down_revision = "f2d8a6c1e739"
+branch_labels = None
+depends_on = None
+
+
+ulozene_hledani = sa.table(
+    "ulozene_hledani",
+    sa.column("id", sa.Integer()),
+    sa.column("odkud", sa.String()),
+    sa.column("odkud_place_id", sa.String()),
+    sa.column("odkud_normalizovany", sa.String()),
+    sa.column("kam", sa.String()),
+    sa.column("kam_place_id", sa.String()),
+    sa.column("kam_normalizovany", sa.String()),
+)
+
+
+def upgrade():
+    with op.batch_alter_table("ulozene_hledani", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("odkud_normalizovany", sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column("kam_normalizovany", sa.String(length=255), nullable=True))
+        batch_op.create_index(
+            "ix_ulozene_hledani_odkud_normalizovany", ["odkud_normalizovany", "datum_do"], unique=False
+        )
+        batch_op.create_index("ix_ulozene_hledani_kam_normalizovany", ["kam_normalizovany", "datum_do"], unique=False)
+
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(
+            ulozene_hledani.c.id,
+            ulozene_hledani.c.odkud,
+            ulozene_hledani.c.odkud_place_id,
+            ulozene_hledani.c.kam,
+            ulozene_hledani.c.kam_place_id,
+        ).where(sa.or_(ulozene_hledani.c.odkud_place_id.is_(None), ulozene_hledani.c.kam_place_id.is_(None)))
+    ).all()
+    for hledani_id, odkud, odkud_place_id, kam, kam_place_id in rows:
+        conn.execute(
+            sa.update(ulozene_hledani)
+            .where(ulozene_hledani.c.id == hledani_id)
+            .values(
+                odkud_normalizovany=None if odkud_place_id else normalize_search_text(odkud) or None,
+                kam_normalizovany=None if kam_place_id else normalize_search_text(kam) or None,
+            )
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("ulozene_hledani", schema=None) as batch_op:
+        batch_op.drop_index("ix_ulozene_hledani_kam_normalizovany")
+        batch_op.drop_index("ix_ulozene_hledani_odkud_normalizovany")
+        batch_op.drop_column("kam_normalizovany")
+        batch_op.drop_column("odkud_normalizovany")
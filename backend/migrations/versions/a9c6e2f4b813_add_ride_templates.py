@@ -0,0 +1,65 @@
+"""add recurring ride templates
+
+Revision ID: a9c6e2f4b813
+Revises: f4a1d8c3b657
+Create Date: 2026-10-18 00:00:05.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "a9c6e2f4b813"
+down_revision = "f4a1d8c3b657"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "sablona_jizdy",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("ridic_id", sa.Integer(), nullable=False),
+        sa.Column("auto_id", sa.Integer(), nullable=True),
+        sa.Column("odkud", sa.String(length=255), nullable=False),
+        sa.Column("odkud_place_id", sa.String(length=64), nullable=True),
+        sa.Column("odkud_address", sa.String(length=255), nullable=True),
+        sa.Column("kam", sa.String(length=255), nullable=False),
+        sa.Column("kam_place_id", sa.String(length=64), nullable=True),
+        sa.Column("kam_address", sa.String(length=255), nullable=True),
+        sa.Column("mezistanice", sa.Text(), nullable=False),
+        sa.Column("cas_odjezdu", sa.Time(), nullable=False),
+        sa.Column("doba_jizdy", sa.Integer(), nullable=False),
+        sa.Column("dny_v_tydnu", sa.String(length=7), nullable=False),
+        sa.Column("cena", sa.Float(), nullable=False),
+        sa.Column("pocet_mist", sa.Integer(), nullable=False),
+        sa.Column("vytvoreno", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["auto_id"], ["auto.id"], ondelete="SET NULL"),
+        sa.ForeignKeyConstraint(["ridic_id"], ["uzivatel.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    with op.batch_alter_table("sablona_jizdy", schema=None) as batch_op:
+        batch_op.create_index(batch_op.f("ix_sablona_jizdy_ridic_id"), ["ridic_id"], unique=False)
+
+    with op.batch_alter_table("jizda", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("sablona_id", sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f("ix_jizda_sablona_id"), ["sablona_id"], unique=False)
+        batch_op.create_foreign_key(
+            "fk_jizda_sablona_id_sablona_jizdy",
+            "sablona_jizdy",
+            ["sablona_id"],
+            ["id"],
+            ondelete="SET NULL",
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("jizda", schema=None) as batch_op:
+        batch_op.drop_constraint("fk_jizda_sablona_id_sablona_jizdy", type_="foreignkey")
+        batch_op.drop_index(batch_op.f("ix_jizda_sablona_id"))
+        batch_op.drop_column("sablona_id")
+
+    with op.batch_alter_table("sablona_jizdy", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_sablona_jizdy_ridic_id"))
+
+    op.drop_table("sablona_jizdy")
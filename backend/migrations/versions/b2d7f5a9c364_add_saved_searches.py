@@ -0,0 +1,46 @@
+"""add saved ride searches
+
+Revision ID: b2d7f5a9c364
+Revises: a9c6e2f4b813
+Create Date: 2026-10-18 00:00:06.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "b2d7f5a9c364"
+down_revision = "a9c6e2f4b813"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "ulozene_hledani",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("uzivatel_id", sa.Integer(), nullable=False),
+        sa.Column("odkud", sa.String(length=255), nullable=True),
+        sa.Column("odkud_place_id", sa.String(length=64), nullable=True),
+        sa.Column("kam", sa.String(length=255), nullable=True),
+        sa.Column("kam_place_id", sa.String(length=64), nullable=True),
+        sa.Column("datum_od", sa.Date(), nullable=True),
+        sa.Column("datum_do", sa.Date(), nullable=True),
+        sa.Column("pocet_mist", sa.Integer(), nullable=False),
+        sa.Column("vytvoreno", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["uzivatel_id"], ["uzivatel.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    with op.batch_alter_table("ulozene_hledani", schema=None) as batch_op:
+        batch_op.create_index(batch_op.f("ix_ulozene_hledani_uzivatel_id"), ["uzivatel_id"], unique=False)
+        batch_op.create_index("ix_ulozene_hledani_odkud_place_id", ["odkud_place_id", "datum_do"], unique=False)
+        batch_op.create_index("ix_ulozene_hledani_kam_place_id", ["kam_place_id", "datum_do"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("ulozene_hledani", schema=None) as batch_op:
+        batch_op.drop_index("ix_ulozene_hledani_kam_place_id")
+        batch_op.drop_index("ix_ulozene_hledani_odkud_place_id")
+        batch_op.drop_index(batch_op.f("ix_ulozene_hledani_uzivatel_id"))
+
+    op.drop_table("ulozene_hledani")
@@ -0,0 +1,46 @@
+"""add denormalized seat counters to rides
+
+Revision ID: b7d41e9a3c28
+Revises: a3e8f2c61d45
+Create Date: 2026-10-18 00:00:01.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "b7d41e9a3c28"
+down_revision = "a3e8f2c61d45"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("jizda", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("obsazena_mista", sa.Integer(), nullable=False, server_default="0")
+        )
+        batch_op.add_column(
+            sa.Column("pocet_cekajicich", sa.Integer(), nullable=False, server_default="0")
+        )
+
+    # Citace naplnime z existujicich rezervaci stejnym vypoctem jako `flask prepocitat-obsazenost`.
+    op.execute(
+        """
+        UPDATE jizda SET
+            obsazena_mista = (
+                SELECT COALESCE(SUM(rezervace.pocet_mist), 0) FROM rezervace
+                WHERE rezervace.jizda_id = jizda.id AND rezervace.status = 'prijata'
+            ),
+            pocet_cekajicich = (
+                SELECT COUNT(rezervace.id) FROM rezervace
+                WHERE rezervace.jizda_id = jizda.id AND rezervace.status = 'cekajici'
+            )
+        """
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("jizda", schema=None) as batch_op:
+        batch_op.drop_column("pocet_cekajicich")
+        batch_op.drop_column("obsazena_mista")
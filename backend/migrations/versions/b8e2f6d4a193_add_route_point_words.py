@@ -0,0 +1,73 @@
+"""add word rows for route point text search
+
+Revision ID: b8e2f6d4a193
+Revises: a4c9e7b2d158
+Create Date: 2026-10-18 00:00:12.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from utils.text_normalization import word_start_suffixes
+
+
+revision = "b8e2f6d4a193"
+down_revision = "a4c9e7b2d158"
+branch_labels = None
+depends_on = None
+
+
+bod_trasy = sa.table(
+    "bod_trasy",
+    sa.column("jizda_id", sa.Integer()),
+    sa.column("poradi", sa.Integer()),
+    sa.column("normalizovany_text", sa.String()),
+)
+slovo_bodu_trasy = sa.table(
+    "slovo_bodu_trasy",
+    sa.column("jizda_id", sa.Integer()),
+    sa.column("poradi", sa.Integer()),
+    sa.column("normalizovany_text", sa.String()),
+)
+
+
+def upgrade():
+    op.create_table(
+        "slovo_bodu_trasy",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("jizda_id", sa.Integer(), nullable=False),
+        sa.Column("poradi", sa.Integer(), nullable=False),
+        sa.Column("normalizovany_text", sa.String(length=255), nullable=False),
+        sa.ForeignKeyConstraint(["jizda_id"], ["jizda.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    with op.batch_alter_table("slovo_bodu_trasy", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_slovo_bodu_trasy_text", ["normalizovany_text", "jizda_id", "poradi"], unique=False
+        )
+        batch_op.create_index("ix_slovo_bodu_trasy_jizda_poradi", ["jizda_id", "poradi"], unique=False)
+
+    # Textove hledani jde nove pres slova, index nad celym textem bodu uz nic nepouziva.
+    with op.batch_alter_table("bod_trasy", schema=None) as batch_op:
+        batch_op.drop_index("ix_bod_trasy_normalizovany_text")
+
+    rows = [
+        {"jizda_id": jizda_id, "poradi": poradi, "normalizovany_text": suffix}
+        for jizda_id, poradi, text in op.get_bind().execute(
+            sa.select(bod_trasy.c.jizda_id, bod_trasy.c.poradi, bod_trasy.c.normalizovany_text)
+        )
+        for suffix in word_start_suffixes(text)
+    ]
+    if rows:
+        op.bulk_insert(slovo_bodu_trasy, rows)
+
+
+def downgrade():
+    with op.batch_alter_table("bod_trasy", schema=None) as batch_op:
+        batch_op.create_index("ix_bod_trasy_normalizovany_text", ["normalizovany_text"], unique=False)
+
+    with op.batch_alter_table("slovo_bodu_trasy", schema=None) as batch_op:
+        batch_op.drop_index("ix_slovo_bodu_trasy_jizda_poradi")
+        batch_op.drop_index("ix_slovo_bodu_trasy_text")
+
+    op.drop_table("slovo_bodu_trasy")
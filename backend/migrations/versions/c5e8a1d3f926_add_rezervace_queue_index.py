@@ -0,0 +1,28 @@
+"""add reservation queue index for waiting positions
+
+Revision ID: c5e8a1d3f926
+Revises: b2d7f5a9c364
+Create Date: 2026-10-18 00:00:07.000000
+"""
+
+from alembic import op
+
+
+revision = "c5e8a1d3f926"
+down_revision = "b2d7f5a9c364"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("rezervace", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_rezervace_jizda_status_vytvoreno",
+            ["jizda_id", "status", "vytvoreno"],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("rezervace", schema=None) as batch_op:
+        batch_op.drop_index("ix_rezervace_jizda_status_vytvoreno")
@@ -0,0 +1,24 @@
+"""add composite status/departure index to rides
+
+Revision ID: c5f92a7d1e04
+Revises: b7d41e9a3c28
+Create Date: 2026-10-18 00:00:02.000000
+"""
+
+from alembic import op
+
+
+revision = "c5f92a7d1e04"
+down_revision = "b7d41e9a3c28"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("jizda", schema=None) as batch_op:
+        batch_op.create_index("ix_jizda_status_cas_odjezdu", ["status", "cas_odjezdu"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("jizda", schema=None) as batch_op:
+        batch_op.drop_index("ix_jizda_status_cas_odjezdu")
@@ -0,0 +1,35 @@
+"""add instant booking flag to rides and ride templates
+
+Revision ID: d8f3b6a2e417
+Revises: c5e8a1d3f926
+Create Date: 2026-10-18 00:00:08.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "d8f3b6a2e417"
+down_revision = "c5e8a1d3f926"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("jizda", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("okamzita_rezervace", sa.Boolean(), nullable=False, server_default=sa.false())
+        )
+
+    with op.batch_alter_table("sablona_jizdy", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("okamzita_rezervace", sa.Boolean(), nullable=False, server_default=sa.false())
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("sablona_jizdy", schema=None) as batch_op:
+        batch_op.drop_column("okamzita_rezervace")
+
+    with op.batch_alter_table("jizda", schema=None) as batch_op:
+        batch_op.drop_column("okamzita_rezervace")
@@ -0,0 +1,34 @@
+"""add ride change log for in-memory search index sync
+
+Revision ID: e6b1f3c8a902
+Revises: d8f3b6a2e417
+Create Date: 2026-10-18 00:00:09.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "e6b1f3c8a902"
+down_revision = "d8f3b6a2e417"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "zmena_jizdy",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("jizda_id", sa.Integer(), nullable=False),
+        sa.Column("vytvoreno", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    with op.batch_alter_table("zmena_jizdy", schema=None) as batch_op:
+        batch_op.create_index(batch_op.f("ix_zmena_jizdy_vytvoreno"), ["vytvoreno"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("zmena_jizdy", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_zmena_jizdy_vytvoreno"))
+
+    op.drop_table("zmena_jizdy")
@@ -0,0 +1,52 @@
+"""add postal region bucket to route points
+
+Revision ID: e8b3a4f7c912
+Revises: c5f92a7d1e04
+Create Date: 2026-10-18 00:00:03.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from utils.cities import get_city_region
+
+
+revision = "e8b3a4f7c912"
+down_revision = "c5f92a7d1e04"
+branch_labels = None
+depends_on = None
+
+
+def _backfill_regions(bind):
+    bod_trasy = sa.table(
+        "bod_trasy",
+        sa.column("place_id", sa.String),
+        sa.column("region", sa.String),
+    )
+    place_ids = bind.execute(
+        sa.select(bod_trasy.c.place_id).where(bod_trasy.c.place_id.is_not(None)).distinct()
+    ).scalars()
+
+    # Region je odvozeny z datasetu mest, proto ho doplnime po place_id v Pythonu.
+    for place_id in place_ids:
+        region = get_city_region(place_id)
+        if region:
+            bind.execute(
+                bod_trasy.update()
+                .where(bod_trasy.c.place_id == place_id)
+                .values(region=region)
+            )
+
+
+def upgrade():
+    with op.batch_alter_table("bod_trasy", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("region", sa.String(length=2), nullable=True))
+        batch_op.create_index("ix_bod_trasy_region", ["region", "jizda_id", "poradi"], unique=False)
+
+    _backfill_regions(op.get_bind())
+
+
+def downgrade():
+    with op.batch_alter_table("bod_trasy", schema=None) as batch_op:
+        batch_op.drop_index("ix_bod_trasy_region")
+        batch_op.drop_column("region")
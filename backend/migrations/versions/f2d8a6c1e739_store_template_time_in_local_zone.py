@@ -0,0 +1,71 @@
+"""store ride template departure as local time with a time zone
+
+Revision ID: f2d8a6c1e739
+Revises: e6b1f3c8a902
+Create Date: 2026-10-18 00:00:10.000000
+"""
+
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "f2d8a6c1e739"
+down_revision = "e6b1f3c8a902"
+branch_labels = None
+depends_on = None
+
+
+ZONA = "Europe/Prague"
+
+sablona_jizdy = sa.table(
+    "sablona_jizdy",
+    sa.column("id", sa.Integer()),
+    sa.column("cas_odjezdu", sa.Time()),
+    sa.column("dny_v_tydnu", sa.String(7)),
+    sa.column("vytvoreno", sa.DateTime()),
+)
+
+
+def _posunout_dny(dny_v_tydnu, posun):
+    return "".join(sorted({str((int(den) + posun) % 7) for den in dny_v_tydnu or ""}))
+
+
+def _prevest_sablony(z_utc):
+    """Prevede ulozene casy sablon mezi UTC a mistnim casem podle offsetu v den vytvoreni."""
+    conn = op.get_bind()
+    zona = ZoneInfo(ZONA)
+    rows = conn.execute(
+        sa.select(sablona_jizdy.c.id, sablona_jizdy.c.cas_odjezdu, sablona_jizdy.c.dny_v_tydnu, sablona_jizdy.c.vytvoreno)
+    ).all()
+    for sablona_id, cas_odjezdu, dny_v_tydnu, vytvoreno in rows:
+        den = vytvoreno.date()
+        if z_utc:
+            puvodni = datetime.combine(den, cas_odjezdu, tzinfo=timezone.utc)
+            novy = puvodni.astimezone(zona)
+        else:
+            puvodni = datetime.combine(den, cas_odjezdu, tzinfo=zona)
+            novy = puvodni.astimezone(timezone.utc)
+        # Prechod pres pulnoc posouva i dny v tydnu, aby termin zustal ve stejnem okamziku.
+        posun = (novy.date() - puvodni.date()).days
+        conn.execute(
+            sa.update(sablona_jizdy)
+            .where(sablona_jizdy.c.id == sablona_id)
+            .values(cas_odjezdu=novy.time().replace(tzinfo=None), dny_v_tydnu=_posunout_dny(dny_v_tydnu, posun))
+        )
+
+
+def upgrade():
+    with op.batch_alter_table("sablona_jizdy", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("casova_zona", sa.String(length=64), nullable=False, server_default=ZONA))
+
+    _prevest_sablony(z_utc=True)
+
+
+def downgrade():
+    _prevest_sablony(z_utc=False)
+
+    with op.batch_alter_table("sablona_jizdy", schema=None) as batch_op:
+        batch_op.drop_column("casova_zona")
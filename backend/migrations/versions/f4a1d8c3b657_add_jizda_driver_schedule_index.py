@@ -0,0 +1,28 @@
+"""add driver schedule index for ride overlap checks
+
+Revision ID: f4a1d8c3b657
+Revises: e8b3a4f7c912
+Create Date: 2026-10-18 00:00:04.000000
+"""
+
+from alembic import op
+
+
+revision = "f4a1d8c3b657"
+down_revision = "e8b3a4f7c912"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("jizda", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_jizda_ridic_status_cas",
+            ["ridic_id", "status", "cas_odjezdu", "cas_prijezdu"],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("jizda", schema=None) as batch_op:
+        batch_op.drop_index("ix_jizda_ridic_status_cas")
@@ -0,0 +1,32 @@
+from models import db
+
+
+class BodTrasy(db.Model):
+    """Predpocitany bod trasy jizdy, nad kterym bezi vyhledavani primo v databazi."""
+
+    __tablename__ = "bod_trasy"
+
+    id = db.Column(db.Integer, primary_key=True)
+    jizda_id = db.Column(
+        db.Integer,
+        db.ForeignKey("jizda.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    poradi = db.Column(db.Integer, nullable=False)
+    role = db.Column(db.String(20), nullable=False)  # 'odkud', 'mezistanice' nebo 'kam'
+    place_id = db.Column(db.String(64), nullable=True)
+    normalizovany_text = db.Column(db.String(255), nullable=False)
+    region = db.Column(db.String(2), nullable=True)  # prvni dve cislice PSC podle place_id
+
+    jizda = db.relationship("Jizda", back_populates="body_trasy")
+
+    __table_args__ = (
+        # Hledani podle place_id jde pres index a rovnou vraci jizdu i pozici na trase.
+        db.Index("ix_bod_trasy_place_id", "place_id", "jizda_id", "poradi"),
+        db.Index("ix_bod_trasy_jizda_poradi", "jizda_id", "poradi"),
+        # Siroke hledani "cokoliv z regionu 37" jde pres index misto vyctu place_id.
+        db.Index("ix_bod_trasy_region", "region", "jizda_id", "poradi"),
+    )
+
+    def __repr__(self):
+        return f"<BodTrasy {self.role} {self.normalizovany_text} ({self.poradi}) jizda_id={self.jizda_id}>"
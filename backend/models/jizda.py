@@ -1,4 +1,5 @@
 from models import db
+from utils.datetime_utils import utc_now
 
 
 class Jizda(db.Model):
@@ -21,7 +22,23 @@ class Jizda(db.Model):
     cas_prijezdu = db.Column(db.DateTime, nullable=False)
     cena = db.Column(db.Float, nullable=False)
     pocet_mist = db.Column(db.Integer, nullable=False)
+    # Denormalizovane citace drzi rezervace ve stejne transakci, aby se kapacita cetla bez dotazu.
+    obsazena_mista = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    pocet_cekajicich = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     status = db.Column(db.String(20), default="aktivni")
+    # Pri okamzite rezervaci se volna mista prideluji hned bez schvalovani ridicem.
+    okamzita_rezervace = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    # Jizdy vygenerovane ze sablony si ji pamatuji, aby se na ne daly hromadne propsat zmeny.
+    sablona_id = db.Column(
+        db.Integer, db.ForeignKey("sablona_jizdy.id", ondelete="SET NULL"), nullable=True, index=True
+    )
+
+    __table_args__ = (
+        # Vypisy vzdy filtruji aktivni jizdy a rozsah odjezdu, proto index v tomto poradi.
+        db.Index("ix_jizda_status_cas_odjezdu", "status", "cas_odjezdu"),
+        # Kontrola prekryvu jizd ridice je jeden rozsahovy dotaz nad timto indexem.
+        db.Index("ix_jizda_ridic_status_cas", "ridic_id", "status", "cas_odjezdu", "cas_prijezdu"),
+    )
 
     # Rezervace a chat davaji smysl jen pro danou jizdu, proto se mazu spolu s ni.
     rezervace = db.relationship(
@@ -45,6 +62,22 @@ class Jizda(db.Model):
         passive_deletes=True,
     )
 
+    # Body trasy jsou odvozene z odkud/mezistanic/kam a slouzi jen pro SQL vyhledavani.
+    body_trasy = db.relationship(
+        "BodTrasy",
+        back_populates="jizda",
+        cascade="all, delete-orphan",
+        order_by="BodTrasy.poradi",
+        passive_deletes=True,
+    )
+    # Slova bodu trasy jsou textovy index k body_trasy a meni se vzdy spolu s nimi.
+    slova_bodu_trasy = db.relationship(
+        "SlovoBoduTrasy",
+        back_populates="jizda",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
     def __init__(
         self, ridic_id, auto_id, odkud, kam, cas_odjezdu, cas_prijezdu, cena, pocet_mist
     ):
@@ -57,30 +90,78 @@ class Jizda(db.Model):
         self.cena = cena
         self.pocet_mist = pocet_mist
 
+    def get_efektivni_status(self, now=None):
+        """Vrati status, jak ho uvidi klient: po prijezdu je jizda dokoncena i pred behem sweeperu."""
+        now = now or utc_now()
+        if self.status == "aktivni" and self.cas_prijezdu is not None and self.cas_prijezdu <= now:
+            return "dokoncena"
+        return self.status
+
     def get_volna_mista(self):
         """Vrati pocet volnych mist po odecteni prijatych rezervaci."""
         obsazena_mista = self.get_pocet_prijatych_mist()
         return max(0, self.pocet_mist - obsazena_mista)
 
     def get_pocet_prijatych_mist(self):
-        """Vrati skutecny soucet prijatych mist i pro jizdy nacitane bez rezervaci."""
-        if not self.id:
-            return sum(
-                rezervace.pocet_mist
-                for rezervace in self.rezervace
-                if rezervace.status == "prijata"
+        """Vrati soucet prijatych mist z denormalizovaneho citace jizdy."""
+        return self.obsazena_mista or 0
+
+    def get_pocet_cekajicich_rezervaci(self):
+        """Vrati pocet cekajicich rezervaci, ktere mohou pozdeji zabrat kapacitu."""
+        return self.pocet_cekajicich or 0
+
+    def upravit_obsazenost(self, *, obsazena=0, cekajici=0):
+        """Posune citace obsazenosti atomickym UPDATE, aby se neprepsaly soubezne zmeny."""
+        if not obsazena and not cekajici:
+            return
+
+        db.session.execute(
+            db.update(Jizda)
+            .where(Jizda.id == self.id)
+            .values(
+                obsazena_mista=Jizda.obsazena_mista + obsazena,
+                pocet_cekajicich=Jizda.pocet_cekajicich + cekajici,
             )
+            .execution_options(synchronize_session=False)
+        )
+        # Hodnoty se pri dalsim cteni nactou z DB, takze odpovidaji skutecnemu stavu po UPDATE.
+        db.session.expire(self, ["obsazena_mista", "pocet_cekajicich"])
 
-        from models.rezervace import Rezervace
+    def obsadit_mista(self, pocet_mist, *, cekajici=0):
+        """Zabere mista jednim podminenym UPDATE; vraci False, kdyz by kapacita pretekla.
 
-        prijate_rezervace = Rezervace.query.filter_by(
-            jizda_id=self.id, status="prijata"
-        ).all()
-        return sum(rezervace.pocet_mist for rezervace in prijate_rezervace)
+        O uspechu rozhoduje rowcount, takze soubezna prijeti nemohou prodat vic mist
+        nez ma jizda ani na SQLite, ktera ignoruje SELECT ... FOR UPDATE.
+        """
+        result = db.session.execute(
+            db.update(Jizda)
+            .where(
+                Jizda.id == self.id,
+                Jizda.obsazena_mista + pocet_mist <= Jizda.pocet_mist,
+            )
+            .values(
+                obsazena_mista=Jizda.obsazena_mista + pocet_mist,
+                pocet_cekajicich=Jizda.pocet_cekajicich + cekajici,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.expire(self, ["obsazena_mista", "pocet_cekajicich"])
+        return result.rowcount == 1
 
-    def get_pocet_cekajicich_rezervaci(self):
-        """Spocita cekajici rezervace, ktere mohou pozdeji zabrat kapacitu."""
-        return sum(1 for rezervace in self.rezervace if rezervace.status == "cekajici")
+    def zmenit_pocet_mist(self, pocet_mist):
+        """Nastavi kapacitu podminenym UPDATE; vraci False, kdyby klesla pod obsazena mista.
+
+        Kontrola i zapis jsou jeden prikaz, takze soubezne `obsadit_mista` nemuze
+        mezi nimi zabrat mista, ktera by po snizeni kapacity prebyvala.
+        """
+        result = db.session.execute(
+            db.update(Jizda)
+            .where(Jizda.id == self.id, Jizda.obsazena_mista <= pocet_mist)
+            .values(pocet_mist=pocet_mist)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.expire(self, ["pocet_mist", "obsazena_mista"])
+        return result.rowcount == 1
 
     def ma_dostatek_volnych_mist(self, pocet_pasazeru):
         """Overi kapacitu pro pozadovany pocet mist bez zmeny stavu jizdy."""
@@ -131,7 +212,9 @@ class Jizda(db.Model):
             "pocet_mist": self.pocet_mist,
             "volna_mista": self.get_volna_mista(),
             "pocet_cekajicich_rezervaci": self.get_pocet_cekajicich_rezervaci(),
-            "status": self.status,
+            "status": self.get_efektivni_status(),
+            "okamzita_rezervace": self.okamzita_rezervace,
+            "sablona_id": self.sablona_id,
             "pasazeri": [
                 {"uzivatel_id": p.id, **(p.profil.to_dict() if p.profil else {})}
                 for p in self.pasazeri
@@ -149,5 +232,25 @@ class Jizda(db.Model):
             ],
         }
 
+    def to_summary_dict(self, hodnoceni_ridic=0):
+        """Zkraceny tvar pro seznamy: z vazeb cte jen jmeno ridice, hodnoceni dodava volajici."""
+        profil = self.ridic.profil
+        return {
+            "id": self.id,
+            "ridic_id": self.ridic_id,
+            "ridic": {
+                "jmeno": profil.jmeno if profil else None,
+                "hodnoceni_ridic": hodnoceni_ridic,
+            },
+            "odkud": self.odkud,
+            "kam": self.kam,
+            "cas_odjezdu": self.cas_odjezdu.isoformat() if self.cas_odjezdu else None,
+            "cas_prijezdu": self.cas_prijezdu.isoformat() if self.cas_prijezdu else None,
+            "cena": self.cena,
+            "volna_mista": self.get_volna_mista(),
+            "status": self.get_efektivni_status(),
+            "okamzita_rezervace": self.okamzita_rezervace,
+        }
+
     def __repr__(self):
         return f"<Jizda {self.odkud} -> {self.kam}>"
@@ -23,6 +23,11 @@ class Rezervace(db.Model):
     vytvoreno = db.Column(db.DateTime, nullable=False, default=utc_now)
     status = db.Column(db.String(20), default="cekajici")
 
+    __table_args__ = (
+        # Poradi ve fronte se pocita pres cekajici rezervace jizdy serazene podle podani.
+        db.Index("ix_rezervace_jizda_status_vytvoreno", "jizda_id", "status", "vytvoreno"),
+    )
+
     # Vazby na uzivatele a jizdu jsou definovane pres backref v ostatnich modelech.
 
     def __init__(
@@ -47,30 +52,74 @@ class Rezervace(db.Model):
         """Ulozi dalsi pasazery konzistentne jako JSON pole."""
         self.dalsi_pasazeri = json.dumps(pasazeri or [], ensure_ascii=False)
 
+    @staticmethod
+    def _zabrana_mista(status, pocet_mist):
+        return pocet_mist if status == "prijata" else 0
+
+    def zmenit_status(self, novy_status):
+        """Zmeni stav rezervace a ve stejne transakci dorovna citace obsazenosti jizdy."""
+        puvodni_status = self.status
+        if puvodni_status == novy_status:
+            return
+
+        self.status = novy_status
+        self.jizda.upravit_obsazenost(
+            obsazena=(
+                self._zabrana_mista(novy_status, self.pocet_mist)
+                - self._zabrana_mista(puvodni_status, self.pocet_mist)
+            ),
+            cekajici=int(novy_status == "cekajici") - int(puvodni_status == "cekajici"),
+        )
+
     def prijmout(self):
-        """Prijme rezervaci a zapise uzivatele mezi skutecne pasazery jizdy."""
-        self.status = "prijata"
+        """Prijme cekajici rezervaci a zapise uzivatele mezi skutecne pasazery jizdy.
+
+        Stav rezervace i mista jizdy meni podminene UPDATE, jejichz rowcount rozhoduje
+        o uspechu. Vraci (uspech, chyba); neuspech po sobe v transakci nic nenechava.
+        """
+        result = db.session.execute(
+            db.update(Rezervace)
+            .where(Rezervace.id == self.id, Rezervace.status == "cekajici")
+            .values(status="prijata")
+            .execution_options(synchronize_session=False)
+        )
+        db.session.expire(self, ["status"])
+        if result.rowcount != 1:
+            return False, "Rezervace již byla zpracována"
+
+        if not self.jizda.obsadit_mista(self.pocet_mist, cekajici=-1):
+            # Rezervaci vratime do fronty, aby ji hromadne zpracovani mohlo commitnout s ostatnimi.
+            db.session.execute(
+                db.update(Rezervace)
+                .where(Rezervace.id == self.id)
+                .values(status="cekajici")
+                .execution_options(synchronize_session=False)
+            )
+            return False, "Jízda je plně obsazena"
+
         # Do seznamu pasazeru patri jen prijate rezervace, ne vsechny cekajici zadosti.
         if self.uzivatel not in self.jizda.pasazeri:
             self.jizda.pasazeri.append(self.uzivatel)
+        return True, None
 
     def odmitnout(self):
         """Odmitne rezervaci bez dalsi zmeny seznamu pasazeru."""
-        self.status = "odmitnuta"
+        self.zmenit_status("odmitnuta")
 
     def zrusit(self):
         """Zrusi rezervaci a u prijate rezervace take odebere pasazera z jizdy."""
         if self.status == "prijata" and self.uzivatel in self.jizda.pasazeri:
             self.jizda.pasazeri.remove(self.uzivatel)
+        self.zmenit_status("zrusena")
         db.session.delete(self)
 
-    def to_dict(self):
-        return {
+    def to_dict(self, *, vcetne_jizdy=True):
+        """Serializuje rezervaci; bez jizdy pro vypisy, ktere jizdy posilaji zvlast."""
+        data = {
             "id": self.id,
             "uzivatel_id": self.uzivatel_id,
             "uzivatel": self.uzivatel.profil.to_dict() if self.uzivatel.profil else None,
             "jizda_id": self.jizda_id,
-            "jizda": self.jizda.to_dict() if self.jizda else None,
             "pocet_mist": self.pocet_mist,
             "dalsi_pasazeri": self.get_dalsi_pasazeri(),
             "poznamka": self.poznamka,
@@ -78,6 +127,9 @@ class Rezervace(db.Model):
             "poradi_cekajici": getattr(self, "poradi_cekajici", None),
             "status": self.status,
         }
+        if vcetne_jizdy:
+            data["jizda"] = self.jizda.to_dict() if self.jizda else None
+        return data
 
     def __repr__(self):
         return f"<Rezervace {self.uzivatel_id} -> {self.jizda_id}>"
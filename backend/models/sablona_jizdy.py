@@ -0,0 +1,179 @@
+import json
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from models import db
+from models.jizda import Jizda
+from models.mezistanice import Mezistanice
+from utils.datetime_utils import utc_now
+
+
+VYCHOZI_CASOVA_ZONA = "Europe/Prague"
+
+
+class SablonaJizdy(db.Model):
+    """Opakovana jizda dojizdejiciho ridice, ze ktere se generuji jednotlive terminy."""
+
+    __tablename__ = "sablona_jizdy"
+
+    id = db.Column(db.Integer, primary_key=True)
+    ridic_id = db.Column(db.Integer, db.ForeignKey("uzivatel.id"), nullable=False, index=True)
+    auto_id = db.Column(
+        db.Integer, db.ForeignKey("auto.id", ondelete="SET NULL"), nullable=True
+    )
+    odkud = db.Column(db.String(255), nullable=False)
+    odkud_place_id = db.Column(db.String(64), nullable=True)
+    odkud_address = db.Column(db.String(255), nullable=True)
+    kam = db.Column(db.String(255), nullable=False)
+    kam_place_id = db.Column(db.String(64), nullable=True)
+    kam_address = db.Column(db.String(255), nullable=True)
+    # Mezistanice sablony jsou JSON pole {text, place_id, address} ve stejnem tvaru jako z API.
+    mezistanice = db.Column(db.Text, nullable=False, default="[]")
+    # Cas odjezdu i dny v tydnu jsou mistni v casove zone sablony, do UTC se prevadi az kazdy termin,
+    # aby odjezd nepreskocil o hodinu pri zmene letniho casu. Doba jizdy je v minutach.
+    cas_odjezdu = db.Column(db.Time, nullable=False)
+    casova_zona = db.Column(
+        db.String(64), nullable=False, default=VYCHOZI_CASOVA_ZONA, server_default=VYCHOZI_CASOVA_ZONA
+    )
+    doba_jizdy = db.Column(db.Integer, nullable=False)
+    # Dny v tydnu jako cislice podle date.weekday(), napr. "01234" pro pracovni dny.
+    dny_v_tydnu = db.Column(db.String(7), nullable=False)
+    cena = db.Column(db.Float, nullable=False)
+    pocet_mist = db.Column(db.Integer, nullable=False)
+    okamzita_rezervace = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    vytvoreno = db.Column(db.DateTime, nullable=False, default=utc_now)
+
+    ridic = db.relationship("Uzivatel")
+    auto = db.relationship("Auto")
+    # Smazani sablony vygenerovane jizdy nerusi, jen je odpoji.
+    jizdy = db.relationship("Jizda", backref="sablona", passive_deletes=True)
+
+    def get_mezistanice(self):
+        """Vrati mezistanice sablony jako seznam i pri chybnem ulozeni."""
+        try:
+            data = json.loads(self.mezistanice or "[]")
+        except (TypeError, ValueError):
+            return []
+
+        return data if isinstance(data, list) else []
+
+    def set_mezistanice(self, mezistanice):
+        self.mezistanice = json.dumps(mezistanice or [], ensure_ascii=False)
+
+    def get_dny_v_tydnu(self):
+        return sorted({int(den) for den in self.dny_v_tydnu or ""})
+
+    def set_dny_v_tydnu(self, dny):
+        self.dny_v_tydnu = "".join(str(den) for den in sorted(set(dny)))
+
+    def get_zona(self):
+        return ZoneInfo(self.casova_zona or VYCHOZI_CASOVA_ZONA)
+
+    def lokalni_den(self, cas):
+        """Vrati mistni datum pro naivni UTC cas, napr. odjezd existujici jizdy."""
+        return cas.replace(tzinfo=timezone.utc).astimezone(self.get_zona()).date()
+
+    def casy_terminu(self, den):
+        """Vrati (cas_odjezdu, cas_prijezdu) terminu v dany mistni den jako naivni UTC."""
+        odjezd = datetime.combine(den, self.cas_odjezdu, tzinfo=self.get_zona())
+        cas_odjezdu = odjezd.astimezone(timezone.utc).replace(tzinfo=None)
+        return cas_odjezdu, cas_odjezdu + timedelta(minutes=self.doba_jizdy)
+
+    def terminy(self, od, pocet, now=None):
+        """Vrati dalsich `pocet` budoucich terminu od mistniho data `od` vcetne podle dnu v tydnu."""
+        now = now or utc_now()
+        dny = set(self.get_dny_v_tydnu())
+        terminy = []
+        den = od
+        # Kazdy tyden obsahuje aspon jeden den sablony, cyklus tak skonci nejpozdeji po pocet tydnech.
+        while dny and len(terminy) < pocet:
+            if den.weekday() in dny:
+                cas_odjezdu, cas_prijezdu = self.casy_terminu(den)
+                if cas_odjezdu > now:
+                    terminy.append((cas_odjezdu, cas_prijezdu))
+            den += timedelta(days=1)
+        return terminy
+
+    def hodnoty_jizdy(self):
+        """Hodnoty sloupcu jizdy spolecne vsem terminum, pro hromadny INSERT."""
+        return {
+            "ridic_id": self.ridic_id,
+            "auto_id": self.auto_id,
+            "odkud": self.odkud,
+            "odkud_place_id": self.odkud_place_id,
+            "odkud_address": self.odkud_address,
+            "kam": self.kam,
+            "kam_place_id": self.kam_place_id,
+            "kam_address": self.kam_address,
+            "cena": self.cena,
+            "pocet_mist": self.pocet_mist,
+            "okamzita_rezervace": bool(self.okamzita_rezervace),
+            "obsazena_mista": 0,
+            "pocet_cekajicich": 0,
+            "status": "aktivni",
+            "sablona_id": self.id,
+        }
+
+    def vzorova_jizda(self):
+        """Docasna jizda mimo session, ze ktere se odvodi mezistanice a body trasy terminu."""
+        jizda = Jizda(
+            ridic_id=self.ridic_id,
+            auto_id=self.auto_id,
+            odkud=self.odkud,
+            kam=self.kam,
+            cas_odjezdu=None,
+            cas_prijezdu=None,
+            cena=self.cena,
+            pocet_mist=self.pocet_mist,
+        )
+        self.prenest_na_jizdu(jizda)
+        return jizda
+
+    def prenest_na_jizdu(self, jizda, *, vcetne_mezistanic=True):
+        """Prepise trasu, auto, cenu a kapacitu jizdy podle sablony."""
+        jizda.auto_id = self.auto_id
+        jizda.odkud = self.odkud
+        jizda.odkud_place_id = self.odkud_place_id
+        jizda.odkud_address = self.odkud_address
+        jizda.kam = self.kam
+        jizda.kam_place_id = self.kam_place_id
+        jizda.kam_address = self.kam_address
+        jizda.cena = self.cena
+        jizda.pocet_mist = self.pocet_mist
+        jizda.okamzita_rezervace = bool(self.okamzita_rezervace)
+        if not vcetne_mezistanic:
+            return
+        jizda.mezistanice = [
+            Mezistanice(
+                misto=misto["text"],
+                misto_place_id=misto.get("place_id"),
+                misto_address=misto.get("address"),
+                poradi=poradi,
+            )
+            for poradi, misto in enumerate(self.get_mezistanice(), start=1)
+        ]
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "ridic_id": self.ridic_id,
+            "auto_id": self.auto_id,
+            "odkud": self.odkud,
+            "odkud_place_id": self.odkud_place_id,
+            "odkud_address": self.odkud_address,
+            "kam": self.kam,
+            "kam_place_id": self.kam_place_id,
+            "kam_address": self.kam_address,
+            "mezistanice": self.get_mezistanice(),
+            "cas_odjezdu": self.cas_odjezdu.strftime("%H:%M"),
+            "casova_zona": self.casova_zona,
+            "doba_jizdy": self.doba_jizdy,
+            "dny_v_tydnu": self.get_dny_v_tydnu(),
+            "cena": self.cena,
+            "pocet_mist": self.pocet_mist,
+            "okamzita_rezervace": bool(self.okamzita_rezervace),
+            "vytvoreno": self.vytvoreno.isoformat() if self.vytvoreno else None,
+        }
+
+    def __repr__(self):
+        return f"<SablonaJizdy {self.odkud} -> {self.kam} {self.dny_v_tydnu}>"
@@ -0,0 +1,32 @@
+from models import db
+
+
+class SlovoBoduTrasy(db.Model):
+    """Text bodu trasy od zacatku jednoho jeho slova pro textove vyhledavani jizd.
+
+    Kazdy bod ma radek pro cely text a pro kazde dalsi slovo, takze dotaz
+    "budejovice" najde "ceske budejovice" prefixovym rozsahem pres index.
+    """
+
+    __tablename__ = "slovo_bodu_trasy"
+
+    id = db.Column(db.Integer, primary_key=True)
+    jizda_id = db.Column(
+        db.Integer,
+        db.ForeignKey("jizda.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    # Bod trasy se odkazuje pres (jizda_id, poradi), ktere zna i hromadny INSERT bez ID bodu.
+    poradi = db.Column(db.Integer, nullable=False)
+    normalizovany_text = db.Column(db.String(255), nullable=False)
+
+    jizda = db.relationship("Jizda", back_populates="slova_bodu_trasy")
+
+    __table_args__ = (
+        # Prefix dotazu je rozsah nad textem, index rovnou vraci bod trasy.
+        db.Index("ix_slovo_bodu_trasy_text", "normalizovany_text", "jizda_id", "poradi"),
+        db.Index("ix_slovo_bodu_trasy_jizda_poradi", "jizda_id", "poradi"),
+    )
+
+    def __repr__(self):
+        return f"<SlovoBoduTrasy {self.normalizovany_text} ({self.poradi}) jizda_id={self.jizda_id}>"
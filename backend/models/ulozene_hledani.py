@@ -0,0 +1,55 @@
+from models import db
+from utils.datetime_utils import utc_now
+from utils.text_normalization import normalize_search_text
+
+
+class UlozeneHledani(db.Model):
+    """Ulozene hledani pasazera, na ktere se pri vytvoreni nebo uprave jizdy posila oznameni."""
+
+    __tablename__ = "ulozene_hledani"
+
+    id = db.Column(db.Integer, primary_key=True)
+    uzivatel_id = db.Column(db.Integer, db.ForeignKey("uzivatel.id"), nullable=False, index=True)
+    odkud = db.Column(db.String(255), nullable=True)
+    odkud_place_id = db.Column(db.String(64), nullable=True)
+    kam = db.Column(db.String(255), nullable=True)
+    kam_place_id = db.Column(db.String(64), nullable=True)
+    # Normalizovany text jen u mist bez place_id, kandidati se pak hledaji rovnosti pres index.
+    odkud_normalizovany = db.Column(db.String(255), nullable=True)
+    kam_normalizovany = db.Column(db.String(255), nullable=True)
+    # Prazdne datum znamena otevreny interval na dane strane.
+    datum_od = db.Column(db.Date, nullable=True)
+    datum_do = db.Column(db.Date, nullable=True)
+    pocet_mist = db.Column(db.Integer, nullable=False, default=1)
+    vytvoreno = db.Column(db.DateTime, nullable=False, default=utc_now)
+
+    __table_args__ = (
+        # Nova jizda hleda kandidaty jen pres place_id svych bodu, ne pres vsechna hledani.
+        db.Index("ix_ulozene_hledani_odkud_place_id", "odkud_place_id", "datum_do"),
+        db.Index("ix_ulozene_hledani_kam_place_id", "kam_place_id", "datum_do"),
+        db.Index("ix_ulozene_hledani_odkud_normalizovany", "odkud_normalizovany", "datum_do"),
+        db.Index("ix_ulozene_hledani_kam_normalizovany", "kam_normalizovany", "datum_do"),
+    )
+
+    uzivatel = db.relationship("Uzivatel")
+
+    def nastavit_normalizovany_text(self):
+        """Doplni textove klice pro mista zadana bez place_id."""
+        self.odkud_normalizovany = None if self.odkud_place_id else normalize_search_text(self.odkud) or None
+        self.kam_normalizovany = None if self.kam_place_id else normalize_search_text(self.kam) or None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "odkud": self.odkud,
+            "odkud_place_id": self.odkud_place_id,
+            "kam": self.kam,
+            "kam_place_id": self.kam_place_id,
+            "datum_od": self.datum_od.isoformat() if self.datum_od else None,
+            "datum_do": self.datum_do.isoformat() if self.datum_do else None,
+            "pocet_mist": self.pocet_mist,
+            "vytvoreno": self.vytvoreno.isoformat() if self.vytvoreno else None,
+        }
+
+    def __repr__(self):
+        return f"<UlozeneHledani {self.odkud} -> {self.kam} uzivatel_id={self.uzivatel_id}>"
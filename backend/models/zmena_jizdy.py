@@ -0,0 +1,16 @@
+from models import db
+from utils.datetime_utils import utc_now
+
+
+class ZmenaJizdy(db.Model):
+    """Zaznam o zmene jizdy, podle ktereho si ostatni procesy dorovnaji in-memory index vyhledavani."""
+
+    __tablename__ = "zmena_jizdy"
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Bez cizi klice, zaznam musi prezit i smazani jizdy.
+    jizda_id = db.Column(db.Integer, nullable=False)
+    vytvoreno = db.Column(db.DateTime, nullable=False, default=utc_now, index=True)
+
+    def __repr__(self):
+        return f"<ZmenaJizdy {self.jizda_id}>"
@@ -7,8 +7,8 @@ from models.jizda import Jizda
 from models.oznameni import Oznameni
 from models.uzivatel import Uzivatel
 from utils.api import error_response, get_json_data, get_str_field, parse_positive_int
-from utils.datetime_utils import utc_now
-from utils.pending_ratings import sync_pending_ratings_for_user
+from utils.pending_ratings import get_pending_ratings_for_user
+from utils.ride_lifecycle import jizda_je_dokoncena
 
 hodnoceni_bp = Blueprint("hodnoceni", __name__)
 
@@ -61,13 +61,8 @@ def create_hodnoceni():
     if not jizda:
         return error_response("Jízda nenalezena", 404)
 
-    # Po příjezdu přepneme status na dokoncena, aby šlo hodnocení vytvořit hned.
-    now = utc_now()
-    if jizda.status == "aktivni" and jizda.cas_prijezdu and jizda.cas_prijezdu <= now:
-        jizda.status = "dokoncena"
-        db.session.commit()
-
-    if jizda.status != "dokoncena":
+    # Po příjezdu jde hodnotit hned, status na dokoncena přepne až sweeper.
+    if not jizda_je_dokoncena(jizda):
         return error_response("Hodnotit lze až po dokončení jízdy")
 
     cilovy_uzivatel = db.session.get(Uzivatel, cilovy_uzivatel_id)
@@ -133,7 +128,7 @@ def create_hodnoceni():
 def pending_hodnoceni():
     """Vrátí dokončené jízdy, kde má uživatel stále nevyřešené hodnocení."""
     uzivatel_id = int(get_jwt_identity())
-    pending = sync_pending_ratings_for_user(uzivatel_id, create_notifications=True)
+    pending = get_pending_ratings_for_user(uzivatel_id)
     return jsonify({"pending": pending})
 
 
@@ -1,34 +1,61 @@
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 import re
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from sqlalchemy import or_
+from sqlalchemy import and_, case, false, or_
+from sqlalchemy.orm import selectinload
 
 from models import db
 from models.auto import Auto
 from models.jizda import Jizda
 from models.mezistanice import Mezistanice
 from models.rezervace import Rezervace
+from models.sablona_jizdy import VYCHOZI_CASOVA_ZONA, SablonaJizdy
+from models.ulozene_hledani import UlozeneHledani
 from models.uzivatel import Uzivatel
 from utils.api import (
     error_response,
     get_json_data,
+    parse_bool,
     parse_iso_datetime,
     parse_non_negative_float,
     parse_positive_int,
 )
-from utils.cities import get_city_by_place_id
+from utils.cities import get_city_by_place_id, parse_region_filter
 from utils.datetime_utils import utc_now
-from utils.jizdy import zrusit_jizdu
+from utils.jizdy import (
+    RIDE_LIST_VIEWS,
+    VIEW_FULL,
+    aktualizovat_trasu,
+    najit_kolize_terminu,
+    najit_kolizni_jizdu,
+    serializovat_jizdy,
+    vygenerovat_jizdy_sablony,
+    with_ride_list_loading,
+    with_ride_list_view_loading,
+    zrusit_jizdu,
+)
 from utils.notifications import vytvorit_oznameni
-from utils.text_normalization import normalize_search_text, sanitize_location_text
+from utils.ride_search_engine import get_ride_search_engine
+from utils.pagination import decode_cursor, encode_cursor, keyset_after, parse_page_limit
+from utils.route_points import matching_ride_ids, ordered_match_ride_ids, sync_route_points
+from utils.saved_searches import upozornit_na_ulozena_hledani
+from utils.text_normalization import sanitize_location_text
+from utils.waitlist import naplanovat_povyseni
 
 
 jizdy_bp = Blueprint("jizdy", __name__)
 
 
 LOCATION_ALLOWED_RE = re.compile(r"[^A-Za-zÀ-ž0-9\s-]")
+MAX_DNU_CASOVEHO_OKNA = 31
+# Jedno generování šablony pokryje zhruba čtvrt roku pracovních dnů.
+MAX_POCET_OPAKOVANI = 60
+MAX_ULOZENYCH_HLEDANI = 20
+# Kandidáty z in-memory enginu posíláme do SQL po dávkách, aby IN (...) nenarazil na limit parametrů.
+ENGINE_ID_BATCH_SIZE = 500
 
 
 def _validate_location_field(value, field_name):
@@ -149,97 +176,240 @@ def _collect_important_ride_changes(jizda, previous_state):
     return changed_labels
 
 
-def _route_points_for_ride(ride):
-    """Složí celou trasu do pořadí odkud -> mezistanice -> kam pro vyhledávání."""
-    points = [{
-        "role": "odkud",
-        "position": 0,
-        "text": ride.odkud,
-        "place_id": ride.odkud_place_id,
-    }]
-
-    stops_sorted = sorted(list(ride.mezistanice), key=lambda m: (m.poradi or 0))
-    for index, stop in enumerate(stops_sorted, start=1):
-        points.append({
-            "role": "mezistanice",
-            "position": index,
-            "text": stop.misto,
-            "place_id": stop.misto_place_id,
-        })
-
-    points.append({
-        "role": "kam",
-        "position": len(points),
-        "text": ride.kam,
-        "place_id": ride.kam_place_id,
-    })
-    return points
-
-
-def _matches_query_point(point, query):
-    """Porovná hledanou lokaci buď přes place_id, nebo fallbackem přes text."""
-    if not query:
-        return False
+def _build_search_query_payload(text_key, place_id_key, region_key):
+    """Připraví query payload z URL parametrů jen pokud uživatel vyplnil nějaký filtr.
 
-    query_place_id = query.get("place_id")
-    if query_place_id:
-        return query_place_id == point.get("place_id")
-
-    query_text = normalize_search_text(query.get("text"))
-    point_text = normalize_search_text(point.get("text"))
-    return bool(query_text and point_text and query_text in point_text)
-
-
-def _build_search_query_payload(text_key, place_id_key):
-    """Připraví query payload z URL parametru jen pokud uživatel vyplnil nějaký filtr."""
+    Region (první číslice PSČ) funguje samostatně jako "cokoliv z regionu",
+    nebo spolu s místem jako jeho zúžení. Vrací (payload, chyba).
+    """
     text_value = (request.args.get(text_key) or "").strip()
     place_id_value = (request.args.get(place_id_key) or "").strip() or None
-    if not text_value and not place_id_value:
-        return None
+    regions, region_error = parse_region_filter(request.args.get(region_key))
+    if region_error:
+        return None, region_error
+    if not text_value and not place_id_value and not regions:
+        return None, None
     return {
         "text": text_value,
         "place_id": place_id_value,
-    }
+        "regions": regions,
+    }, None
 
 
-def _classify_ride_match(ride, odkud_query, kam_query):
-    """Rozliší full a partial match podle pořadí bodů na trase."""
-    route_points = _route_points_for_ride(ride)
-    odkud_candidates = [point for point in route_points if point["role"] != "kam"]
-    kam_candidates = [point for point in route_points if point["role"] != "odkud"]
+def _parse_date_arg(name):
+    value = (request.args.get(name) or "").strip()
+    if not value:
+        return None, None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date(), None
+    except ValueError:
+        return None, "Neplatný formát data (YYYY-MM-DD)"
 
-    odkud_positions = [
-        point["position"]
-        for point in odkud_candidates
-        if odkud_query and _matches_query_point(point, odkud_query)
-    ]
-    kam_positions = [
-        point["position"]
-        for point in kam_candidates
-        if kam_query and _matches_query_point(point, kam_query)
-    ]
 
-    has_odkud_match = bool(odkud_query and odkud_positions)
-    has_kam_match = bool(kam_query and kam_positions)
+def _parse_time_arg(name):
+    value = (request.args.get(name) or "").strip()
+    if not value:
+        return None, None
+    try:
+        return datetime.strptime(value, "%H:%M").time(), None
+    except ValueError:
+        return None, "Neplatný formát času (HH:MM)"
+
 
+def _departure_window_conditions():
+    """Převede datum, rozsah dnů a časové okno na polootevřené intervaly nad cas_odjezdu.
+
+    Sloupec zůstává v podmínkách bez funkce, takže dotaz může jít přes index
+    (status, cas_odjezdu). Jízdy, které už odjely, se do výpisu nedostanou nikdy.
+    """
+    parsed = {}
+    for name, parser in [
+        ("datum", _parse_date_arg),
+        ("datum_od", _parse_date_arg),
+        ("datum_do", _parse_date_arg),
+        ("cas_od", _parse_time_arg),
+        ("cas_do", _parse_time_arg),
+    ]:
+        parsed[name], parse_error = parser(name)
+        if parse_error:
+            return None, parse_error
+
+    datum_od = parsed["datum"] or parsed["datum_od"]
+    datum_do = parsed["datum"] or parsed["datum_do"]
+    cas_od = parsed["cas_od"]
+    cas_do = parsed["cas_do"]
+
+    if datum_od and datum_do and datum_do < datum_od:
+        return None, "datum_do nesmí být před datum_od"
+
+    conditions = [Jizda.cas_odjezdu > utc_now()]
+
+    if not cas_od and not cas_do:
+        if datum_od:
+            conditions.append(Jizda.cas_odjezdu >= datetime.combine(datum_od, time.min))
+        if datum_do:
+            conditions.append(Jizda.cas_odjezdu < datetime.combine(datum_do + timedelta(days=1), time.min))
+        return conditions, None
+
+    if not datum_od or not datum_do:
+        return None, "Časové okno vyžaduje datum nebo datum_od a datum_do"
+    if (datum_do - datum_od).days >= MAX_DNU_CASOVEHO_OKNA:
+        return None, f"Časové okno lze použít nejvýše pro {MAX_DNU_CASOVEHO_OKNA} dní"
+    if cas_od and cas_do and cas_do <= cas_od:
+        return None, "cas_do musí být po cas_od"
+
+    # Časové okno rozložíme na jeden interval za každý den, aby každý zůstal indexovatelný.
+    day_ranges = []
+    for offset in range((datum_do - datum_od).days + 1):
+        den = datum_od + timedelta(days=offset)
+        start = datetime.combine(den, cas_od or time.min)
+        end = (
+            datetime.combine(den, cas_do)
+            if cas_do
+            else datetime.combine(den + timedelta(days=1), time.min)
+        )
+        day_ranges.append(and_(Jizda.cas_odjezdu >= start, Jizda.cas_odjezdu < end))
+
+    conditions.append(or_(*day_ranges))
+    return conditions, None
+
+
+def _parse_page_request():
+    """Zjistí, jestli klient chce stránkovaný výpis, a načte limit i kurzor."""
+    raw_limit = request.args.get("limit")
+    raw_cursor = request.args.get("cursor")
+    if raw_limit is None and raw_cursor is None:
+        return None, None
+
+    limit, limit_error = parse_page_limit(raw_limit)
+    if limit_error:
+        return None, limit_error
+
+    cursor, cursor_error = decode_cursor(raw_cursor)
+    if cursor_error:
+        return None, cursor_error
+
+    return {"limit": limit, "cursor": cursor}, None
+
+
+def _parse_view():
+    """Načte režim výpisu z query parametru `view`, výchozí je plný tvar jízdy."""
+    view = (request.args.get("view") or VIEW_FULL).strip().lower()
+    if view not in RIDE_LIST_VIEWS:
+        return None, f"Parametr view musí být jedna z hodnot: {', '.join(RIDE_LIST_VIEWS)}"
+    return view, None
+
+
+def _fetch_page(query, page, *, rank_expression=None):
+    """Načte jednu stránku keyset dotazem; o řádek navíc pozná, jestli existuje další."""
+    if page["cursor"]:
+        query = query.filter(
+            keyset_after(page["cursor"], Jizda.cas_odjezdu, Jizda.id, rank_expression)
+        )
+    rows = query.limit(page["limit"] + 1).all()
+    return rows[: page["limit"]], len(rows) > page["limit"]
+
+
+def _search_match_conditions(odkud_query, kam_query):
+    """Sestaví SQL podmínky pro full a partial match podle pořadí bodů na trase."""
     if odkud_query and kam_query:
-        if has_odkud_match and has_kam_match:
-            # Full match platí jen tehdy, když hledané odkud leží na trase před hledaným kam.
-            if any(i < j for i in odkud_positions for j in kam_positions):
-                return "full"
-            return None
-        if has_odkud_match or has_kam_match:
-            return "partial"
-        return None
+        odkud_ids = matching_ride_ids(odkud_query, excluded_role="kam")
+        kam_ids = matching_ride_ids(kam_query, excluded_role="odkud")
+        # Full match platí jen tehdy, když hledané odkud leží na trase před hledaným kam.
+        full_condition = Jizda.id.in_(ordered_match_ride_ids(odkud_query, kam_query))
+        # Partial match je jízda, která potkala právě jeden z hledaných bodů.
+        partial_condition = or_(
+            and_(Jizda.id.in_(odkud_ids), Jizda.id.not_in(kam_ids)),
+            and_(Jizda.id.not_in(odkud_ids), Jizda.id.in_(kam_ids)),
+        )
+        return full_condition, partial_condition
+
+    if odkud_query:
+        return false(), Jizda.id.in_(matching_ride_ids(odkud_query, excluded_role="kam"))
+    return false(), Jizda.id.in_(matching_ride_ids(kam_query, excluded_role="odkud"))
+
 
-    if has_odkud_match or has_kam_match:
-        return "partial"
-    return None
+def _sql_search_page(query, odkud_query, kam_query, page, view):
+    """Seřadí a stránkuje výsledky vyhledávání celé v SQL; vrací [(jizda, rank)] a příznak další stránky."""
+    full_condition, partial_condition = _search_match_conditions(odkud_query, kam_query)
+    # Full a partial match drží frontend odděleně, ale backend určuje prioritu výsledku.
+    match_rank = case((full_condition, 0), else_=1)
+    query = (
+        with_ride_list_view_loading(query, view)
+        .filter(or_(full_condition, partial_condition))
+        .add_columns(match_rank)
+        .order_by(match_rank, Jizda.cas_odjezdu, Jizda.id)
+    )
+    if page:
+        return _fetch_page(query, page, rank_expression=match_rank)
+    return query.all(), False
+
+
+def _engine_search_page(engine, query, odkud_query, kam_query, page, view):
+    """Vyhledá kandidáty v in-memory enginu a do SQL pošle jen ID jízd vracené stránky.
+
+    Z databáze se pro všechny kandidáty čtou po dávkách jen klíče řazení, takže
+    filtry okna, kapacity a stavu zůstávají v SQL, ale řazení podle (rank, odjezd, id)
+    a kurzor se vyhodnotí v Pythonu. Vrací [(jizda, rank)] a příznak další stránky.
+    """
+    full_ids, partial_ids = engine.match(odkud_query, kam_query)
+    ranks = dict.fromkeys(partial_ids, 1)
+    ranks.update(dict.fromkeys(full_ids, 0))
+
+    candidate_ids = sorted(ranks)
+    key_query = query.with_entities(Jizda.id, Jizda.cas_odjezdu)
+    keys = []
+    for start in range(0, len(candidate_ids), ENGINE_ID_BATCH_SIZE):
+        davka = candidate_ids[start:start + ENGINE_ID_BATCH_SIZE]
+        keys.extend(
+            (ranks[jizda_id], cas_odjezdu, jizda_id)
+            for jizda_id, cas_odjezdu in key_query.filter(Jizda.id.in_(davka)).all()
+        )
+    keys.sort()
+
+    has_more = False
+    if page:
+        cursor = page["cursor"]
+        if cursor and cursor["rank"] is None:
+            keys = [key for key in keys if key[1:] > (cursor["cas_odjezdu"], cursor["jizda_id"])]
+        elif cursor:
+            keys = [key for key in keys if key > (cursor["rank"], cursor["cas_odjezdu"], cursor["jizda_id"])]
+        has_more = len(keys) > page["limit"]
+        keys = keys[: page["limit"]]
+
+    page_ids = [jizda_id for _, _, jizda_id in keys]
+    rides = {}
+    for start in range(0, len(page_ids), ENGINE_ID_BATCH_SIZE):
+        davka = page_ids[start:start + ENGINE_ID_BATCH_SIZE]
+        rides.update(
+            (jizda.id, jizda)
+            for jizda in with_ride_list_view_loading(Jizda.query, view).filter(Jizda.id.in_(davka)).all()
+        )
+    return [(rides[jizda_id], rank) for rank, _, jizda_id in keys if jizda_id in rides], has_more
+
+
+def _ride_conflict_response(kolize, *, termin=None):
+    """409 odpověď, ze které frontend pozná, se kterou jízdou se nový čas kryje."""
+    payload = {
+        "error": "Časy jízd se nesmí krýt a musí mezi nimi být alespoň 5 minut.",
+        "kolizni_jizda": {
+            "id": kolize.id,
+            "odkud": kolize.odkud,
+            "kam": kolize.kam,
+            "cas_odjezdu": kolize.cas_odjezdu.isoformat(),
+            "cas_prijezdu": kolize.cas_prijezdu.isoformat(),
+        },
+    }
+    if termin:
+        payload["termin"] = {"cas_odjezdu": termin[0].isoformat(), "cas_prijezdu": termin[1].isoformat()}
+    return jsonify(payload), 409
 
 
-def _filter_rides_by_volna_mista(jizdy, pocet_pasazeru):
-    """Odstraní jízdy, které nemají dostatek volných míst pro zadaný počet pasažérů."""
-    return [jizda for jizda in jizdy if jizda.ma_dostatek_volnych_mist(pocet_pasazeru)]
+def _filter_query_by_volna_mista(query, pocet_pasazeru):
+    """Nechá v dotazu jen jízdy s dostatkem volných míst přímo v SQL nad citacem obsazenosti."""
+    if not pocet_pasazeru:
+        return query
+    return query.filter(Jizda.pocet_mist - Jizda.obsazena_mista >= pocet_pasazeru)
 
 
 def _notification_recipient_ids_for_cancelled_ride(jizda):
@@ -259,13 +429,20 @@ def get_jizdy():
     Tento endpoint záměrně zůstává jednodušší než /vyhledat.
     Pokud je přítomné place_id, používá přesné porovnání místa.
     Jinak se pro jednoduché procházení vrací k textovému vyhledávání.
+    Při stránkování je `celkem` počet všech jízd filtru a `ma_dalsi` říká,
+    jestli za `next_cursor` následuje další stránka.
     """
     odkud = request.args.get("odkud")
     kam = request.args.get("kam")
     odkud_place_id = (request.args.get("odkud_place_id") or "").strip() or None
     kam_place_id = (request.args.get("kam_place_id") or "").strip() or None
-    datum = request.args.get("datum")
     pocet_pasazeru = request.args.get("pocet_pasazeru", type=int)
+    page, page_error = _parse_page_request()
+    if page_error:
+        return error_response(page_error)
+    view, view_error = _parse_view()
+    if view_error:
+        return error_response(view_error)
 
     query = Jizda.query.filter_by(status="aktivni")
 
@@ -280,16 +457,8 @@ def get_jizdy():
             )
         )
     elif odkud:
-        pattern = f"%{odkud}%"
-        query = query.filter(
-            or_(
-                Jizda.odkud.ilike(pattern),
-                db.session.query(Mezistanice.id)
-                .filter(Mezistanice.jizda_id == Jizda.id)
-                .filter(Mezistanice.misto.ilike(pattern))
-                .exists(),
-            )
-        )
+        # Text se porovnává stejně jako ve /vyhledat: od začátku slov odkud/mezistanic přes slova bodů trasy.
+        query = query.filter(Jizda.id.in_(matching_ride_ids({"text": odkud}, excluded_role="kam")))
 
     if kam_place_id:
         query = query.filter(
@@ -302,28 +471,35 @@ def get_jizdy():
             )
         )
     elif kam:
-        pattern = f"%{kam}%"
-        query = query.filter(
-            or_(
-                Jizda.kam.ilike(pattern),
-                db.session.query(Mezistanice.id)
-                .filter(Mezistanice.jizda_id == Jizda.id)
-                .filter(Mezistanice.misto.ilike(pattern))
-                .exists(),
-            )
-        )
-
-    if datum:
-        try:
-            datum_obj = datetime.strptime(datum, "%Y-%m-%d").date()
-            query = query.filter(db.func.date(Jizda.cas_odjezdu) == datum_obj)
-        except ValueError:
-            return jsonify({"error": "Neplatný formát data (YYYY-MM-DD)"}), 400
-
-    jizdy = query.order_by(Jizda.cas_odjezdu).all()
-    jizdy = _filter_rides_by_volna_mista(jizdy, pocet_pasazeru)
-
-    return jsonify({"jizdy": [j.to_dict() for j in jizdy], "celkem": len(jizdy)})
+        # Text se porovnává stejně jako ve /vyhledat: od začátku slov kam/mezistanic přes slova bodů trasy.
+        query = query.filter(Jizda.id.in_(matching_ride_ids({"text": kam}, excluded_role="odkud")))
+
+    window_conditions, window_error = _departure_window_conditions()
+    if window_error:
+        return error_response(window_error)
+    query = query.filter(*window_conditions)
+
+    query = _filter_query_by_volna_mista(query, pocet_pasazeru)
+    # Celkový počet odpovídá všem jízdám filtru, ne jen vracené stránce.
+    celkem = query.count() if page else None
+    query = with_ride_list_view_loading(query, view).order_by(Jizda.cas_odjezdu, Jizda.id)
+
+    next_cursor = None
+    has_more = False
+    if page:
+        jizdy, has_more = _fetch_page(query, page)
+        if has_more:
+            next_cursor = encode_cursor(cas_odjezdu=jizdy[-1].cas_odjezdu, jizda_id=jizdy[-1].id)
+    else:
+        jizdy = query.all()
+        celkem = len(jizdy)
+
+    return jsonify({
+        "jizdy": serializovat_jizdy(jizdy, view),
+        "celkem": celkem,
+        "ma_dalsi": has_more,
+        "next_cursor": next_cursor,
+    })
 
 
 @jizdy_bp.route("/<int:jizda_id>", methods=["GET"])
@@ -398,26 +574,19 @@ def create_jizda():
         if seats_error:
             return error_response(seats_error)
 
+        okamzita_rezervace, instant_error = parse_bool(data.get("okamzita_rezervace", False), "okamzita_rezervace")
+        if instant_error:
+            return error_response(instant_error)
+
         if cas_odjezdu >= cas_prijezdu:
             return error_response("Čas odjezdu musí být před časem příjezdu")
         if cas_odjezdu <= utc_now():
             return error_response("Čas odjezdu musí být v budoucnosti")
 
         # Řidič by neměl mít dvě prakticky souběžné jízdy, proto hlídáme i krátkou rezervu.
-        existing_rides = Jizda.query.filter_by(
-            ridic_id=uzivatel_id,
-            status="aktivni",
-        ).all()
-        for existing in existing_rides:
-            existing_start = existing.cas_odjezdu
-            existing_end = existing.cas_prijezdu
-            if not existing_start or not existing_end:
-                continue
-            if (
-                cas_odjezdu < (existing_end + timedelta(minutes=5))
-                and cas_prijezdu > (existing_start - timedelta(minutes=5))
-            ):
-                return error_response("Časy jízd se nesmí krýt a musí mezi nimi být alespoň 5 minut.", 409)
+        kolize = najit_kolizni_jizdu(uzivatel_id, cas_odjezdu, cas_prijezdu)
+        if kolize:
+            return _ride_conflict_response(kolize)
 
         jizda = Jizda(
             ridic_id=uzivatel_id,
@@ -433,19 +602,22 @@ def create_jizda():
         jizda.odkud_address = odkud["address"]
         jizda.kam_place_id = kam["place_id"]
         jizda.kam_address = kam["address"]
+        jizda.okamzita_rezervace = okamzita_rezervace
 
         db.session.add(jizda)
         db.session.flush()
 
         for i, misto in enumerate(mezistanice, start=1):
-            db.session.add(Mezistanice(
-                jizda_id=jizda.id,
+            jizda.mezistanice.append(Mezistanice(
                 misto=misto["text"],
                 misto_place_id=misto["place_id"],
                 misto_address=misto["address"],
                 poradi=i,
             ))
 
+        sync_route_points(jizda)
+        # Místo opakovaného pollování vyhledávání upozorníme uložená hledání při zápisu.
+        upozornit_na_ulozena_hledani([jizda])
         db.session.commit()
         return jsonify({"message": "Jízda úspěšně vytvořena", "jizda": jizda.to_dict()}), 201
     except Exception:
@@ -477,6 +649,7 @@ def update_jizda(jizda_id):
         "cas_prijezdu": jizda.cas_prijezdu,
         "auto_label": _get_auto_label(jizda.auto),
     }
+    pribyla_mista = False
 
     try:
         if "auto_id" in data:
@@ -517,10 +690,17 @@ def update_jizda(jizda_id):
             if seats_error:
                 return error_response(seats_error)
 
-            # Kapacitu nenecháme snížit pod již přijatá rezervovaná místa.
-            if new_pocet_mist < jizda.get_pocet_prijatych_mist():
+            pribyla_mista = new_pocet_mist > jizda.pocet_mist
+            # Kapacitu nenecháme snížit pod již přijatá místa ani při souběžném přijetí rezervace.
+            if not jizda.zmenit_pocet_mist(new_pocet_mist):
                 return error_response("Počet míst nemůže být menší než počet již přijatých pasažérů")
-            jizda.pocet_mist = new_pocet_mist
+
+        if "okamzita_rezervace" in data:
+            # Vypnutí platí jen pro nové rezervace, už přijatá místa zůstávají.
+            okamzita_rezervace, instant_error = parse_bool(data.get("okamzita_rezervace"), "okamzita_rezervace")
+            if instant_error:
+                return error_response(instant_error)
+            jizda.okamzita_rezervace = okamzita_rezervace
 
         new_cas_odjezdu = jizda.cas_odjezdu
         new_cas_prijezdu = jizda.cas_prijezdu
@@ -540,43 +720,26 @@ def update_jizda(jizda_id):
             if new_cas_odjezdu <= utc_now():
                 return error_response("Čas odjezdu musí být v budoucnosti")
 
-            existing_rides = Jizda.query.filter_by(
-                ridic_id=uzivatel_id,
-                status="aktivni",
-            ).all()
-            for existing in existing_rides:
-                if existing.id == jizda.id:
-                    continue
-                existing_start = existing.cas_odjezdu
-                existing_end = existing.cas_prijezdu
-                if not existing_start or not existing_end:
-                    continue
-                if (
-                    new_cas_odjezdu < (existing_end + timedelta(minutes=5))
-                    and new_cas_prijezdu > (existing_start - timedelta(minutes=5))
-                ):
-                    return error_response("Časy jízd se nesmí krýt a musí mezi nimi být alespoň 5 minut.", 409)
+            kolize = najit_kolizni_jizdu(
+                uzivatel_id,
+                new_cas_odjezdu,
+                new_cas_prijezdu,
+                ignorovat_jizda_id=jizda.id,
+            )
+            if kolize:
+                return _ride_conflict_response(kolize)
 
         jizda.cas_odjezdu = new_cas_odjezdu
         jizda.cas_prijezdu = new_cas_prijezdu
 
+        mezistanice = None
         if "mezistanice" in data:
-            # Mezistanice se ukládají jako celé nové pořadí, aby zůstala konzistence trasy.
+            # Mezistanice chodí jako celé nové pořadí, uloží se ale jen rozdíl proti stávající trase.
             ok, mezistanice = _validate_mezistanice_list(data)
             if not ok:
                 return jsonify({"error": mezistanice}), 400
 
-            jizda.mezistanice.clear()
-            db.session.flush()
-
-            for i, misto in enumerate(mezistanice, start=1):
-                jizda.mezistanice.append(Mezistanice(
-                    misto=misto["text"],
-                    misto_place_id=misto["place_id"],
-                    misto_address=misto["address"],
-                    poradi=i,
-                ))
-
+        aktualizovat_trasu(jizda, mezistanice)
         changed_labels = _collect_important_ride_changes(jizda, previous_state)
 
         if changed_labels:
@@ -594,7 +757,11 @@ def update_jizda(jizda_id):
                     commit=False,
                 )
 
+        upozornit_na_ulozena_hledani([jizda])
         db.session.commit()
+        if pribyla_mista:
+            # Nová místa obsadí čekající rezervace až worker mimo tento request.
+            naplanovat_povyseni([jizda.id])
         return jsonify({"message": "Jízda úspěšně aktualizována", "jizda": jizda.to_dict()})
     except Exception:
         db.session.rollback()
@@ -633,85 +800,533 @@ def delete_jizda(jizda_id):
         return jsonify({"error": "Chyba při rušení jízdy"}), 500
 
 
-@jizdy_bp.route("/moje", methods=["GET"])
+def _parse_time_value(value, field_name):
+    if not isinstance(value, str) or not value.strip():
+        return None, f"Pole {field_name} musí být čas ve formátu HH:MM"
+    try:
+        return datetime.strptime(value.strip(), "%H:%M").time(), None
+    except ValueError:
+        return None, f"Pole {field_name} musí být čas ve formátu HH:MM"
+
+
+def _parse_casova_zona(value):
+    error = "Pole casova_zona musí být název časové zóny, např. Europe/Prague"
+    if not isinstance(value, str) or not value.strip():
+        return None, error
+    try:
+        ZoneInfo(value.strip())
+    except (ZoneInfoNotFoundError, ValueError):
+        return None, error
+    return value.strip(), None
+
+
+def _parse_dny_v_tydnu(value):
+    """Dny v týdnu jsou čísla 0 (pondělí) až 6 (neděle) jako u date.weekday()."""
+    if not isinstance(value, list) or not value:
+        return None, "Pole dny_v_tydnu musí být neprázdný seznam dnů 0-6"
+    if any(isinstance(den, bool) or not isinstance(den, int) or not 0 <= den <= 6 for den in value):
+        return None, "Pole dny_v_tydnu musí být neprázdný seznam dnů 0-6"
+    return sorted(set(value)), None
+
+
+def _doba_jizdy_minut(cas_odjezdu, cas_prijezdu):
+    """Příjezd ve stejný nebo dřívější čas než odjezd znamená příjezd další den."""
+    odjezd = cas_odjezdu.hour * 60 + cas_odjezdu.minute
+    prijezd = cas_prijezdu.hour * 60 + cas_prijezdu.minute
+    return (prijezd - odjezd) % (24 * 60) or 24 * 60
+
+
+def _parse_sablona_payload(data, uzivatel_id):
+    """Převede pole šablony přítomná v requestu na hodnoty modelu, vrací (hodnoty, chyba)."""
+    values = {}
+
+    if "auto_id" in data:
+        auto_id, auto_error = parse_positive_int(data.get("auto_id"), "auto_id")
+        if auto_error:
+            return None, error_response(auto_error)
+        auto = Auto.query.filter_by(id=auto_id, profil_id=uzivatel_id, smazane=False).first()
+        if not auto:
+            return None, error_response("Auto nenalezeno nebo nepatří uživateli", 404)
+        values["auto_id"] = auto.id
+
+    for field_name in ("odkud", "kam"):
+        if field_name in data:
+            ok, location = _extract_location_payload(data, field_name, required=True)
+            if not ok:
+                return None, error_response(location)
+            values[field_name] = location["text"]
+            values[f"{field_name}_place_id"] = location["place_id"]
+            values[f"{field_name}_address"] = location["address"]
+
+    if "mezistanice" in data:
+        ok, mezistanice = _validate_mezistanice_list(data)
+        if not ok:
+            return None, error_response(mezistanice)
+        values["mezistanice"] = mezistanice
+
+    if "cena" in data:
+        values["cena"], price_error = parse_non_negative_float(data.get("cena"), "cena")
+        if price_error:
+            return None, error_response(price_error)
+
+    if "pocet_mist" in data:
+        values["pocet_mist"], seats_error = parse_positive_int(data.get("pocet_mist"), "pocet_mist")
+        if seats_error:
+            return None, error_response(seats_error)
+
+    if "okamzita_rezervace" in data:
+        values["okamzita_rezervace"], instant_error = parse_bool(
+            data.get("okamzita_rezervace"), "okamzita_rezervace"
+        )
+        if instant_error:
+            return None, error_response(instant_error)
+
+    for field_name in ("cas_odjezdu", "cas_prijezdu"):
+        if field_name in data:
+            values[field_name], time_error = _parse_time_value(data.get(field_name), field_name)
+            if time_error:
+                return None, error_response(time_error)
+
+    if "casova_zona" in data:
+        values["casova_zona"], zone_error = _parse_casova_zona(data.get("casova_zona"))
+        if zone_error:
+            return None, error_response(zone_error)
+
+    if "dny_v_tydnu" in data:
+        values["dny_v_tydnu"], days_error = _parse_dny_v_tydnu(data.get("dny_v_tydnu"))
+        if days_error:
+            return None, error_response(days_error)
+
+    return values, None
+
+
+def _parse_generovani(data, default_od):
+    """Vrátí (datum_od, pocet_opakovani) pro generování termínů, nebo chybovou odpověď."""
+    pocet, count_error = parse_positive_int(data.get("pocet_opakovani"), "pocet_opakovani")
+    if count_error:
+        return None, error_response(count_error)
+    if pocet > MAX_POCET_OPAKOVANI:
+        return None, error_response(f"Najednou lze vygenerovat nejvýše {MAX_POCET_OPAKOVANI} jízd")
+
+    datum_od = default_od
+    if data.get("datum_od") is not None:
+        try:
+            datum_od = datetime.strptime(str(data["datum_od"]).strip(), "%Y-%m-%d").date()
+        except ValueError:
+            return None, error_response("Neplatný formát data (YYYY-MM-DD)")
+    return (datum_od, pocet), None
+
+
+def _template_conflict_response(terminy, kolize):
+    index, kolizni = kolize
+    if isinstance(kolizni, int):
+        return error_response("Termíny šablony se navzájem překrývají")
+    return _ride_conflict_response(kolizni, termin=terminy[index])
+
+
+def _get_owned_sablona(sablona_id, uzivatel_id):
+    sablona = db.session.get(SablonaJizdy, sablona_id)
+    if not sablona:
+        return None, error_response("Šablona nenalezena", 404)
+    if sablona.ridic_id != uzivatel_id:
+        return None, error_response("Nemáte oprávnění upravovat tuto šablonu", 403)
+    return sablona, None
+
+
+def _load_rides_by_ids(jizda_ids):
+    if not jizda_ids:
+        return []
+    return (
+        with_ride_list_loading(Jizda.query.filter(Jizda.id.in_(jizda_ids)))
+        .order_by(Jizda.cas_odjezdu, Jizda.id)
+        .all()
+    )
+
+
+def _budouci_volne_jizdy_sablony(sablona):
+    """Budoucí aktivní termíny šablony bez přijatých i čekajících rezervací."""
+    return (
+        Jizda.query.filter(
+            Jizda.sablona_id == sablona.id,
+            Jizda.status == "aktivni",
+            Jizda.cas_odjezdu > utc_now(),
+            Jizda.obsazena_mista == 0,
+            Jizda.pocet_cekajicich == 0,
+        )
+        .options(selectinload(Jizda.mezistanice), selectinload(Jizda.body_trasy))
+        .order_by(Jizda.cas_odjezdu, Jizda.id)
+        .all()
+    )
+
+
+@jizdy_bp.route("/sablony", methods=["GET"])
 @jwt_required()
-def get_moje_jizdy():
-    """Vrátí jízdy řidiče i pasažéra a dodělá automatické dokončení po příjezdu."""
+def get_sablony():
+    uzivatel_id = int(get_jwt_identity())
+    sablony = SablonaJizdy.query.filter_by(ridic_id=uzivatel_id).order_by(SablonaJizdy.id).all()
+    return jsonify({"sablony": [sablona.to_dict() for sablona in sablony]})
+
+
+@jizdy_bp.route("/sablony", methods=["POST"])
+@jwt_required()
+def create_sablona():
+    """Vytvoří šablonu opakované jízdy a v jedné transakci vygeneruje její termíny."""
+    uzivatel_id = int(get_jwt_identity())
+    data, error = get_json_data()
+    if error:
+        return error
+
+    required_fields = [
+        "auto_id",
+        "odkud",
+        "kam",
+        "cas_odjezdu",
+        "cas_prijezdu",
+        "cena",
+        "pocet_mist",
+        "dny_v_tydnu",
+        "pocet_opakovani",
+    ]
+    for field in required_fields:
+        if field not in data:
+            return error_response(f"Pole {field} je povinné")
+
+    values, error = _parse_sablona_payload(data, uzivatel_id)
+    if error:
+        return error
+
+    sablona = SablonaJizdy(
+        ridic_id=uzivatel_id,
+        auto_id=values["auto_id"],
+        odkud=values["odkud"],
+        odkud_place_id=values["odkud_place_id"],
+        odkud_address=values["odkud_address"],
+        kam=values["kam"],
+        kam_place_id=values["kam_place_id"],
+        kam_address=values["kam_address"],
+        cas_odjezdu=values["cas_odjezdu"],
+        casova_zona=values.get("casova_zona", VYCHOZI_CASOVA_ZONA),
+        doba_jizdy=_doba_jizdy_minut(values["cas_odjezdu"], values["cas_prijezdu"]),
+        cena=values["cena"],
+        pocet_mist=values["pocet_mist"],
+        okamzita_rezervace=values.get("okamzita_rezervace", False),
+    )
+    sablona.set_mezistanice(values.get("mezistanice"))
+    sablona.set_dny_v_tydnu(values["dny_v_tydnu"])
+
+    generovani, error = _parse_generovani(data, sablona.lokalni_den(utc_now()))
+    if error:
+        return error
+
+    terminy = sablona.terminy(*generovani)
+    kolize = najit_kolize_terminu(uzivatel_id, terminy)
+    if kolize:
+        return _template_conflict_response(terminy, kolize)
+
+    try:
+        db.session.add(sablona)
+        jizda_ids = vygenerovat_jizdy_sablony(sablona, terminy)
+        jizdy = _load_rides_by_ids(jizda_ids)
+        upozornit_na_ulozena_hledani(jizdy)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        return error_response("Chyba při vytváření šablony jízdy", 500)
+
+    return jsonify({
+        "message": f"Šablona vytvořena, vygenerováno jízd: {len(jizda_ids)}",
+        "sablona": sablona.to_dict(),
+        "jizdy": [jizda.to_dict() for jizda in jizdy],
+    }), 201
+
+
+@jizdy_bp.route("/sablony/<int:sablona_id>/generovat", methods=["POST"])
+@jwt_required()
+def generovat_jizdy_sablony(sablona_id):
+    """Vygeneruje další termíny šablony, standardně navazující na poslední existující."""
     uzivatel_id = int(get_jwt_identity())
+    sablona, error = _get_owned_sablona(sablona_id, uzivatel_id)
+    if error:
+        return error
+    data, error = get_json_data()
+    if error:
+        return error
 
-    jizdy_ridic = Jizda.query.filter_by(ridic_id=uzivatel_id).all()
-    uzivatel = db.session.get(Uzivatel, uzivatel_id)
-    jizdy_pasazer = uzivatel.jizdy_pasazer if uzivatel else []
-    vsechny_jizdy = jizdy_ridic + list(jizdy_pasazer)
+    posledni_odjezd = db.session.scalar(
+        db.select(db.func.max(Jizda.cas_odjezdu)).where(Jizda.sablona_id == sablona.id)
+    )
+    default_od = (
+        sablona.lokalni_den(posledni_odjezd) + timedelta(days=1)
+        if posledni_odjezd
+        else sablona.lokalni_den(utc_now())
+    )
+    generovani, error = _parse_generovani(data, default_od)
+    if error:
+        return error
 
-    changed = False
-    # Dokončení děláme lazy při čtení, aby se staré aktivní jízdy samy dorovnaly i bez cron jobu.
-    for jizda in vsechny_jizdy:
-        if jizda.status == "aktivni" and jizda.cas_prijezdu < datetime.now():
-            jizda.status = "dokoncena"
-            changed = True
+    terminy = sablona.terminy(*generovani)
+    kolize = najit_kolize_terminu(uzivatel_id, terminy)
+    if kolize:
+        return _template_conflict_response(terminy, kolize)
 
-    if changed:
+    try:
+        jizda_ids = vygenerovat_jizdy_sablony(sablona, terminy)
+        jizdy = _load_rides_by_ids(jizda_ids)
+        upozornit_na_ulozena_hledani(jizdy)
         db.session.commit()
+    except Exception:
+        db.session.rollback()
+        return error_response("Chyba při generování jízd šablony", 500)
 
-    return jsonify([j.to_dict() for j in vsechny_jizdy])
+    return jsonify({
+        "message": f"Vygenerováno jízd: {len(jizda_ids)}",
+        "jizdy": [jizda.to_dict() for jizda in jizdy],
+    }), 201
 
 
-@jizdy_bp.route("/vyhledat", methods=["GET"])
-def vyhledat_jizdy():
-    """Vrátí jízdy seřazené tak, aby full match měl přednost před partial match."""
-    datum = (request.args.get("datum") or "").strip()
-    pocet_pasazeru = request.args.get("pocet_pasazeru", type=int) or 1
-    odkud_query = _build_search_query_payload("odkud", "odkud_place_id")
-    kam_query = _build_search_query_payload("kam", "kam_place_id")
+@jizdy_bp.route("/sablony/<int:sablona_id>", methods=["PUT"])
+@jwt_required()
+def update_sablona(sablona_id):
+    """Upraví šablonu a změny propíše do budoucích termínů, které nikdo nerezervoval.
 
-    query = Jizda.query.filter_by(status="aktivni")
-    if datum:
-        try:
-            datum_obj = datetime.strptime(datum, "%Y-%m-%d").date()
-            query = query.filter(db.func.date(Jizda.cas_odjezdu) == datum_obj)
-        except ValueError:
-            return jsonify({"error": "Neplatný formát data (YYYY-MM-DD)"}), 400
+    Termíny s rezervací zůstávají beze změny, aby se pasažérům domluvená
+    jízda neposunula. Změna dnů v týdnu ovlivní jen další generování.
+    """
+    uzivatel_id = int(get_jwt_identity())
+    sablona, error = _get_owned_sablona(sablona_id, uzivatel_id)
+    if error:
+        return error
+    data, error = get_json_data()
+    if error:
+        return error
 
-    all_rides = query.all()
-    full_match = []
-    partial_match = []
+    values, error = _parse_sablona_payload(data, uzivatel_id)
+    if error:
+        return error
 
-    # Full a partial match drží frontend odděleně, ale backend určuje prioritu výsledku.
-    for ride in all_rides:
-        match_type = _classify_ride_match(ride, odkud_query, kam_query)
-        if match_type == "full":
-            full_match.append(ride)
-        elif match_type == "partial":
-            partial_match.append(ride)
-
-    result = []
-    seen_ids = set()
-
-    for ride in full_match:
-        if ride.id in seen_ids or not ride.ma_dostatek_volnych_mist(pocet_pasazeru):
-            continue
-        seen_ids.add(ride.id)
-        result.append({"match_type": "full", "ride": ride.to_dict()})
+    zmena_casu = any(field in values for field in ("cas_odjezdu", "cas_prijezdu", "casova_zona"))
+    zmena_trasy = any(field in values for field in ("odkud", "kam", "mezistanice"))
+    jizdy = _budouci_volne_jizdy_sablony(sablona)
+    # Místní den termínu se určuje ještě podle původní zóny šablony.
+    dny_terminu = {jizda.id: sablona.lokalni_den(jizda.cas_odjezdu) for jizda in jizdy}
+    if zmena_casu:
+        # Bez nového času příjezdu zůstává zachovaná doba jízdy.
+        sablona.cas_odjezdu = values.get("cas_odjezdu", sablona.cas_odjezdu)
+        sablona.casova_zona = values.get("casova_zona", sablona.casova_zona)
+        if "cas_prijezdu" in values:
+            sablona.doba_jizdy = _doba_jizdy_minut(sablona.cas_odjezdu, values["cas_prijezdu"])
+    for field_name in (
+        "auto_id", "odkud", "odkud_place_id", "odkud_address", "kam", "kam_place_id", "kam_address",
+        "cena", "pocet_mist", "okamzita_rezervace",
+    ):
+        if field_name in values:
+            setattr(sablona, field_name, values[field_name])
+    if "mezistanice" in values:
+        sablona.set_mezistanice(values["mezistanice"])
+    if "dny_v_tydnu" in values:
+        sablona.set_dny_v_tydnu(values["dny_v_tydnu"])
+
+    if zmena_casu:
+        now = utc_now()
+        # Termín, který by se novým časem posunul do minulosti, necháme tak, jak je.
+        jizdy = [jizda for jizda in jizdy if sablona.casy_terminu(dny_terminu[jizda.id])[0] > now]
+        terminy = [sablona.casy_terminu(dny_terminu[jizda.id]) for jizda in jizdy]
+        kolize = najit_kolize_terminu(
+            uzivatel_id, terminy, ignorovat_jizda_ids=[jizda.id for jizda in jizdy]
+        )
+        if kolize:
+            db.session.rollback()
+            return _template_conflict_response(terminy, kolize)
 
-    for ride in partial_match:
-        if ride.id in seen_ids or not ride.ma_dostatek_volnych_mist(pocet_pasazeru):
-            continue
-        seen_ids.add(ride.id)
-        result.append({"match_type": "partial", "ride": ride.to_dict()})
+    try:
+        if "pocet_mist" in values:
+            # Termín, na kterém mezitím někdo obsadil víc míst, než má nová kapacita, zůstane beze změny.
+            jizdy = [jizda for jizda in jizdy if jizda.zmenit_pocet_mist(sablona.pocet_mist)]
+        for jizda in jizdy:
+            if zmena_casu:
+                jizda.cas_odjezdu, jizda.cas_prijezdu = sablona.casy_terminu(dny_terminu[jizda.id])
+            sablona.prenest_na_jizdu(jizda, vcetne_mezistanic=False)
+            if zmena_trasy:
+                aktualizovat_trasu(jizda, sablona.get_mezistanice() if "mezistanice" in values else None)
+        upozornit_na_ulozena_hledani(jizdy)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        return error_response("Chyba při aktualizaci šablony jízdy", 500)
+
+    return jsonify({
+        "message": "Šablona jízdy aktualizována",
+        "sablona": sablona.to_dict(),
+        "aktualizovane_jizdy": [jizda.id for jizda in jizdy],
+    })
+
+
+def _parse_date_value(value, field_name):
+    if value is None or value == "":
+        return None, None
+    try:
+        return datetime.strptime(str(value).strip(), "%Y-%m-%d").date(), None
+    except ValueError:
+        return None, f"Pole {field_name} má neplatný formát data (YYYY-MM-DD)"
+
+
+@jizdy_bp.route("/ulozena-hledani", methods=["GET"])
+@jwt_required()
+def get_ulozena_hledani():
+    uzivatel_id = int(get_jwt_identity())
+    hledani = UlozeneHledani.query.filter_by(uzivatel_id=uzivatel_id).order_by(UlozeneHledani.id).all()
+    return jsonify({"ulozena_hledani": [item.to_dict() for item in hledani]})
+
+
+@jizdy_bp.route("/ulozena-hledani", methods=["POST"])
+@jwt_required()
+def create_ulozene_hledani():
+    """Uloží hledání, na které uživatel dostane oznámení, jakmile se objeví odpovídající jízda."""
+    uzivatel_id = int(get_jwt_identity())
+    data, error = get_json_data()
+    if error:
+        return error
+
+    ok, odkud = _extract_location_payload(data, "odkud", required=False)
+    if not ok:
+        return error_response(odkud)
+    ok, kam = _extract_location_payload(data, "kam", required=False)
+    if not ok:
+        return error_response(kam)
+    if not odkud and not kam:
+        return error_response("Vyplňte alespoň odkud nebo kam")
+
+    datum_od, date_error = _parse_date_value(data.get("datum_od"), "datum_od")
+    if date_error:
+        return error_response(date_error)
+    datum_do, date_error = _parse_date_value(data.get("datum_do"), "datum_do")
+    if date_error:
+        return error_response(date_error)
+    if datum_od and datum_do and datum_od > datum_do:
+        return error_response("Datum od musí být před datem do")
+    if datum_do and datum_do < utc_now().date():
+        return error_response("Datum do nesmí být v minulosti")
+
+    pocet_mist, seats_error = parse_positive_int(data.get("pocet_mist", 1), "pocet_mist")
+    if seats_error:
+        return error_response(seats_error)
+
+    if UlozeneHledani.query.filter_by(uzivatel_id=uzivatel_id).count() >= MAX_ULOZENYCH_HLEDANI:
+        return error_response(f"Uložit lze nejvýše {MAX_ULOZENYCH_HLEDANI} hledání")
+
+    hledani = UlozeneHledani(
+        uzivatel_id=uzivatel_id,
+        odkud=odkud["text"] if odkud else None,
+        odkud_place_id=odkud["place_id"] if odkud else None,
+        kam=kam["text"] if kam else None,
+        kam_place_id=kam["place_id"] if kam else None,
+        datum_od=datum_od,
+        datum_do=datum_do,
+        pocet_mist=pocet_mist,
+    )
+    hledani.nastavit_normalizovany_text()
+    db.session.add(hledani)
+    db.session.commit()
+    return jsonify({"message": "Hledání uloženo", "ulozene_hledani": hledani.to_dict()}), 201
+
+
+@jizdy_bp.route("/ulozena-hledani/<int:hledani_id>", methods=["DELETE"])
+@jwt_required()
+def delete_ulozene_hledani(hledani_id):
+    uzivatel_id = int(get_jwt_identity())
+    hledani = db.session.get(UlozeneHledani, hledani_id)
+    if not hledani:
+        return error_response("Uložené hledání nenalezeno", 404)
+    if hledani.uzivatel_id != uzivatel_id:
+        return error_response("Nemáte oprávnění smazat toto hledání", 403)
+
+    db.session.delete(hledani)
+    db.session.commit()
+    return jsonify({"message": "Uložené hledání smazáno"})
+
+
+@jizdy_bp.route("/moje", methods=["GET"])
+@jwt_required()
+def get_moje_jizdy():
+    """Vrátí jízdy řidiče i pasažéra; dokončení po příjezdu řeší sweeper mimo request."""
+    uzivatel_id = int(get_jwt_identity())
+
+    jizdy_ridic = with_ride_list_loading(Jizda.query.filter_by(ridic_id=uzivatel_id)).all()
+    jizdy_pasazer = with_ride_list_loading(
+        Jizda.query.filter(Jizda.pasazeri.any(Uzivatel.id == uzivatel_id))
+    ).all()
+    vsechny_jizdy = jizdy_ridic + jizdy_pasazer
+
+    return jsonify([j.to_dict() for j in vsechny_jizdy])
+
+
+@jizdy_bp.route("/vyhledat", methods=["GET"])
+def vyhledat_jizdy():
+    """Vrátí jízdy seřazené tak, aby full match měl přednost před partial match.
 
+    Bez parametrů `limit`/`cursor` vrací celý seznam jako pole. Se stránkováním vrací
+    objekt s `vysledky` a `next_cursor`, který se předá zpět jako `cursor`.
+    """
+    pocet_pasazeru = request.args.get("pocet_pasazeru", type=int) or 1
+    odkud_query, odkud_error = _build_search_query_payload("odkud", "odkud_place_id", "odkud_region")
+    if odkud_error:
+        return error_response(odkud_error)
+    kam_query, kam_error = _build_search_query_payload("kam", "kam_place_id", "kam_region")
+    if kam_error:
+        return error_response(kam_error)
+    page, page_error = _parse_page_request()
+    if page_error:
+        return error_response(page_error)
+    view, view_error = _parse_view()
+    if view_error:
+        return error_response(view_error)
+
+    window_conditions, window_error = _departure_window_conditions()
+    if window_error:
+        return error_response(window_error)
+    if not odkud_query and not kam_query:
+        return jsonify({"vysledky": [], "next_cursor": None} if page else [])
+
+    query = Jizda.query.filter_by(status="aktivni").filter(*window_conditions)
+    query = _filter_query_by_volna_mista(query, pocet_pasazeru)
+    engine = get_ride_search_engine()
+    if engine is not None:
+        rides, has_more = _engine_search_page(engine, query, odkud_query, kam_query, page, view)
+    else:
+        rides, has_more = _sql_search_page(query, odkud_query, kam_query, page, view)
+
+    next_cursor = None
+    if has_more:
+        last_ride, last_rank = rides[-1]
+        next_cursor = encode_cursor(
+            cas_odjezdu=last_ride.cas_odjezdu,
+            jizda_id=last_ride.id,
+            rank=last_rank,
+        )
+
+    serialized = serializovat_jizdy([ride for ride, _ in rides], view)
+    result = [
+        {"match_type": "full" if rank == 0 else "partial", "ride": ride}
+        for ride, (_, rank) in zip(serialized, rides)
+    ]
+    if page:
+        return jsonify({"vysledky": result, "next_cursor": next_cursor})
     return jsonify(result)
 
 
 @jizdy_bp.route("/nejnovejsi", methods=["GET"])
 def nejnovejsi_jizdy():
+    view, view_error = _parse_view()
+    if view_error:
+        return error_response(view_error)
+
     jizdy = (
-        Jizda.query.filter_by(status="aktivni")
+        with_ride_list_view_loading(Jizda.query.filter_by(status="aktivni"), view)
         .order_by(Jizda.id.desc())
         .limit(10)
         .all()
     )
-    return jsonify([j.to_dict() for j in jizdy])
+    return jsonify(serializovat_jizdy(jizdy, view))
 
 
 @jizdy_bp.route("/<int:jizda_id>/pasazeri/<int:pasazer_id>", methods=["DELETE"])
@@ -745,9 +1360,12 @@ def vyhodit_pasazera(jizda_id, pasazer_id):
 
     jizda.pasazeri.remove(pasazer)
     rez = Rezervace.query.filter_by(jizda_id=jizda_id, uzivatel_id=pasazer_id).first()
+    uvolnena_mista = rez is not None and rez.status == "prijata"
     if rez:
-        rez.status = "vyhozen"
+        rez.zmenit_status("vyhozen")
         rez.updated_at = datetime.now()
 
     db.session.commit()
+    if uvolnena_mista:
+        naplanovat_povyseni([jizda.id])
     return jsonify({"message": "Pasažér byl vyhozen."}), 200
@@ -1,17 +1,46 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 
-from utils.cities import search_cities
+from utils.api import error_response
+from utils.cities import cities_dataset_etag, parse_region_filter, search_cities
 
 
 mesta_bp = Blueprint("mesta", __name__)
 
+# Výsledek závisí jen na URL a datasetu měst; nový cities.json změní i ETag.
+CACHE_MAX_AGE = 24 * 60 * 60
+
+
+def _with_http_cache(response, etag):
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = CACHE_MAX_AGE
+    return response
+
 
 @mesta_bp.route("", methods=["GET"])
 def get_mesta():
+    etag = cities_dataset_etag()
+    if request.if_none_match.contains(etag):
+        return _with_http_cache(Response(status=304), etag)
+
     query = (request.args.get("q") or "").strip()
     include_address = request.args.get("search_address", "1").strip().lower() not in {"0", "false", "no"}
+    # Řazení a fuzzy jsou opt-in, výchozí odpověď zůstává v pořadí souboru.
+    ranked = request.args.get("ranked", "0").strip().lower() not in {"0", "false", "no"}
+    fuzzy = request.args.get("fuzzy", "0").strip().lower() not in {"0", "false", "no"}
+    regions, region_error = parse_region_filter(request.args.get("region"))
+    if region_error:
+        return error_response(region_error)
 
     if len(query) < 2:
-        return jsonify([])
+        return _with_http_cache(jsonify([]), etag)
 
-    return jsonify(search_cities(query, include_address=include_address, limit=10))
+    results = search_cities(
+        query,
+        include_address=include_address,
+        limit=10,
+        ranked=ranked,
+        fuzzy=fuzzy,
+        regions=regions,
+    )
+    return _with_http_cache(jsonify(results), etag)
@@ -2,15 +2,26 @@ from datetime import datetime, timedelta
 
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
+from sqlalchemy.orm import joinedload
 
 from models import db
 from models.jizda import Jizda
+from models.profil import Profil
 from models.rezervace import Rezervace
+from models.uzivatel import Uzivatel
 from utils.api import error_response, get_json_data, get_str_field, parse_positive_int
 from utils.datetime_utils import utc_now
+from utils.jizdy import with_ride_list_loading
 from utils.notifications import vytvorit_oznameni
-from utils.pending_ratings import sync_pending_ratings_for_user
+from utils.pagination import (
+    decode_created_cursor,
+    encode_created_cursor,
+    keyset_before_created,
+    parse_page_limit,
+)
+from utils.pending_ratings import get_pending_ratings_for_user
 from utils.reservations import annotate_waiting_queue_positions
+from utils.waitlist import naplanovat_povyseni
 
 
 rezervace_bp = Blueprint("rezervace", __name__)
@@ -93,7 +104,7 @@ def create_rezervace():
         return jsonify({"error": chyba_dalsich_pasazeru}), 400
 
     # Dokud uživatel nedokončí povinné hodnocení předchozí jízdy, další rezervaci nepustíme.
-    pending = sync_pending_ratings_for_user(uzivatel_id, create_notifications=True)
+    pending = get_pending_ratings_for_user(uzivatel_id)
     if pending:
         return jsonify(
             {
@@ -131,26 +142,48 @@ def create_rezervace():
             pocet_mist=pocet_mist,
             dalsi_pasazeri=dalsi_pasazeri,
         )
+        # Okamžitá rezervace zabere místa podmíněným UPDATE; když je mezitím někdo
+        # vyprodá, rezervace spadne do běžné fronty ke schválení řidičem.
+        okamzita = jizda.okamzita_rezervace and jizda.obsadit_mista(pocet_mist)
+        if okamzita:
+            rezervace.status = "prijata"
 
         db.session.add(rezervace)
         db.session.flush()
 
         passenger_name = _get_user_display_name(rezervace.uzivatel)
-        vytvorit_oznameni(
-            jizda.ridic_id,
-            f"Přišla nová rezervace od {passenger_name} na jízdu {jizda.odkud} -> {jizda.kam}.",
-            "rezervace_nova",
-            kategorie="rezervace",
-            odesilatel_id=uzivatel_id,
-            target_path=f"/moje-jizdy?focusRide={jizda.id}&openReservations=1",
-            jizda_id=jizda.id,
-            rezervace_id=rezervace.id,
-            commit=False,
-        )
+        if okamzita:
+            jizda.pasazeri.append(rezervace.uzivatel)
+            vytvorit_oznameni(
+                jizda.ridic_id,
+                f"{passenger_name} si okamžitě rezervoval(a) místo na jízdu {jizda.odkud} -> {jizda.kam}.",
+                "rezervace_okamzita",
+                kategorie="rezervace",
+                odesilatel_id=uzivatel_id,
+                target_path=f"/moje-jizdy?focusRide={jizda.id}",
+                jizda_id=jizda.id,
+                rezervace_id=rezervace.id,
+                commit=False,
+            )
+        else:
+            jizda.upravit_obsazenost(cekajici=1)
+            vytvorit_oznameni(
+                jizda.ridic_id,
+                f"Přišla nová rezervace od {passenger_name} na jízdu {jizda.odkud} -> {jizda.kam}.",
+                "rezervace_nova",
+                kategorie="rezervace",
+                odesilatel_id=uzivatel_id,
+                target_path=f"/moje-jizdy?focusRide={jizda.id}&openReservations=1",
+                jizda_id=jizda.id,
+                rezervace_id=rezervace.id,
+                commit=False,
+            )
 
         db.session.commit()
-        annotate_waiting_queue_positions([rezervace])
+        if okamzita:
+            return jsonify({"message": "Rezervace potvrzena", "rezervace": rezervace.to_dict()}), 201
 
+        annotate_waiting_queue_positions([rezervace])
         return jsonify(
             {"message": "Rezervace úspěšně vytvořena", "rezervace": rezervace.to_dict()}
         ), 201
@@ -163,37 +196,28 @@ def create_rezervace():
 @rezervace_bp.route("/<int:rezervace_id>/prijmout", methods=["POST"])
 @jwt_required()
 def prijmout_rezervaci(rezervace_id):
-    """Přijme čekající rezervaci pod zámkem, aby se kapacita nerozbila souběhem."""
+    """Přijme čekající rezervaci podmíněným zabráním míst, aby souběh nepřeprodal kapacitu."""
     uzivatel_id = int(get_jwt_identity())
 
-    # with_for_update chrání kapacitu před souběžnými pokusy o přijetí více rezervací.
-    rezervace = (
-        Rezervace.query.filter_by(id=rezervace_id)
-        .with_for_update()
-        .first_or_404()
-    )
-    jizda = Jizda.query.filter_by(id=rezervace.jizda_id).with_for_update().first()
+    rezervace = Rezervace.query.get_or_404(rezervace_id)
+    jizda = rezervace.jizda
 
-    if rezervace.jizda.ridic_id != uzivatel_id:
+    if jizda.ridic_id != uzivatel_id:
         return error_response("Nemáte oprávnění přijmout tuto rezervaci", 403)
 
     if rezervace.status != "cekajici":
         return error_response("Rezervace již byla zpracována")
 
     try:
-        if not jizda:
-            db.session.rollback()
-            return error_response("Jízda nenalezena", 404)
-
         if jizda.status in {"zrusena", "dokoncena"}:
-            db.session.rollback()
             return error_response("Rezervaci lze přijmout jen u aktivní jízdy")
 
-        if not jizda.ma_dostatek_volnych_mist(rezervace.pocet_mist):
+        # Rozhoduje až rowcount podmíněných UPDATE, předchozí kontroly jen šetří zápis.
+        prijato, chyba = rezervace.prijmout()
+        if not prijato:
             db.session.rollback()
-            return error_response("Jízda je plně obsazena")
+            return error_response(chyba)
 
-        rezervace.prijmout()
         vytvorit_oznameni(
             rezervace.uzivatel_id,
             f"Řidič přijal tvoji rezervaci na jízdu {jizda.odkud} -> {jizda.kam}.",
@@ -274,44 +298,100 @@ def zrusit_rezervaci(rezervace_id):
     if now > (jizda.cas_odjezdu - timedelta(hours=1)):
         return error_response("Jízdu lze opustit nejpozději 1 hodinu před odjezdem.")
 
-    rez.status = "zrusena"
+    uvolnena_mista = rez.status == "prijata"
+    rez.zmenit_status("zrusena")
     pasazer = next((u for u in jizda.pasazeri if u.id == user_id), None)
     if pasazer:
         jizda.pasazeri.remove(pasazer)
 
     db.session.commit()
+    if uvolnena_mista:
+        naplanovat_povyseni([jizda.id])
     return jsonify({"message": "Rezervace byla zrušena a jízdu jste opustil."}), 200
 
 
+def _parse_moje_rezervace_page():
+    """Stránkování přehledu je volitelné stejně jako u výpisů jízd."""
+    raw_limit = request.args.get("limit")
+    raw_cursor = request.args.get("cursor")
+    if raw_limit is None and raw_cursor is None:
+        return None, None
+
+    limit, limit_error = parse_page_limit(raw_limit)
+    if limit_error:
+        return None, limit_error
+
+    cursor, cursor_error = decode_created_cursor(raw_cursor)
+    if cursor_error:
+        return None, cursor_error
+
+    return {"limit": limit, "cursor": cursor}, None
+
+
+def _nacist_rezervace(query, page):
+    """Načte rezervace od nejnovější včetně profilu žadatele, případně jen jednu stránku."""
+    query = query.options(
+        joinedload(Rezervace.uzivatel).joinedload(Uzivatel.profil).selectinload(Profil.auta),
+        joinedload(Rezervace.uzivatel).selectinload(Uzivatel.hodnoceni_cilovy),
+    ).order_by(Rezervace.vytvoreno.desc(), Rezervace.id.desc())
+    if page is None:
+        return query.all()
+
+    if page["cursor"]:
+        query = query.filter(keyset_before_created(page["cursor"], Rezervace.vytvoreno, Rezervace.id))
+    # Řádek navíc stačí k rozpoznání další stránky i po sloučení obou seznamů.
+    return query.limit(page["limit"] + 1).all()
+
+
 @rezervace_bp.route("/moje", methods=["GET"])
 @jwt_required()
 def get_moje_rezervace():
-    """Vrátí odeslané i přijaté rezervace v jednom payloadu pro přehledovou obrazovku."""
-    uzivatel_id = int(get_jwt_identity())
+    """Vrátí odeslané i přijaté rezervace v jednom payloadu pro přehledovou obrazovku.
 
-    moje_rezervace = Rezervace.query.filter_by(uzivatel_id=uzivatel_id).all()
-
-    moje_jizdy = Jizda.query.filter_by(ridic_id=uzivatel_id).all()
-    rezervace_na_moje_jizdy = []
-    for jizda in moje_jizdy:
-        rezervace_na_moje_jizdy.extend(Rezervace.query.filter_by(jizda_id=jizda.id).all())
+    Každá jízda je v mapě `jizdy` podle ID jen jednou, rezervace na ni odkazují
+    přes `jizda_id`. S parametry `limit`/`cursor` vrací stránky od nejnovějších.
+    """
+    uzivatel_id = int(get_jwt_identity())
+    page, page_error = _parse_moje_rezervace_page()
+    if page_error:
+        return error_response(page_error)
+
+    odeslane = _nacist_rezervace(Rezervace.query.filter(Rezervace.uzivatel_id == uzivatel_id), page)
+    prijate = _nacist_rezervace(
+        Rezervace.query.join(Jizda, Jizda.id == Rezervace.jizda_id).filter(Jizda.ridic_id == uzivatel_id),
+        page,
+    )
 
-    annotate_waiting_queue_positions(moje_rezervace)
-    annotate_waiting_queue_positions(rezervace_na_moje_jizdy)
+    polozky = sorted(
+        [(rezervace, "odeslana") for rezervace in odeslane] + [(rezervace, "prijata") for rezervace in prijate],
+        key=lambda polozka: (polozka[0].vytvoreno, polozka[0].id),
+        reverse=True,
+    )
+    next_cursor = None
+    if page and len(polozky) > page["limit"]:
+        polozky = polozky[: page["limit"]]
+        posledni = polozky[-1][0]
+        next_cursor = encode_created_cursor(vytvoreno=posledni.vytvoreno, item_id=posledni.id)
+
+    rezervace_list = [rezervace for rezervace, _ in polozky]
+    annotate_waiting_queue_positions(rezervace_list)
+
+    jizda_ids = {rezervace.jizda_id for rezervace in rezervace_list}
+    jizdy = (
+        with_ride_list_loading(Jizda.query.filter(Jizda.id.in_(jizda_ids))).all() if jizda_ids else []
+    )
 
     vysledek = []
-
-    for rezervace in moje_rezervace:
-        data = rezervace.to_dict()
-        data["typ"] = "odeslana"
-        vysledek.append(data)
-
-    for rezervace in rezervace_na_moje_jizdy:
-        data = rezervace.to_dict()
-        data["typ"] = "prijata"
+    for rezervace, typ in polozky:
+        data = rezervace.to_dict(vcetne_jizdy=False)
+        data["typ"] = typ
         vysledek.append(data)
 
-    return jsonify(vysledek)
+    return jsonify({
+        "rezervace": vysledek,
+        "jizdy": {str(jizda.id): jizda.to_dict() for jizda in jizdy},
+        "next_cursor": next_cursor,
+    })
 
 
 @rezervace_bp.route("/jizda/<int:jizda_id>", methods=["GET"])
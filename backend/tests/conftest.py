@@ -16,6 +16,8 @@ from models.profil import Profil
 from models.rezervace import Rezervace
 from models.uzivatel import Uzivatel
 from utils.datetime_utils import utc_now
+from utils.reservations import prepocitat_obsazenost_jizd
+from utils.route_points import sync_route_points
 
 
 @pytest.fixture
@@ -234,6 +236,8 @@ def create_ride():
                 )
             )
 
+        db.session.flush()
+        sync_route_points(jizda)
         db.session.commit()
         return jizda
 
@@ -265,6 +269,7 @@ def reservation_factory():
         if status == "prijata" and uzivatel not in jizda.pasazeri:
             jizda.pasazeri.append(uzivatel)
 
+        prepocitat_obsazenost_jizd([jizda.id])
         db.session.commit()
         return rezervace
 
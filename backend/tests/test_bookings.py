@@ -4,8 +4,10 @@ import pytest
 
 from models import db
 from models.jizda import Jizda
+from models.oznameni import Oznameni
 from models.rezervace import Rezervace
 from utils.datetime_utils import utc_now
+from utils.reservations import annotate_waiting_queue_positions
 
 
 def _error_text(response):
@@ -238,9 +240,79 @@ def test_get_my_bookings_returns_sent_and_received(
     )
 
     assert ridic_response.status_code == 200
-    assert any(item["typ"] == "prijata" for item in ridic_response.get_json())
+    assert any(item["typ"] == "prijata" for item in ridic_response.get_json()["rezervace"])
     assert pasazer_response.status_code == 200
-    assert any(item["typ"] == "odeslana" for item in pasazer_response.get_json())
+    assert any(item["typ"] == "odeslana" for item in pasazer_response.get_json()["rezervace"])
+
+
+def test_get_my_bookings_side_loads_each_ride_once(
+    client, create_verified_user, create_auto, create_ride, reservation_factory, auth_headers
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    jiny_ridic = create_verified_user(email="jiny@example.com", jmeno="Jiny")
+    jizda = create_ride(ridic, create_auto(ridic))
+    cizi_jizda = create_ride(jiny_ridic, create_auto(jiny_ridic))
+    for index in range(3):
+        pasazer = create_verified_user(email=f"pasazer{index}@example.com", jmeno=f"Pasazer {index}")
+        reservation_factory(pasazer, jizda)
+    odeslana = reservation_factory(ridic, cizi_jizda)
+
+    response = client.get("/api/rezervace/moje", headers=auth_headers("ridic@example.com"))
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert set(data["jizdy"]) == {str(jizda.id), str(cizi_jizda.id)}
+    assert data["jizdy"][str(jizda.id)]["id"] == jizda.id
+    assert data["next_cursor"] is None
+    assert all("jizda" not in item for item in data["rezervace"])
+    assert [item["typ"] for item in data["rezervace"]].count("prijata") == 3
+    assert [item["id"] for item in data["rezervace"] if item["typ"] == "odeslana"] == [odeslana.id]
+    assert {item["jizda_id"] for item in data["rezervace"] if item["typ"] == "prijata"} == {jizda.id}
+
+
+def test_get_my_bookings_paginates_newest_first(
+    client, create_verified_user, create_auto, create_ride, reservation_factory, auth_headers
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    jiny_ridic = create_verified_user(email="jiny@example.com", jmeno="Jiny")
+    jizda = create_ride(ridic, create_auto(ridic))
+    cizi_jizda = create_ride(jiny_ridic, create_auto(jiny_ridic))
+    zakladni_cas = utc_now() - timedelta(days=10)
+    ocekavane = []
+    for index in range(5):
+        pasazer = create_verified_user(email=f"pasazer{index}@example.com", jmeno=f"Pasazer {index}")
+        rezervace = reservation_factory(pasazer, jizda)
+        rezervace.vytvoreno = zakladni_cas + timedelta(days=2 * index)
+        ocekavane.append(rezervace.id)
+    odeslana = reservation_factory(ridic, cizi_jizda)
+    odeslana.vytvoreno = zakladni_cas + timedelta(days=3)
+    db.session.commit()
+    ocekavane.insert(2, odeslana.id)
+    ocekavane.reverse()
+
+    headers = auth_headers("ridic@example.com")
+    seen = []
+    cursor = None
+    while True:
+        url = "/api/rezervace/moje?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        data = client.get(url, headers=headers).get_json()
+        assert len(data["rezervace"]) <= 2
+        assert {str(item["jizda_id"]) for item in data["rezervace"]} == set(data["jizdy"])
+        seen.extend(item["id"] for item in data["rezervace"])
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == ocekavane
+
+
+def test_get_my_bookings_rejects_invalid_cursor(client, create_verified_user, auth_headers):
+    create_verified_user(email="ridic@example.com", jmeno="Ridic")
+
+    response = client.get("/api/rezervace/moje?cursor=nesmysl", headers=auth_headers("ridic@example.com"))
+
+    assert response.status_code == 400
+    assert "kurzor" in _error_text(response).lower()
 
 
 def test_get_ride_bookings_by_driver(
@@ -526,3 +598,144 @@ def test_accepted_passengers_follow_ride_capacity(
     assert druha_response.status_code == 400
     db.session.refresh(jizda)
     assert jizda.get_volna_mista() == 0
+
+
+def test_seat_counters_follow_booking_lifecycle(
+    client, create_verified_user, create_auto, create_ride, auth_headers
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    create_verified_user(email="pasazer@example.com", jmeno="Pasazer")
+    auto = create_auto(ridic)
+    jizda = create_ride(ridic, auto, pocet_mist=3)
+
+    created = client.post(
+        "/api/rezervace/",
+        json={"jizda_id": jizda.id, "pocet_mist": 2, "dalsi_pasazeri": ["Doprovod"]},
+        headers=auth_headers("pasazer@example.com"),
+    )
+    rezervace_id = created.get_json()["rezervace"]["id"]
+    db.session.refresh(jizda)
+    assert (jizda.obsazena_mista, jizda.pocet_cekajicich) == (0, 1)
+
+    client.post(f"/api/rezervace/{rezervace_id}/prijmout", headers=auth_headers("ridic@example.com"))
+    db.session.refresh(jizda)
+    assert (jizda.obsazena_mista, jizda.pocet_cekajicich) == (2, 0)
+    assert jizda.get_volna_mista() == 1
+
+    client.delete(f"/api/rezervace/{rezervace_id}/zrusit", headers=auth_headers("pasazer@example.com"))
+    db.session.refresh(jizda)
+    assert (jizda.obsazena_mista, jizda.pocet_cekajicich) == (0, 0)
+
+
+def test_reconcile_seat_counters_command(app, create_verified_user, create_auto, create_ride, reservation_factory):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    pasazer = create_verified_user(email="pasazer@example.com", jmeno="Pasazer")
+    auto = create_auto(ridic)
+    jizda = create_ride(ridic, auto, pocet_mist=3)
+    reservation_factory(pasazer, jizda, status="prijata", pocet_mist=2, dalsi_pasazeri=["Doprovod"])
+    jizda.obsazena_mista = 0
+    jizda.pocet_cekajicich = 5
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=["prepocitat-obsazenost"])
+
+    assert result.exit_code == 0
+    assert "Opravených jízd: 1" in result.output
+    db.session.refresh(jizda)
+    assert (jizda.obsazena_mista, jizda.pocet_cekajicich) == (2, 0)
+
+
+def test_waiting_queue_positions_follow_submission_order(
+    app, create_verified_user, create_auto, create_ride, reservation_factory
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    jizda = create_ride(ridic, auto)
+    jina_jizda = create_ride(
+        ridic,
+        auto,
+        departure=utc_now() + timedelta(days=3),
+        arrival=utc_now() + timedelta(days=3, hours=2),
+    )
+    pasazeri = [
+        create_verified_user(email=f"pasazer{index}@example.com", jmeno=f"Pasazer {index}")
+        for index in range(4)
+    ]
+    zakladni_cas = utc_now() - timedelta(hours=4)
+    prvni = reservation_factory(pasazeri[0], jizda)
+    prijata = reservation_factory(pasazeri[1], jizda, status="prijata")
+    treti = reservation_factory(pasazeri[2], jizda)
+    druha = reservation_factory(pasazeri[3], jizda)
+    jina = reservation_factory(pasazeri[0], jina_jizda)
+    for offset, rezervace in enumerate([prvni, prijata, druha, treti, jina]):
+        rezervace.vytvoreno = zakladni_cas + timedelta(minutes=offset)
+    db.session.commit()
+
+    positions = annotate_waiting_queue_positions([treti, prijata, jina])
+
+    assert positions == {treti.id: 3, jina.id: 1}
+    assert treti.poradi_cekajici == 3
+    assert prijata.poradi_cekajici is None
+    assert jina.poradi_cekajici == 1
+
+    annotate_waiting_queue_positions([druha])
+    assert druha.poradi_cekajici == 2
+
+
+def test_instant_booking_accepts_reservation_in_one_step(
+    client, create_verified_user, create_auto, create_ride, auth_headers
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    pasazer = create_verified_user(email="pasazer@example.com", jmeno="Pasazer")
+    jizda = create_ride(ridic, create_auto(ridic), pocet_mist=3)
+    jizda.okamzita_rezervace = True
+    db.session.commit()
+
+    response = client.post(
+        "/api/rezervace/",
+        json={"jizda_id": jizda.id, "pocet_mist": 2, "dalsi_pasazeri": ["Doprovod"]},
+        headers=auth_headers("pasazer@example.com"),
+    )
+
+    assert response.status_code == 201, response.get_json()
+    rezervace = response.get_json()["rezervace"]
+    assert rezervace["status"] == "prijata"
+    assert rezervace["poradi_cekajici"] is None
+
+    db.session.expire_all()
+    jizda = db.session.get(Jizda, jizda.id)
+    assert jizda.obsazena_mista == 2
+    assert jizda.pocet_cekajicich == 0
+    assert [p.id for p in jizda.pasazeri] == [pasazer.id]
+    oznameni = Oznameni.query.all()
+    assert [(o.prijemce_id, o.typ) for o in oznameni] == [(ridic.id, "rezervace_okamzita")]
+
+
+def test_instant_booking_falls_back_to_waitlist_when_seats_run_out(
+    client, create_verified_user, create_auto, create_ride, reservation_factory, auth_headers, monkeypatch
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    prvni = create_verified_user(email="prvni@example.com", jmeno="Prvni")
+    create_verified_user(email="pasazer@example.com", jmeno="Pasazer")
+    jizda = create_ride(ridic, create_auto(ridic), pocet_mist=1)
+    jizda.okamzita_rezervace = True
+    reservation_factory(prvni, jizda, status="prijata")
+
+    # Kontrola kapacity před zápisem proběhla dřív, než souběžná rezervace zabrala poslední místo.
+    monkeypatch.setattr(Jizda, "ma_dostatek_volnych_mist", lambda self, pocet: True)
+    response = client.post(
+        "/api/rezervace/",
+        json={"jizda_id": jizda.id, "pocet_mist": 1},
+        headers=auth_headers("pasazer@example.com"),
+    )
+
+    assert response.status_code == 201, response.get_json()
+    rezervace = response.get_json()["rezervace"]
+    assert rezervace["status"] == "cekajici"
+    assert rezervace["poradi_cekajici"] == 1
+
+    db.session.expire_all()
+    jizda = db.session.get(Jizda, jizda.id)
+    assert jizda.obsazena_mista == 1
+    assert jizda.pocet_cekajicich == 1
+    assert Oznameni.query.filter_by(typ="rezervace_nova").count() == 1
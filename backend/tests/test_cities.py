@@ -0,0 +1,308 @@
+import json
+import os
+import statistics
+import time
+
+import pytest
+
+import utils.cities as cities_module
+from app import create_app
+from utils.cities import load_cities, search_cities
+from utils.text_normalization import normalize_search_text
+
+
+def _linear_scan(query, *, include_address=True, limit=10):
+    normalized_query = normalize_search_text(query)
+    matches = []
+    for city in load_cities():
+        in_name = normalized_query in city["_search_name"]
+        in_address = include_address and normalized_query in city["_search_address"]
+        if in_name or in_address:
+            matches.append(city["place_id"])
+        if len(matches) >= limit:
+            break
+    return matches
+
+
+@pytest.mark.parametrize("query", ["Br", "jih", "Praha", "Česká Lípa", "nám. 1", "u b", "xyzxyz"])
+@pytest.mark.parametrize("include_address", [True, False])
+def test_search_cities_index_matches_linear_scan(query, include_address):
+    results = search_cities(query, include_address=include_address, limit=25)
+
+    assert [city["place_id"] for city in results] == _linear_scan(
+        query, include_address=include_address, limit=25
+    )
+
+
+def test_search_cities_requires_two_characters():
+    assert search_cities("b") == []
+    assert search_cities("  ") == []
+
+
+def _brute_force_ranked(query, *, include_address=True, limit=10):
+    normalized_query = normalize_search_text(query)
+    keys = []
+    for position, city in enumerate(load_cities()):
+        rank_name = city["_rank_name"]
+        if rank_name == normalized_query:
+            rank = 0
+        elif rank_name.startswith(normalized_query):
+            rank = 1
+        elif any(
+            rank_name[index + 1:].startswith(normalized_query)
+            for index, char in enumerate(rank_name)
+            if char in " -"
+        ):
+            rank = 2
+        elif normalized_query in rank_name:
+            rank = 3
+        elif include_address and normalized_query in city["_search_address"]:
+            rank = 4
+        else:
+            continue
+        keys.append((rank, len(rank_name), position))
+    return [load_cities()[position]["place_id"] for _rank, _length, position in sorted(keys)[:limit]]
+
+
+@pytest.mark.parametrize("query", ["br", "Brno", "lipa", "nám", "nad", "Ostrava", "u b"])
+@pytest.mark.parametrize("include_address", [True, False])
+def test_ranked_search_matches_full_sort(query, include_address):
+    results = search_cities(query, include_address=include_address, ranked=True)
+
+    assert [city["place_id"] for city in results] == _brute_force_ranked(query, include_address=include_address)
+
+
+def test_ranked_search_prefers_exact_then_prefix_then_word_prefix():
+    names = [city["name"] for city in search_cities("lipa", ranked=True, limit=5)]
+
+    assert names[0] == "Obec Lípa"
+    assert names[2] == "Obec Lípa nad Orlicí"
+    assert "Město Česká Lípa" in names[3:]
+
+
+def test_mesta_endpoint_ranks_results_only_on_request(client):
+    file_order = client.get("/api/mesta?q=brno").get_json()
+    ranked = client.get("/api/mesta?q=brno&ranked=1").get_json()
+
+    assert file_order[0]["name"] == "Obec Úsobrno"
+    assert ranked[0]["name"] == "Statutární město Brno"
+
+
+@pytest.mark.parametrize("query", ["mesto brno", "Statutární město Brno"])
+def test_ranked_search_ignores_administrative_prefix_in_query(query):
+    names = [city["name"] for city in search_cities(query, ranked=True)]
+
+    assert names[0] == "Statutární město Brno"
+
+
+def _isolate_city_dataset(monkeypatch):
+    # Po testu monkeypatch vrátí původní dataset, ostatní testy tak nic nepřenačítají.
+    monkeypatch.setattr(cities_module, "_dataset", None)
+    monkeypatch.setattr(cities_module, "_watch_state", {"checked_at": 0.0, "mtimes": None, "reloading": False})
+
+
+@pytest.fixture
+def city_index_path(tmp_path, monkeypatch):
+    path = tmp_path / "cities.idx"
+    monkeypatch.setattr(cities_module, "CITIES_INDEX_PATH", path)
+    _isolate_city_dataset(monkeypatch)
+    return path
+
+
+def test_load_cities_reads_prebuilt_index(city_index_path, monkeypatch):
+    expected = load_cities()
+    assert cities_module.build_city_index_artifact() == (len(expected), city_index_path)
+
+    def fail_json_parse():
+        raise AssertionError("cities.json se nema parsovat, kdyz je index aktualni")
+
+    monkeypatch.setattr(cities_module, "_parse_cities_json", fail_json_parse)
+    assert cities_module.reload_cities(force=True)
+    assert load_cities() == expected
+
+
+def test_app_start_builds_city_indexes_before_first_search(monkeypatch):
+    _isolate_city_dataset(monkeypatch)
+    app = create_app(test_config={"SQLALCHEMY_DATABASE_URI": "sqlite://"})
+
+    def fail_build(*args, **kwargs):
+        raise AssertionError("indexy mest se maji postavit pri startu, ne v requestu")
+
+    for builder in ("_load_dataset", "_build_ngram_index", "_build_rank_tables", "_build_fuzzy_index"):
+        monkeypatch.setattr(cities_module, builder, fail_build)
+
+    response = app.test_client().get("/api/mesta?q=brno&ranked=1&fuzzy=1")
+
+    assert response.status_code == 200
+    assert response.get_json()[0]["name"] == "Statutární město Brno"
+
+
+def test_load_cities_falls_back_to_json_for_stale_index(city_index_path, monkeypatch):
+    expected = load_cities()
+    cities_module.build_city_index_artifact()
+    monkeypatch.setattr(cities_module, "cities_source_hash", lambda: b"\0" * 32)
+
+    assert cities_module.reload_cities(force=True)
+    assert load_cities() == expected
+
+
+def test_build_city_index_cli_writes_artifact(app, city_index_path):
+    result = app.test_cli_runner().invoke(args=["postavit-index-mest"])
+
+    assert result.exit_code == 0, result.output
+    assert city_index_path.exists()
+    assert str(city_index_path) in result.output
+
+
+def test_search_cities_caches_results_by_normalized_query():
+    cities_module.get_city_dataset().cached_search.cache_clear()
+
+    first = search_cities("Brno", ranked=True)
+    second = search_cities("  brnó ", ranked=True)
+    info = cities_module.search_cache_info()
+
+    assert first == second
+    assert (info.hits, info.misses) == (1, 1)
+    first[0]["name"] = "zmeneno"
+    assert search_cities("brno", ranked=True)[0]["name"] == "Statutární město Brno"
+
+
+def test_mesta_endpoint_sends_etag_and_honours_if_none_match(client):
+    response = client.get("/api/mesta?q=brno")
+
+    etag = response.headers["ETag"]
+    assert etag == f'"{cities_module.cities_dataset_etag()}"'
+    assert response.cache_control.public
+    assert response.cache_control.max_age == 24 * 60 * 60
+
+    cached = client.get("/api/mesta?q=brno", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+    assert cached.headers["ETag"] == etag
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("Ceske Budejovce", "Statutární město České Budějovice"),
+        ("Plzn", "Statutární město Plzeň"),
+        ("Hradec Karlove", "Statutární město Hradec Králové"),
+        ("Olomuc", "Statutární město Olomouc"),
+    ],
+)
+def test_fuzzy_search_tolerates_typos(query, expected):
+    assert expected not in [city["name"] for city in search_cities(query, ranked=True)]
+
+    names = [city["name"] for city in search_cities(query, ranked=True, fuzzy=True)]
+
+    assert expected in names
+
+
+def test_fuzzy_search_only_fills_missing_results():
+    exact = search_cities("brno", ranked=True)
+    assert len(exact) == 10
+
+    assert search_cities("brno", ranked=True, fuzzy=True) == exact
+    assert search_cities("Jihlavaa", ranked=True, fuzzy=True, limit=1)[0]["name"] == "Statutární město Jihlava"
+
+
+def test_fuzzy_search_stays_within_latency_budget():
+    queries = ["ceske budejovce", "plzn", "ostrva", "hradec karlove", "jihlavaa", "olomuc", "pardubce", "zlinn"]
+    dataset = cities_module.get_city_dataset().warm()
+
+    timings = []
+    for _ in range(5):
+        for query in queries:
+            started = time.perf_counter()
+            cities_module._fuzzy_search(dataset, query, limit=10)
+            timings.append(time.perf_counter() - started)
+
+    assert statistics.median(timings) < 0.003
+    assert max(timings) < 0.02
+
+
+@pytest.fixture
+def cities_json_path(tmp_path, monkeypatch):
+    path = tmp_path / "cities.json"
+    path.write_text(json.dumps([{"name": "Obec Lhota", "address": "Lhota 1"}]), encoding="utf-8")
+    monkeypatch.setattr(cities_module, "CITIES_JSON_PATH", path)
+    monkeypatch.setattr(cities_module, "CITIES_INDEX_PATH", tmp_path / "cities.idx")
+    _isolate_city_dataset(monkeypatch)
+    return path
+
+
+def _write_cities(path, names):
+    path.write_text(json.dumps([{"name": name, "address": ""} for name in names]), encoding="utf-8")
+
+
+def test_reload_cities_swaps_dataset_only_when_content_changes(cities_json_path):
+    old_dataset = cities_module.get_city_dataset()
+    assert [city["name"] for city in search_cities("lhota")] == ["Obec Lhota"]
+
+    assert cities_module.reload_cities() is False
+    assert cities_module.get_city_dataset() is old_dataset
+
+    _write_cities(cities_json_path, ["Obec Lhota", "Obec Lhotka"])
+    assert cities_module.reload_cities() is True
+
+    place_id = search_cities("lhotka")[0]["place_id"]
+    assert cities_module.get_city_by_place_id(place_id)["name"] == "Obec Lhotka"
+    assert cities_module.cities_dataset_etag() != old_dataset.etag
+    # Rozběhnuté vyhledávání dál pracuje se starým snapshotem.
+    assert [city["name"] for city in old_dataset.cached_search("lhot", True, 10, True, False)] == ["Obec Lhota"]
+
+
+def test_city_dataset_reloads_in_background_after_file_change(cities_json_path, monkeypatch):
+    old_dataset = cities_module.get_city_dataset()
+    monkeypatch.setattr(cities_module, "CITIES_WATCH_INTERVAL", 0)
+
+    _write_cities(cities_json_path, ["Obec Zahradka"])
+    os.utime(cities_json_path, ns=(time.time_ns(), time.time_ns() + 1_000_000_000))
+
+    assert cities_module.get_city_dataset() is old_dataset
+    deadline = time.monotonic() + 5
+    while cities_module.get_city_dataset() is old_dataset and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert [city["name"] for city in search_cities("zahradka")] == ["Obec Zahradka"]
+
+
+def test_reload_cities_cli_reports_dataset(app, cities_json_path):
+    _write_cities(cities_json_path, ["Obec Lhota", "Obec Lhotka"])
+
+    result = app.test_cli_runner().invoke(args=["obnovit-mesta"])
+
+    assert result.exit_code == 0, result.output
+    assert "2" in result.output
+    assert cities_module.cities_dataset_etag() in result.output
+
+
+@pytest.mark.parametrize(
+    ("address", "psc"),
+    [
+        ("Náměstí Míru 1, 387 73 Bavorov Czech Republic", "38773"),
+        ("Hlavní 1000/113, 69001 Svatobořice Czech Republic", "69001"),
+        ("Hlavní 1000/113, Svatobořice Czech Republic", ""),
+    ],
+)
+def test_parse_psc_from_address(address, psc):
+    assert cities_module.parse_psc(address) == psc
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [("37", {"37"}), ("37x", {"37"}), ("3", {f"3{digit}" for digit in range(10)}), ("", None)],
+)
+def test_parse_region_filter(value, expected):
+    regions, error = cities_module.parse_region_filter(value)
+
+    assert error is None
+    assert (set(regions) if regions is not None else None) == expected
+
+
+def test_mesta_endpoint_filters_by_region(client):
+    results = client.get("/api/mesta?q=bor&region=37").get_json()
+
+    assert results
+    assert all(city["psc"].startswith("37") and city["region"] == "37" for city in results)
+    assert client.get("/api/mesta?q=bor&region=377").status_code == 400
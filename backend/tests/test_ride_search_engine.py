@@ -0,0 +1,273 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+
+import routes.jizdy as jizdy_routes
+
+from app import create_app
+from models import db
+from models.jizda import Jizda
+from models.zmena_jizdy import ZmenaJizdy
+from utils.cities import search_cities
+from utils.datetime_utils import utc_now
+from utils.ride_lifecycle import dokoncit_probehle_jizdy
+from utils.ride_search_engine import ZMENY_RETENCE, RideSearchEngine, get_ride_search_engine, smazat_stare_zmeny
+
+
+@pytest.fixture
+def app():
+    app = create_app(
+        test_config={
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": "sqlite://",
+            "SQLALCHEMY_ENGINE_OPTIONS": {
+                "connect_args": {"check_same_thread": False},
+                "poolclass": StaticPool,
+            },
+            "JWT_SECRET_KEY": "test-jwt-secret",
+            "RIDE_SEARCH_ENGINE": "memory",
+        }
+    )
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        get_ride_search_engine().rebuild()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _assert_consistent(engine):
+    assert engine.check_consistency() == {"chybejici": [], "prebyvajici": [], "rozdilne": []}
+
+
+def _search(client, query):
+    return [
+        (item["match_type"], item["ride"]["id"])
+        for item in client.get(f"/api/jizdy/vyhledat?{query}").get_json()
+    ]
+
+
+def test_engine_tracks_ride_lifecycle_through_api(
+    client, create_verified_user, create_auto, auth_headers, ride_payload
+):
+    engine = get_ride_search_engine()
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    headers = auth_headers("ridic@example.com")
+
+    response = client.post(
+        "/api/jizdy/",
+        json=ride_payload(auto.id, overrides={"mezistanice": ["Jihlava"]}),
+        headers=headers,
+    )
+    assert response.status_code == 201
+    jizda_id = response.get_json()["jizda"]["id"]
+    assert len(engine) == 1
+    _assert_consistent(engine)
+    assert _search(client, "odkud=Jihlava&kam=Praha") == [("full", jizda_id)]
+
+    response = client.put(f"/api/jizdy/{jizda_id}", json={"mezistanice": ["Humpolec"]}, headers=headers)
+    assert response.status_code == 200
+    _assert_consistent(engine)
+    assert _search(client, "odkud=Humpolec&kam=Praha") == [("full", jizda_id)]
+    assert _search(client, "odkud=Jihlava&kam=Praha") == [("partial", jizda_id)]
+
+    response = client.delete(f"/api/jizdy/{jizda_id}", headers=headers)
+    assert response.status_code == 200
+    assert len(engine) == 0
+    _assert_consistent(engine)
+    assert _search(client, "odkud=Brno&kam=Praha") == []
+
+
+def test_engine_matches_sql_search_results(client, app, create_verified_user, create_auto, create_ride):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    departure = utc_now() + timedelta(days=1)
+    create_ride(ridic, auto, odkud="Brno", kam="Praha", departure=departure, mezistanice=[{"misto": "Jihlava"}])
+    create_ride(ridic, auto, odkud="Jihlava", kam="Brno", departure=departure + timedelta(days=1))
+    create_ride(ridic, auto, odkud="Ostrava", kam="Praha", departure=departure + timedelta(days=2))
+    create_ride(ridic, auto, odkud="Brno", kam="Plzeň", departure=departure + timedelta(days=3))
+    borovany, jihlava = (search_cities(name, ranked=True)[0] for name in ("Borovany", "Jihlava"))
+    create_ride(
+        ridic,
+        auto,
+        odkud="Borovany",
+        kam="Jihlava",
+        departure=departure + timedelta(days=4),
+        odkud_place_id=borovany["place_id"],
+        kam_place_id=jihlava["place_id"],
+    )
+    create_ride(
+        ridic,
+        auto,
+        odkud="Horní Lhota",
+        kam="České Budějovice",
+        departure=departure + timedelta(days=5),
+    )
+
+    queries = [
+        "odkud=Jihlava&kam=Praha",
+        "odkud=lhota&kam=budejovice",
+        "odkud=brno&kam=plzen",
+        "odkud=Ji",
+        "kam=Praha&pocet_pasazeru=2",
+        "odkud_region=3&kam_region=58",
+        "kam=jihlava&kam_region=58",
+    ]
+    memory_results = [_search(client, query) for query in queries]
+
+    app.extensions.pop("ride_search_engine")
+    sql_results = [_search(client, query) for query in queries]
+
+    assert memory_results == sql_results
+    assert all(memory_results)
+
+
+def test_engine_search_pages_candidate_ids_in_python(
+    client, app, create_verified_user, create_auto, create_ride, monkeypatch
+):
+    monkeypatch.setattr(jizdy_routes, "ENGINE_ID_BATCH_SIZE", 2)
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    departure = utc_now() + timedelta(days=1)
+    for offset in range(5):
+        create_ride(ridic, auto, odkud="Brno", kam="Praha", departure=departure + timedelta(days=offset))
+        create_ride(ridic, auto, odkud="Brno", kam="Plzeň", departure=departure + timedelta(days=offset, hours=1))
+
+    def collect_pages():
+        pages, cursor = [], ""
+        while cursor is not None:
+            body = client.get(f"/api/jizdy/vyhledat?odkud=Brno&kam=Praha&limit=3&cursor={cursor}").get_json()
+            pages.append([(item["match_type"], item["ride"]["id"]) for item in body["vysledky"]])
+            cursor = body["next_cursor"]
+        return pages
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        memory_pages = collect_pages()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+    # Do SQL jdou ID kandidátů jen po dávkách, nikdy všechny najednou.
+    assert all(statement.count("?") <= 10 for statement in statements)
+    app.extensions.pop("ride_search_engine")
+    assert memory_pages == collect_pages()
+    assert [len(page) for page in memory_pages] == [3, 3, 3, 1]
+
+
+def test_engine_detects_drift_and_rebuilds(app, create_verified_user, create_auto, create_ride):
+    engine = get_ride_search_engine()
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    jizda = create_ride(ridic, auto)
+    _assert_consistent(engine)
+
+    engine.remove(jizda.id)
+    assert engine.check_consistency()["chybejici"] == [jizda.id]
+
+    assert engine.rebuild() == 1
+    _assert_consistent(engine)
+
+
+def test_engine_ignores_rolled_back_changes(app, create_verified_user, create_auto, create_ride):
+    engine = get_ride_search_engine()
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    jizda = create_ride(ridic, auto)
+
+    db.session.get(Jizda, jizda.id).status = "zrusena"
+    db.session.flush()
+    db.session.rollback()
+
+    assert len(engine) == 1
+    _assert_consistent(engine)
+
+
+def test_engine_indexes_rides_generated_from_template(client, create_verified_user, create_auto, auth_headers):
+    engine = get_ride_search_engine()
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+
+    response = client.post(
+        "/api/jizdy/sablony",
+        json={
+            "auto_id": auto.id,
+            "odkud": "Brno",
+            "kam": "Praha",
+            "mezistanice": ["Jihlava"],
+            "cas_odjezdu": "07:00",
+            "cas_prijezdu": "09:00",
+            "cena": 150,
+            "pocet_mist": 3,
+            "dny_v_tydnu": [0, 2, 4],
+            "pocet_opakovani": 4,
+            "datum_od": (utc_now() + timedelta(days=1)).date().isoformat(),
+        },
+        headers=auth_headers("ridic@example.com"),
+    )
+
+    assert response.status_code == 201
+    jizda_ids = {jizda["id"] for jizda in response.get_json()["jizdy"]}
+    assert len(engine) == 4
+    assert {ride_id for _, ride_id in _search(client, "odkud=Jihlava&kam=Praha")} == jizda_ids
+    _assert_consistent(engine)
+
+
+def test_engine_syncs_changes_committed_by_other_processes(
+    client, create_verified_user, create_auto, auth_headers, ride_payload
+):
+    # Druhý engine stojí za jiný worker, který o commitech tohoto procesu nic neví.
+    jiny_worker = RideSearchEngine()
+    jiny_worker.rebuild()
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    headers = auth_headers("ridic@example.com")
+
+    response = client.post("/api/jizdy/", json=ride_payload(auto.id), headers=headers)
+    assert response.status_code == 201
+    jizda_id = response.get_json()["jizda"]["id"]
+    assert len(jiny_worker) == 0
+
+    assert jiny_worker.sync() == 1
+    _assert_consistent(jiny_worker)
+
+    response = client.put(f"/api/jizdy/{jizda_id}", json={"mezistanice": ["Jihlava"]}, headers=headers)
+    assert response.status_code == 200
+    jiny_worker.sync()
+    _assert_consistent(jiny_worker)
+
+    jizda = db.session.get(Jizda, jizda_id)
+    jizda.cas_odjezdu = utc_now() - timedelta(hours=3)
+    jizda.cas_prijezdu = utc_now() - timedelta(hours=1)
+    db.session.commit()
+    jiny_worker.sync()
+    # Hromadný UPDATE sweeperu se do logu zapisuje ručně.
+    dokoncit_probehle_jizdy()
+    jiny_worker.sync()
+    assert len(jiny_worker) == 0
+    _assert_consistent(jiny_worker)
+
+
+def test_stale_engine_rebuilds_after_change_log_retention(app, create_verified_user, create_auto, create_ride):
+    jiny_worker = RideSearchEngine()
+    jiny_worker.rebuild()
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    create_ride(ridic, create_auto(ridic))
+    assert ZmenaJizdy.query.count() > 0
+
+    assert smazat_stare_zmeny(now=utc_now() + ZMENY_RETENCE + timedelta(minutes=1)) > 0
+    assert ZmenaJizdy.query.count() == 0
+
+    # Log už změnu nedrží, proces, který ho dlouho nečetl, proto postaví index znovu.
+    jiny_worker._synchronizovano -= ZMENY_RETENCE
+    assert jiny_worker.sync() == 1
+    _assert_consistent(jiny_worker)
@@ -1,13 +1,25 @@
-from datetime import timedelta
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
 
 import pytest
+from sqlalchemy import event
 
+from app import create_app
 from models import db
 from models.auto import Auto
+from models.bod_trasy import BodTrasy
 from models.jizda import Jizda
 from models.oznameni import Oznameni
 from models.rezervace import Rezervace
+from models.sablona_jizdy import SablonaJizdy
+from models.slovo_bodu_trasy import SlovoBoduTrasy
+from models.ulozene_hledani import UlozeneHledani
+from utils import saved_searches
+from utils.cities import search_cities
 from utils.datetime_utils import utc_now
+from utils.ride_lifecycle import dokoncit_probehle_jizdy
+from utils.route_points import route_point_values
 
 
 def _error_text(response):
@@ -317,7 +329,7 @@ def test_create_ride_rejects_overlapping_driver_rides(
     ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
     auto = create_auto(ridic)
     departure = utc_now() + timedelta(days=1)
-    create_ride(ridic, auto, departure=departure, arrival=departure + timedelta(hours=2))
+    existing = create_ride(ridic, auto, departure=departure, arrival=departure + timedelta(hours=2))
 
     response = client.post(
         "/api/jizdy/",
@@ -331,6 +343,71 @@ def test_create_ride_rejects_overlapping_driver_rides(
 
     assert response.status_code == 409
     assert "nesmí krýt" in _error_text(response)
+    assert response.get_json()["kolizni_jizda"]["id"] == existing.id
+
+
+def test_ride_overlap_respects_five_minute_gap_and_ignores_inactive_rides(
+    client, create_verified_user, create_auto, create_ride, auth_headers, ride_payload
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    departure = utc_now() + timedelta(days=1)
+    create_ride(ridic, auto, departure=departure, arrival=departure + timedelta(hours=1), status="zrusena")
+    blocking = create_ride(
+        ridic,
+        auto,
+        departure=departure + timedelta(hours=2),
+        arrival=departure + timedelta(hours=3),
+    )
+    headers = auth_headers("ridic@example.com")
+
+    allowed = client.post(
+        "/api/jizdy/",
+        json=ride_payload(auto.id, departure=departure, arrival=departure + timedelta(hours=1, minutes=55)),
+        headers=headers,
+    )
+    assert allowed.status_code == 201
+
+    too_close = client.post(
+        "/api/jizdy/",
+        json=ride_payload(
+            auto.id,
+            departure=departure + timedelta(hours=3, minutes=4),
+            arrival=departure + timedelta(hours=4),
+        ),
+        headers=headers,
+    )
+    assert too_close.status_code == 409
+    assert too_close.get_json()["kolizni_jizda"]["id"] == blocking.id
+
+
+def test_update_ride_reports_conflicting_ride(client, create_verified_user, create_auto, create_ride, auth_headers):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    departure = utc_now() + timedelta(days=1)
+    jizda = create_ride(ridic, auto, departure=departure, arrival=departure + timedelta(hours=1))
+    other = create_ride(
+        ridic,
+        auto,
+        departure=departure + timedelta(hours=3),
+        arrival=departure + timedelta(hours=4),
+    )
+
+    unchanged = client.put(
+        f"/api/jizdy/{jizda.id}",
+        json={"cas_prijezdu": (departure + timedelta(hours=2)).isoformat()},
+        headers=auth_headers("ridic@example.com"),
+    )
+    assert unchanged.status_code == 200
+
+    response = client.put(
+        f"/api/jizdy/{jizda.id}",
+        json={"cas_prijezdu": (departure + timedelta(hours=3, minutes=30)).isoformat()},
+        headers=auth_headers("ridic@example.com"),
+    )
+
+    assert response.status_code == 409
+    assert response.get_json()["kolizni_jizda"]["id"] == other.id
 
 
 def test_get_ride_not_found(client):
@@ -551,7 +628,9 @@ def test_delete_foreign_ride_forbidden(client, create_verified_user, create_auto
     assert _error_text(response) == "Nemáte oprávnění zrušit tuto jízdu"
 
 
-def test_my_rides_marks_finished_past_rides(client, create_verified_user, create_auto, create_ride, auth_headers):
+def test_my_rides_does_not_write_and_sweeper_finishes_past_rides(
+    client, create_verified_user, create_auto, create_ride, auth_headers
+):
     ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
     auto = create_auto(ridic)
     jizda = create_ride(
@@ -561,15 +640,84 @@ def test_my_rides_marks_finished_past_rides(client, create_verified_user, create
         arrival=utc_now() - timedelta(hours=1),
         status="aktivni",
     )
+    statements = []
 
-    response = client.get("/api/jizdy/moje", headers=auth_headers("ridic@example.com"))
+    def record_statement(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record_statement)
+    try:
+        response = client.get("/api/jizdy/moje", headers=auth_headers("ridic@example.com"))
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record_statement)
 
     assert response.status_code == 200
-    assert any(item["status"] == "dokoncena" for item in response.get_json())
+    assert not [statement for statement in statements if statement.lstrip().upper().startswith("UPDATE")]
+    # Klient vidí jízdu jako dokončenou už před během sweeperu.
+    assert [item["status"] for item in response.get_json()] == ["dokoncena"]
+    db.session.refresh(jizda)
+    assert jizda.status == "aktivni"
+
+    assert dokoncit_probehle_jizdy() == {"dokonceno": 1, "oznameni": 0}
     db.session.refresh(jizda)
     assert jizda.status == "dokoncena"
 
 
+def test_sweeper_finishes_rides_in_batches_and_notifies_once(
+    app, create_verified_user, create_auto, create_ride, create_accepted_reservation
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    pasazer = create_verified_user(email="pasazer@example.com", jmeno="Pasazer")
+    auto = create_auto(ridic)
+    probehle = [
+        create_ride(
+            ridic,
+            auto,
+            departure=utc_now() - timedelta(hours=10 - index * 2),
+            arrival=utc_now() - timedelta(hours=9 - index * 2),
+        )
+        for index in range(3)
+    ]
+    for jizda in probehle:
+        create_accepted_reservation(pasazer, jizda)
+    budouci = create_ride(ridic, auto)
+    create_accepted_reservation(pasazer, budouci)
+
+    assert dokoncit_probehle_jizdy(batch_size=2) == {"dokonceno": 3, "oznameni": 3}
+    assert dokoncit_probehle_jizdy(batch_size=2) == {"dokonceno": 0, "oznameni": 0}
+
+    db.session.expire_all()
+    assert [jizda.status for jizda in probehle] == ["dokoncena"] * 3
+    assert budouci.status == "aktivni"
+    oznameni = Oznameni.query.filter_by(prijemce_id=pasazer.id, typ="hodnoceni_ceka").all()
+    assert sorted(item.jizda_id for item in oznameni) == sorted(jizda.id for jizda in probehle)
+    assert all(item.target_path == f"/ohodnotit/{item.jizda_id}/{ridic.id}" for item in oznameni)
+
+
+def test_background_workers_start_only_when_enabled(monkeypatch):
+    monkeypatch.setattr(threading.Thread, "start", lambda thread: spustena.append(thread.name))
+    spustena = []
+    config = {"SQLALCHEMY_DATABASE_URI": "sqlite://", "RIDE_SWEEPER_INTERVAL": 60}
+
+    # Import aplikace v CLI nebo gunicorn workeru bez příznaku nesmí pouštět sweeper ani ostatní vlákna.
+    create_app(test_config=config)
+    assert spustena == []
+
+    create_app(test_config={**config, "RUN_BACKGROUND_WORKERS": True})
+    assert sorted(spustena) == ["ride-lifecycle-sweeper", "waitlist-promoter"]
+
+
+def test_finish_rides_cli_reports_counts(app, create_verified_user, create_auto, create_ride):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    create_ride(ridic, auto, departure=utc_now() - timedelta(hours=3), arrival=utc_now() - timedelta(hours=1))
+
+    result = app.test_cli_runner().invoke(args=["dokoncit-jizdy", "--davka", "1"])
+
+    assert result.exit_code == 0, result.output
+    assert "Dokončených jízd: 1" in result.output
+
+
 def test_get_rides_listing_without_filters(client, create_verified_user, create_auto, create_ride):
     ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
     auto = create_auto(ridic)
@@ -628,6 +776,68 @@ def test_get_rides_filters_by_date(client, create_verified_user, create_auto, cr
     assert response.get_json()["celkem"] == 1
 
 
+def test_get_rides_filters_by_date_range(client, create_verified_user, create_auto, create_ride):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    zacatek = utc_now().replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=3)
+    for offset in range(4):
+        departure = zacatek + timedelta(days=offset)
+        create_ride(ridic, auto, departure=departure, arrival=departure + timedelta(hours=1))
+
+    datum_od = (zacatek + timedelta(days=1)).date().isoformat()
+    datum_do = (zacatek + timedelta(days=2)).date().isoformat()
+    response = client.get(f"/api/jizdy/?datum_od={datum_od}&datum_do={datum_do}")
+
+    assert response.status_code == 200
+    assert [item["cas_odjezdu"][:10] for item in response.get_json()["jizdy"]] == [datum_od, datum_do]
+
+
+def test_get_rides_filters_by_time_of_day_window(client, create_verified_user, create_auto, create_ride):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    den = (utc_now() + timedelta(days=3)).replace(hour=0, minute=0, second=0, microsecond=0)
+    for hour in (6, 8, 17):
+        departure = den + timedelta(hours=hour)
+        create_ride(ridic, auto, departure=departure, arrival=departure + timedelta(hours=1))
+
+    response = client.get(f"/api/jizdy/?datum={den.date().isoformat()}&cas_od=07:00&cas_do=18:00")
+
+    assert response.status_code == 200
+    assert [item["cas_odjezdu"][11:16] for item in response.get_json()["jizdy"]] == ["08:00", "17:00"]
+
+
+@pytest.mark.parametrize(
+    ("query", "expected_error"),
+    [
+        ("cas_od=7h&datum=2030-01-01", "Neplatný formát času (HH:MM)"),
+        ("cas_od=07:00", "Časové okno vyžaduje datum nebo datum_od a datum_do"),
+        ("datum_od=2030-01-05&datum_do=2030-01-01", "datum_do nesmí být před datum_od"),
+    ],
+)
+def test_get_rides_rejects_invalid_departure_window(client, query, expected_error):
+    response = client.get(f"/api/jizdy/?{query}")
+
+    assert response.status_code == 400
+    assert _error_text(response) == expected_error
+
+
+def test_search_rides_skips_already_departed_rides(client, create_verified_user, create_auto, create_ride):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    create_ride(
+        ridic,
+        auto,
+        departure=utc_now() - timedelta(hours=1),
+        arrival=utc_now() + timedelta(hours=1),
+    )
+    budouci = create_ride(ridic, auto, departure=utc_now() + timedelta(days=2))
+
+    response = client.get("/api/jizdy/vyhledat?odkud=Brno&kam=Praha")
+
+    assert response.status_code == 200
+    assert [item["ride"]["id"] for item in response.get_json()] == [budouci.id]
+
+
 def test_get_rides_filters_by_passenger_count(
     client,
     create_verified_user,
@@ -647,6 +857,59 @@ def test_get_rides_filters_by_passenger_count(
     assert response.get_json()["celkem"] == 0
 
 
+def test_get_rides_listing_reports_capacity_per_ride(
+    client,
+    create_verified_user,
+    create_auto,
+    create_ride,
+    create_accepted_reservation,
+    reservation_factory,
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    pasazer = create_verified_user(email="pasazer@example.com", jmeno="Pasazer")
+    cekajici = create_verified_user(email="cekajici@example.com", jmeno="Cekajici")
+    auto = create_auto(ridic)
+    obsazena = create_ride(ridic, auto, pocet_mist=3)
+    volna = create_ride(
+        ridic,
+        auto,
+        pocet_mist=2,
+        departure=utc_now() + timedelta(days=2),
+        arrival=utc_now() + timedelta(days=2, hours=1),
+    )
+    create_accepted_reservation(pasazer, obsazena, pocet_mist=2, dalsi_pasazeri=["Doprovod"])
+    reservation_factory(cekajici, obsazena)
+
+    response = client.get("/api/jizdy/")
+
+    assert response.status_code == 200
+    jizdy = {item["id"]: item for item in response.get_json()["jizdy"]}
+    assert jizdy[obsazena.id]["volna_mista"] == 1
+    assert jizdy[obsazena.id]["pocet_cekajicich_rezervaci"] == 1
+    assert jizdy[volna.id]["volna_mista"] == 2
+    assert jizdy[volna.id]["pocet_cekajicich_rezervaci"] == 0
+
+
+def test_search_rides_filters_by_passenger_count(
+    client,
+    create_verified_user,
+    create_auto,
+    create_ride,
+    create_accepted_reservation,
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    pasazer = create_verified_user(email="pasazer@example.com", jmeno="Pasazer")
+    auto = create_auto(ridic)
+    jizda = create_ride(ridic, auto, pocet_mist=2)
+    create_accepted_reservation(pasazer, jizda, pocet_mist=1)
+
+    plna = client.get("/api/jizdy/vyhledat?odkud=Brno&kam=Praha&pocet_pasazeru=2")
+    volna = client.get("/api/jizdy/vyhledat?odkud=Brno&kam=Praha&pocet_pasazeru=1")
+
+    assert plna.get_json() == []
+    assert [item["ride"]["volna_mista"] for item in volna.get_json()] == [1]
+
+
 def test_search_rides_by_date_invalid_format(client):
     response = client.get("/api/jizdy/vyhledat?datum=31-03-2026")
 
@@ -687,6 +950,241 @@ def test_search_rides_returns_full_and_partial_matches(client, create_verified_u
     assert all(item["match_type"] == "partial" for item in partial_data)
 
 
+def test_search_rides_matches_text_from_any_word_start(client, create_verified_user, create_auto, create_ride):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    jizda = create_ride(
+        ridic, auto, odkud="Ústí nad Labem", kam="České Budějovice", mezistanice=[{"misto": "Horní Lhota"}]
+    )
+
+    def search(query):
+        return [item["ride"]["id"] for item in client.get(f"/api/jizdy/vyhledat?{query}").get_json()]
+
+    def list_rides(query):
+        return [item["id"] for item in client.get(f"/api/jizdy/?{query}").get_json()["jizdy"]]
+
+    for query in ["odkud=usti%20n", "odkud=Labem", "kam=Budejovice", "kam=Lhota", "odkud=lhot", "kam=ces"]:
+        assert search(query) == [jizda.id], query
+        # Výpis jízd porovnává text stejně jako vyhledávání.
+        assert list_rides(query) == [jizda.id], query
+
+    # Shoda musí začínat na začátku slova, zbytek textu za ním může chybět.
+    for query in ["odkud=abem", "kam=udejovice", "kam=Labem"]:
+        assert search(query) == [], query
+        assert list_rides(query) == [], query
+
+
+def test_search_rides_ignores_reversed_route_order(client, create_verified_user, create_auto, create_ride):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    create_ride(
+        ridic,
+        auto,
+        odkud="Brno",
+        kam="Praha",
+        mezistanice=[{"misto": "Jihlava"}, {"misto": "Humpolec"}],
+    )
+
+    response = client.get("/api/jizdy/vyhledat?odkud=Humpolec&kam=Jihlava")
+
+    assert response.status_code == 200
+    assert response.get_json() == []
+
+
+def test_create_ride_persists_route_points(client, create_verified_user, create_auto, auth_headers, ride_payload):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+
+    response = client.post(
+        "/api/jizdy/",
+        json=ride_payload(auto.id, overrides={"odkud": "Česká Lípa", "mezistanice": ["Jihlava"]}),
+        headers=auth_headers("ridic@example.com"),
+    )
+
+    assert response.status_code == 201
+    body = BodTrasy.query.order_by(BodTrasy.poradi).all()
+    assert [(bod.poradi, bod.role, bod.normalizovany_text) for bod in body] == [
+        (0, "odkud", "ceska lipa"),
+        (1, "mezistanice", "jihlava"),
+        (2, "kam", "praha"),
+    ]
+
+
+def test_update_ride_rebuilds_route_points_for_search(
+    client, create_verified_user, create_auto, create_ride, auth_headers
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    jizda = create_ride(ridic, auto, odkud="Brno", kam="Praha", mezistanice=[{"misto": "Jihlava"}])
+
+    response = client.put(
+        f"/api/jizdy/{jizda.id}",
+        json={"mezistanice": ["Humpolec"]},
+        headers=auth_headers("ridic@example.com"),
+    )
+
+    assert response.status_code == 200
+    stale = client.get("/api/jizdy/vyhledat?odkud=Jihlava&kam=Praha").get_json()
+    assert [item["match_type"] for item in stale] == ["partial"]
+    data = client.get("/api/jizdy/vyhledat?odkud=Humpolec&kam=Praha").get_json()
+    assert [(item["match_type"], item["ride"]["id"]) for item in data] == [("full", jizda.id)]
+
+
+def test_update_ride_applies_minimal_stopover_diff(
+    client, create_verified_user, create_auto, create_ride, auth_headers
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    jizda = create_ride(
+        ridic,
+        auto,
+        odkud="Brno",
+        kam="Praha",
+        mezistanice=[{"misto": "Jihlava"}, {"misto": "Humpolec"}, {"misto": "Kolin"}],
+    )
+    stop_ids = {stop.misto: stop.id for stop in jizda.mezistanice}
+    point_ids = {bod.poradi: bod.id for bod in jizda.body_trasy}
+    statements = []
+
+    def record_statement(_conn, _cursor, statement, *_args):
+        if statement.lstrip().split()[0].upper() in {"INSERT", "UPDATE", "DELETE"}:
+            statements.append(" ".join(statement.split()[:3]))
+
+    event.listen(db.engine, "before_cursor_execute", record_statement)
+    try:
+        response = client.put(
+            f"/api/jizdy/{jizda.id}",
+            json={"mezistanice": ["Jihlava", "Kolin", "Havlickuv Brod"]},
+            headers=auth_headers("ridic@example.com"),
+        )
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record_statement)
+
+    assert response.status_code == 200
+    db.session.expire_all()
+    stops = [(stop.misto, stop.poradi, stop.id) for stop in jizda.mezistanice]
+    assert stops[:2] == [("Jihlava", 1, stop_ids["Jihlava"]), ("Kolin", 2, stop_ids["Kolin"])]
+    assert stops[2][:2] == ("Havlickuv Brod", 3)
+    assert stop_ids["Humpolec"] not in {stop_id for _, _, stop_id in stops}
+
+    body = [(bod.poradi, bod.normalizovany_text, bod.id) for bod in jizda.body_trasy]
+    assert [text for _, text, _ in body] == ["brno", "jihlava", "kolin", "havlickuv brod", "praha"]
+    # Stejný počet bodů: změněné pozice 2 a 3 se přepíšou na místě, ostatní řádky zůstanou.
+    assert [bod_id for _, _, bod_id in body] == [point_ids[poradi] for poradi in range(5)]
+    # Slova se přepíšou jen u dvou bodů se změněným textem.
+    slova = sorted((slovo.poradi, slovo.normalizovany_text) for slovo in jizda.slova_bodu_trasy)
+    assert slova == [
+        (0, "brno"),
+        (1, "jihlava"),
+        (2, "kolin"),
+        (3, "brod"),
+        (3, "havlickuv brod"),
+        (4, "praha"),
+    ]
+    assert sorted(statements) == [
+        "DELETE FROM mezistanice",
+        "DELETE FROM slovo_bodu_trasy",
+        "INSERT INTO mezistanice",
+        "INSERT INTO slovo_bodu_trasy",
+        "UPDATE bod_trasy SET",
+        "UPDATE mezistanice SET",
+    ]
+
+
+def test_update_ride_without_route_change_keeps_route_rows(
+    client, create_verified_user, create_auto, create_ride, auth_headers
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    jizda = create_ride(ridic, auto, mezistanice=[{"misto": "Jihlava"}])
+    statements = []
+
+    def record_statement(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record_statement)
+    try:
+        response = client.put(
+            f"/api/jizdy/{jizda.id}",
+            json={"pocet_mist": 4, "mezistanice": ["Jihlava"]},
+            headers=auth_headers("ridic@example.com"),
+        )
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record_statement)
+
+    assert response.status_code == 200
+    writes = [statement for statement in statements if "mezistanice" in statement or "bod_trasy" in statement]
+    assert not [statement for statement in writes if statement.lstrip().split()[0].upper() != "SELECT"]
+
+
+def test_get_rides_paginates_with_cursor(client, create_verified_user, create_auto, create_ride):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    departure = utc_now() + timedelta(days=1)
+    ride_ids = [
+        create_ride(ridic, auto, departure=departure + timedelta(days=offset)).id
+        for offset in range(5)
+    ]
+
+    seen_ids = []
+    cursor = None
+    for _ in range(3):
+        url = "/api/jizdy/?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        data = client.get(url).get_json()
+        seen_ids.extend(item["id"] for item in data["jizdy"])
+        # Celkový počet se vztahuje k celému filtru, ne k délce stránky.
+        assert data["celkem"] == 5
+        assert data["ma_dalsi"] is (data["next_cursor"] is not None)
+        cursor = data["next_cursor"]
+
+    assert seen_ids == ride_ids
+    assert cursor is None
+
+
+def test_search_rides_paginates_full_matches_before_partial(
+    client, create_verified_user, create_auto, create_ride
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    departure = utc_now() + timedelta(days=1)
+    partial = create_ride(ridic, auto, odkud="Brno", kam="Plzen", departure=departure)
+    full_ids = [
+        create_ride(ridic, auto, odkud="Brno", kam="Praha", departure=departure + timedelta(days=offset)).id
+        for offset in range(1, 4)
+    ]
+
+    first = client.get("/api/jizdy/vyhledat?odkud=Brno&kam=Praha&limit=2").get_json()
+    second = client.get(
+        f"/api/jizdy/vyhledat?odkud=Brno&kam=Praha&limit=2&cursor={first['next_cursor']}"
+    ).get_json()
+
+    assert [(item["match_type"], item["ride"]["id"]) for item in first["vysledky"]] == [
+        ("full", full_ids[0]),
+        ("full", full_ids[1]),
+    ]
+    assert [(item["match_type"], item["ride"]["id"]) for item in second["vysledky"]] == [
+        ("full", full_ids[2]),
+        ("partial", partial.id),
+    ]
+    assert second["next_cursor"] is None
+
+
+@pytest.mark.parametrize(
+    ("query", "expected_error"),
+    [
+        ("limit=abc", "Pole limit musí být celé číslo"),
+        ("limit=0", "Pole limit musí být větší než 0"),
+        ("cursor=neplatny", "Neplatný kurzor stránkování"),
+    ],
+)
+def test_ride_listing_rejects_invalid_pagination(client, query, expected_error):
+    for url in (f"/api/jizdy/?{query}", f"/api/jizdy/vyhledat?odkud=Brno&{query}"):
+        response = client.get(url)
+
+        assert response.status_code == 400
+        assert _error_text(response) == expected_error
+
+
 def test_get_newest_rides_returns_latest_first(client, create_verified_user, create_auto, create_ride):
     ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
     auto = create_auto(ridic)
@@ -706,6 +1204,142 @@ def test_get_newest_rides_returns_latest_first(client, create_verified_user, cre
     assert {item["id"] for item in data} == {older.id, newer.id}
 
 
+def _count_sql_statements(client, url, headers=None):
+    statements = []
+
+    def _record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", _record_statement)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", _record_statement)
+
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/api/jizdy/",
+        "/api/jizdy/vyhledat?odkud=Brno&kam=Praha",
+        "/api/jizdy/nejnovejsi",
+        "/api/jizdy/moje",
+        "/api/rezervace/moje",
+        "/api/jizdy/?view=summary",
+        "/api/jizdy/vyhledat?odkud=Brno&kam=Praha&view=summary",
+        "/api/jizdy/nejnovejsi?view=summary",
+    ],
+)
+def test_ride_lists_use_constant_number_of_queries(
+    client,
+    create_verified_user,
+    create_auto,
+    create_ride,
+    create_accepted_reservation,
+    rating_factory,
+    auth_headers,
+    url,
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    headers = auth_headers("ridic@example.com")
+
+    def _add_rides(count, offset):
+        for index in range(offset, offset + count):
+            departure = utc_now() + timedelta(days=index + 1)
+            jizda = create_ride(
+                ridic,
+                auto,
+                departure=departure,
+                arrival=departure + timedelta(hours=1),
+                mezistanice=[{"misto": "Jihlava"}],
+            )
+            pasazer = create_verified_user(email=f"pasazer{index}@example.com", jmeno=f"Pasazer {index}")
+            create_accepted_reservation(pasazer, jizda)
+            rating_factory(autor=pasazer, cilovy=ridic, jizda=jizda)
+            rating_factory(autor=ridic, cilovy=pasazer, jizda=jizda, role="pasazer")
+
+    _add_rides(1, 0)
+    single_ride_queries = _count_sql_statements(client, url, headers)
+
+    _add_rides(5, 1)
+    many_rides_queries = _count_sql_statements(client, url, headers)
+
+    assert many_rides_queries == single_ride_queries
+
+
+def test_ride_lists_summary_view_returns_lightweight_rides(
+    client,
+    create_verified_user,
+    create_auto,
+    create_ride,
+    create_accepted_reservation,
+    rating_factory,
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    pasazer = create_verified_user(email="pasazer@example.com", jmeno="Pasazer")
+    druhy = create_verified_user(email="druhy@example.com", jmeno="Druhy")
+    auto = create_auto(ridic)
+    jizda = create_ride(ridic, auto, departure=utc_now() + timedelta(days=1), mezistanice=[{"misto": "Jihlava"}])
+    create_accepted_reservation(pasazer, jizda)
+    rating_factory(autor=pasazer, cilovy=ridic, jizda=jizda, znamka=5)
+    rating_factory(autor=druhy, cilovy=ridic, jizda=jizda, znamka=4)
+    rating_factory(autor=ridic, cilovy=pasazer, jizda=jizda, role="pasazer", znamka=1)
+
+    listing = client.get("/api/jizdy/?view=summary").get_json()["jizdy"]
+    search = client.get("/api/jizdy/vyhledat?odkud=Brno&kam=Praha&view=summary").get_json()
+    newest = client.get("/api/jizdy/nejnovejsi?view=summary").get_json()
+
+    expected = {
+        "id": jizda.id,
+        "ridic_id": ridic.id,
+        "ridic": {"jmeno": "Ridic", "hodnoceni_ridic": 4.5},
+        "odkud": jizda.odkud,
+        "kam": jizda.kam,
+        "cas_odjezdu": jizda.cas_odjezdu.isoformat(),
+        "cas_prijezdu": jizda.cas_prijezdu.isoformat(),
+        "cena": jizda.cena,
+        "volna_mista": jizda.pocet_mist - 1,
+        "status": "aktivni",
+        "okamzita_rezervace": False,
+    }
+    assert listing == [expected]
+    assert search == [{"match_type": "full", "ride": expected}]
+    assert newest == [expected]
+
+    full = client.get("/api/jizdy/").get_json()["jizdy"][0]
+    assert full["ridic"]["hodnoceni_ridic"] == expected["ridic"]["hodnoceni_ridic"]
+
+
+def test_ride_list_summary_view_uses_fewer_queries(
+    client,
+    create_verified_user,
+    create_auto,
+    create_ride,
+    create_accepted_reservation,
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    pasazer = create_verified_user(email="pasazer@example.com", jmeno="Pasazer")
+    auto = create_auto(ridic)
+    jizda = create_ride(ridic, auto, departure=utc_now() + timedelta(days=1), mezistanice=[{"misto": "Jihlava"}])
+    create_accepted_reservation(pasazer, jizda)
+
+    # Plný tvar dotahuje auta, hodnocení, pasažéry a mezistanice, souhrn jen jméno a průměr řidiče.
+    assert _count_sql_statements(client, "/api/jizdy/?view=summary") == 2
+    assert _count_sql_statements(client, "/api/jizdy/") > 2
+
+
+def test_ride_lists_reject_unknown_view(client):
+    for url in ("/api/jizdy/?view=mini", "/api/jizdy/vyhledat?odkud=Brno&view=mini", "/api/jizdy/nejnovejsi?view=mini"):
+        response = client.get(url)
+
+        assert response.status_code == 400
+        assert "view" in _error_text(response)
+
+
 def test_remove_passenger_success(
     client,
     create_verified_user,
@@ -781,3 +1415,417 @@ def test_remove_passenger_rejected_too_close_to_departure(
 
     assert response.status_code == 400
     assert "1 hodinu před odjezdem" in _error_text(response)
+
+
+def test_search_rides_filters_by_postal_region(client, create_verified_user, create_auto, create_ride):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    borovany, bavorov, jihlava = (search_cities(name, ranked=True)[0] for name in ("Borovany", "Bavorov", "Jihlava"))
+    jizda = create_ride(
+        ridic,
+        auto,
+        odkud="Borovany",
+        kam="Jihlava",
+        odkud_place_id=borovany["place_id"],
+        kam_place_id=jihlava["place_id"],
+        mezistanice=[{"misto": "Bavorov", "place_id": bavorov["place_id"]}],
+    )
+    assert [bod.region for bod in BodTrasy.query.order_by(BodTrasy.poradi)] == ["37", "38", "58"]
+
+    def search(query):
+        return [(item["match_type"], item["ride"]["id"]) for item in client.get(f"/api/jizdy/vyhledat?{query}").get_json()]
+
+    assert search("odkud_region=37x") == [("partial", jizda.id)]
+    assert search("odkud_region=3&kam_region=58") == [("full", jizda.id)]
+    assert search("odkud_region=38&kam=Jihlava") == [("full", jizda.id)]
+    assert search("odkud_region=58&kam_region=37") == []
+    assert search("odkud=Borovany&odkud_region=38") == []
+
+
+def test_search_rides_rejects_invalid_region(client):
+    response = client.get("/api/jizdy/vyhledat?odkud_region=abc")
+
+    assert response.status_code == 400
+    assert "region" in response.get_json()["error"]
+
+
+def _prague_to_utc(den, cas):
+    return datetime.combine(den, cas, tzinfo=ZoneInfo("Europe/Prague")).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _template_payload(auto_id, **overrides):
+    payload = {
+        "auto_id": auto_id,
+        "odkud": "Brno",
+        "kam": "Praha",
+        "mezistanice": ["Jihlava"],
+        "cas_odjezdu": "07:00",
+        "cas_prijezdu": "09:30",
+        "cena": 150,
+        "pocet_mist": 3,
+        "dny_v_tydnu": [0, 1, 2, 3, 4],
+        "pocet_opakovani": 10,
+        "datum_od": (utc_now() + timedelta(days=1)).date().isoformat(),
+    }
+    payload.update(overrides)
+    return payload
+
+
+def test_create_ride_template_generates_occurrences_in_batch(
+    client, create_verified_user, create_auto, auth_headers
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    jizda_inserts = []
+
+    def record_insert(_conn, _cursor, statement, *_args):
+        if statement.lstrip().upper().startswith("INSERT INTO JIZDA "):
+            jizda_inserts.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record_insert)
+    try:
+        response = client.post(
+            "/api/jizdy/sablony",
+            json=_template_payload(auto.id),
+            headers=auth_headers("ridic@example.com"),
+        )
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record_insert)
+
+    assert response.status_code == 201, response.get_json()
+    data = response.get_json()
+    assert data["sablona"]["dny_v_tydnu"] == [0, 1, 2, 3, 4]
+    assert data["sablona"]["doba_jizdy"] == 150
+    assert len(jizda_inserts) == 1
+
+    jizdy = Jizda.query.order_by(Jizda.cas_odjezdu).all()
+    assert len(jizdy) == 10
+    assert all(jizda.sablona_id == data["sablona"]["id"] for jizda in jizdy)
+    assert all(jizda.cas_odjezdu.weekday() < 5 for jizda in jizdy)
+    assert all(jizda.cas_prijezdu - jizda.cas_odjezdu == timedelta(minutes=150) for jizda in jizdy)
+    assert all([m.misto for m in jizda.mezistanice] == ["Jihlava"] for jizda in jizdy)
+    assert BodTrasy.query.count() == 30
+    assert SlovoBoduTrasy.query.count() == 30
+
+
+def test_ride_instant_booking_flag_is_saved_and_propagated_from_template(
+    client, create_verified_user, create_auto, auth_headers, ride_payload
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    headers = auth_headers("ridic@example.com")
+
+    invalid = client.post(
+        "/api/jizdy/", json=ride_payload(auto.id, overrides={"okamzita_rezervace": "ano"}), headers=headers
+    )
+    created = client.post(
+        "/api/jizdy/", json=ride_payload(auto.id, overrides={"okamzita_rezervace": True}), headers=headers
+    )
+
+    assert invalid.status_code == 400
+    assert "okamzita_rezervace" in invalid.get_json()["error"]
+    assert created.status_code == 201
+    assert created.get_json()["jizda"]["okamzita_rezervace"] is True
+
+    jizda_id = created.get_json()["jizda"]["id"]
+    updated = client.put(f"/api/jizdy/{jizda_id}", json={"okamzita_rezervace": False}, headers=headers)
+    assert updated.get_json()["jizda"]["okamzita_rezervace"] is False
+
+    sablona = client.post(
+        "/api/jizdy/sablony",
+        json=_template_payload(
+            auto.id,
+            okamzita_rezervace=True,
+            pocet_opakovani=2,
+            datum_od=(utc_now() + timedelta(days=10)).date().isoformat(),
+        ),
+        headers=headers,
+    )
+    assert sablona.status_code == 201, sablona.get_json()
+    assert sablona.get_json()["sablona"]["okamzita_rezervace"] is True
+    assert [jizda["okamzita_rezervace"] for jizda in sablona.get_json()["jizdy"]] == [True, True]
+
+
+def test_create_ride_template_rejects_overlap_with_existing_ride(
+    client, create_verified_user, create_auto, create_ride, auth_headers
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    den = (utc_now() + timedelta(days=3)).date()
+    existing = create_ride(
+        ridic,
+        auto,
+        departure=_prague_to_utc(den, time(8, 0)),
+        arrival=_prague_to_utc(den, time(10, 0)),
+    )
+
+    response = client.post(
+        "/api/jizdy/sablony",
+        json=_template_payload(auto.id, dny_v_tydnu=list(range(7))),
+        headers=auth_headers("ridic@example.com"),
+    )
+
+    assert response.status_code == 409
+    data = response.get_json()
+    assert data["kolizni_jizda"]["id"] == existing.id
+    assert data["termin"]["cas_odjezdu"] == _prague_to_utc(den, time(7, 0)).isoformat()
+    assert Jizda.query.count() == 1
+    assert SablonaJizdy.query.count() == 0
+
+
+def test_create_ride_template_validates_days(client, create_verified_user, create_auto, auth_headers):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+
+    response = client.post(
+        "/api/jizdy/sablony",
+        json=_template_payload(auto.id, dny_v_tydnu=[7]),
+        headers=auth_headers("ridic@example.com"),
+    )
+
+    assert response.status_code == 400
+    assert "dny_v_tydnu" in _error_text(response)
+
+
+def test_update_ride_template_propagates_to_unbooked_future_rides(
+    client, create_verified_user, create_auto, create_accepted_reservation, auth_headers
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    pasazer = create_verified_user(email="pasazer@example.com", jmeno="Pasazer")
+    auto = create_auto(ridic)
+    created = client.post(
+        "/api/jizdy/sablony",
+        json=_template_payload(auto.id, pocet_opakovani=4),
+        headers=auth_headers("ridic@example.com"),
+    ).get_json()
+    sablona_id = created["sablona"]["id"]
+    rezervovana = db.session.get(Jizda, created["jizdy"][0]["id"])
+    create_accepted_reservation(pasazer, rezervovana)
+    puvodni_odjezd = rezervovana.cas_odjezdu
+
+    response = client.put(
+        f"/api/jizdy/sablony/{sablona_id}",
+        json={"cas_odjezdu": "08:00", "cena": 180, "mezistanice": ["Humpolec"], "kam": "Kolin"},
+        headers=auth_headers("ridic@example.com"),
+    )
+
+    assert response.status_code == 200, response.get_json()
+    data = response.get_json()
+    assert len(data["aktualizovane_jizdy"]) == 3
+    assert rezervovana.id not in data["aktualizovane_jizdy"]
+
+    db.session.expire_all()
+    for jizda in Jizda.query.filter(Jizda.id.in_(data["aktualizovane_jizdy"])):
+        assert jizda.cas_odjezdu == _prague_to_utc(jizda.cas_odjezdu.date(), time(8, 0))
+        assert jizda.cas_prijezdu - jizda.cas_odjezdu == timedelta(minutes=150)
+        assert (jizda.cena, jizda.kam) == (180, "Kolin")
+        assert [m.misto for m in jizda.mezistanice] == ["Humpolec"]
+        assert [bod.normalizovany_text for bod in jizda.body_trasy][-1] == "kolin"
+    assert (rezervovana.cas_odjezdu, rezervovana.cena, rezervovana.kam) == (puvodni_odjezd, 150, "Praha")
+
+
+def test_update_ride_template_rejects_foreign_driver(client, create_verified_user, create_auto, auth_headers):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    create_verified_user(email="cizi@example.com", jmeno="Cizi")
+    auto = create_auto(ridic)
+    sablona_id = client.post(
+        "/api/jizdy/sablony",
+        json=_template_payload(auto.id, pocet_opakovani=1),
+        headers=auth_headers("ridic@example.com"),
+    ).get_json()["sablona"]["id"]
+
+    response = client.put(
+        f"/api/jizdy/sablony/{sablona_id}",
+        json={"cena": 1},
+        headers=auth_headers("cizi@example.com"),
+    )
+
+    assert response.status_code == 403
+
+
+def test_generate_more_template_rides_continues_after_last(
+    client, create_verified_user, create_auto, auth_headers
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    sablona_id = client.post(
+        "/api/jizdy/sablony",
+        json=_template_payload(auto.id, pocet_opakovani=3),
+        headers=auth_headers("ridic@example.com"),
+    ).get_json()["sablona"]["id"]
+
+    response = client.post(
+        f"/api/jizdy/sablony/{sablona_id}/generovat",
+        json={"pocet_opakovani": 5},
+        headers=auth_headers("ridic@example.com"),
+    )
+
+    assert response.status_code == 201, response.get_json()
+    odjezdy = [jizda.cas_odjezdu for jizda in Jizda.query.order_by(Jizda.cas_odjezdu)]
+    assert len(odjezdy) == 8
+    assert len({odjezd.date() for odjezd in odjezdy}) == 8
+
+
+def test_ride_template_keeps_local_departure_across_dst_change(app):
+    # V roce 2030 se v Praze přechází na letní čas v neděli 31. 3.
+    sablona = SablonaJizdy(cas_odjezdu=time(7, 0), casova_zona="Europe/Prague", doba_jizdy=90)
+    sablona.set_dny_v_tydnu(range(7))
+
+    terminy = sablona.terminy(date(2030, 3, 29), 4, now=datetime(2030, 1, 1))
+
+    assert [odjezd for odjezd, _ in terminy] == [
+        datetime(2030, 3, 29, 6, 0),
+        datetime(2030, 3, 30, 6, 0),
+        datetime(2030, 3, 31, 5, 0),
+        datetime(2030, 4, 1, 5, 0),
+    ]
+    assert all(prijezd - odjezd == timedelta(minutes=90) for odjezd, prijezd in terminy)
+
+
+def test_ride_template_weekdays_follow_local_date(
+    client, create_verified_user, create_auto, auth_headers
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    auto = create_auto(ridic)
+    headers = auth_headers("ridic@example.com")
+
+    # Pondělí 0:30 v Praze je v UTC ještě neděle večer.
+    response = client.post(
+        "/api/jizdy/sablony",
+        json=_template_payload(
+            auto.id,
+            cas_odjezdu="00:30",
+            cas_prijezdu="02:00",
+            dny_v_tydnu=[0],
+            pocet_opakovani=2,
+            datum_od="2030-07-01",
+        ),
+        headers=headers,
+    )
+
+    assert response.status_code == 201, response.get_json()
+    assert response.get_json()["sablona"]["casova_zona"] == "Europe/Prague"
+    assert [jizda["cas_odjezdu"] for jizda in response.get_json()["jizdy"]] == [
+        "2030-06-30T22:30:00",
+        "2030-07-07T22:30:00",
+    ]
+
+    sablona_id = response.get_json()["sablona"]["id"]
+    response = client.put(f"/api/jizdy/sablony/{sablona_id}", json={"cas_odjezdu": "01:00"}, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    db.session.expire_all()
+    assert [jizda.cas_odjezdu for jizda in Jizda.query.order_by(Jizda.cas_odjezdu)] == [
+        datetime(2030, 6, 30, 23, 0),
+        datetime(2030, 7, 7, 23, 0),
+    ]
+
+    invalid = client.put(f"/api/jizdy/sablony/{sablona_id}", json={"casova_zona": "Mars/Base"}, headers=headers)
+    assert invalid.status_code == 400
+    assert "casova_zona" in _error_text(invalid)
+
+
+def _save_search(client, headers, **payload):
+    response = client.post("/api/jizdy/ulozena-hledani", json=payload, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()["ulozene_hledani"]
+
+
+def test_saved_search_crud(client, create_verified_user, auth_headers):
+    create_verified_user(email="pasazer@example.com", jmeno="Pasazer")
+    create_verified_user(email="cizi@example.com", jmeno="Cizi")
+    headers = auth_headers("pasazer@example.com")
+
+    hledani = _save_search(client, headers, odkud="Brno", kam="Praha", datum_od="2030-01-01", pocet_mist=2)
+    assert (hledani["odkud"], hledani["kam"], hledani["pocet_mist"]) == ("Brno", "Praha", 2)
+    assert client.get("/api/jizdy/ulozena-hledani", headers=headers).get_json()["ulozena_hledani"] == [hledani]
+
+    assert client.post("/api/jizdy/ulozena-hledani", json={"pocet_mist": 1}, headers=headers).status_code == 400
+    foreign = client.delete(f"/api/jizdy/ulozena-hledani/{hledani['id']}", headers=auth_headers("cizi@example.com"))
+    assert foreign.status_code == 403
+    assert client.delete(f"/api/jizdy/ulozena-hledani/{hledani['id']}", headers=headers).status_code == 200
+    assert UlozeneHledani.query.count() == 0
+
+
+def test_create_ride_notifies_matching_saved_searches_once(
+    client, create_verified_user, create_auto, auth_headers, ride_payload
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    shoda = create_verified_user(email="shoda@example.com", jmeno="Shoda")
+    opacne = create_verified_user(email="opacne@example.com", jmeno="Opacne")
+    pozde = create_verified_user(email="pozde@example.com", jmeno="Pozde")
+    auto = create_auto(ridic)
+    departure = utc_now() + timedelta(days=2)
+    den = departure.date().isoformat()
+    _save_search(client, auth_headers("shoda@example.com"), odkud="Jihlava", kam="praha", datum_od=den)
+    _save_search(client, auth_headers("shoda@example.com"), kam="Praha")
+    _save_search(client, auth_headers("opacne@example.com"), odkud="Praha", kam="Brno")
+    _save_search(
+        client,
+        auth_headers("pozde@example.com"),
+        odkud="Brno",
+        datum_od=(departure + timedelta(days=1)).date().isoformat(),
+    )
+    _save_search(client, auth_headers("ridic@example.com"), odkud="Brno")
+    headers = auth_headers("ridic@example.com")
+
+    response = client.post(
+        "/api/jizdy/",
+        json=ride_payload(auto.id, departure=departure, overrides={"mezistanice": ["Jihlava"]}),
+        headers=headers,
+    )
+    assert response.status_code == 201
+    jizda_id = response.get_json()["jizda"]["id"]
+    client.put(f"/api/jizdy/{jizda_id}", json={"pocet_mist": 4}, headers=headers)
+
+    oznameni = Oznameni.query.filter_by(typ="ulozene_hledani").all()
+    assert [(item.prijemce_id, item.jizda_id) for item in oznameni] == [(shoda.id, jizda_id)]
+    assert oznameni[0].target_path == f"/?focusRide={jizda_id}"
+    assert Oznameni.query.filter(Oznameni.prijemce_id.in_([opacne.id, pozde.id, ridic.id])).count() == 0
+
+
+def test_saved_search_candidates_come_from_place_id_index(app, create_verified_user, create_auto, create_ride):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    pasazer = create_verified_user(email="pasazer@example.com", jmeno="Pasazer")
+    auto = create_auto(ridic)
+    borovany, jihlava, bavorov = (search_cities(name, ranked=True)[0] for name in ("Borovany", "Jihlava", "Bavorov"))
+    na_trase = UlozeneHledani(uzivatel_id=pasazer.id, odkud="Borovany", odkud_place_id=borovany["place_id"])
+    mimo_trasu = UlozeneHledani(uzivatel_id=pasazer.id, odkud="Bavorov", odkud_place_id=bavorov["place_id"])
+    db.session.add_all([na_trase, mimo_trasu])
+    db.session.commit()
+    jizda = create_ride(
+        ridic,
+        auto,
+        odkud="Borovany",
+        kam="Jihlava",
+        odkud_place_id=borovany["place_id"],
+        kam_place_id=jihlava["place_id"],
+    )
+
+    kandidati = saved_searches._kandidatni_hledani([jizda], {jizda.id: route_point_values(jizda)})
+
+    assert kandidati == [na_trase]
+    assert saved_searches.upozornit_na_ulozena_hledani([jizda]) == 1
+
+
+def test_saved_search_text_candidates_come_from_normalized_text_index(
+    app, create_verified_user, create_auto, create_ride
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    pasazer = create_verified_user(email="pasazer@example.com", jmeno="Pasazer")
+    auto = create_auto(ridic)
+    hledani = [
+        UlozeneHledani(uzivatel_id=pasazer.id, odkud=odkud, kam=kam)
+        for odkud, kam in [("Ústí n", None), (None, "jihl"), ("Ostrava", None), ("abem", None), ("Labem", None)]
+    ]
+    for item in hledani:
+        item.nastavit_normalizovany_text()
+    db.session.add_all(hledani)
+    db.session.commit()
+    jizda = create_ride(ridic, auto, odkud="Ústí nad Labem", kam="Praha", mezistanice=[{"misto": "Jihlava"}])
+
+    kandidati = saved_searches._kandidatni_hledani([jizda], {jizda.id: route_point_values(jizda)})
+
+    # Ostrava ani text uprostřed slova se z indexu vůbec nenačtou.
+    assert sorted(item.id for item in kandidati) == [hledani[0].id, hledani[1].id, hledani[4].id]
+    assert saved_searches.upozornit_na_ulozena_hledani([jizda]) == 1
+
@@ -0,0 +1,142 @@
+import threading
+
+import pytest
+
+from app import create_app
+from models import db
+from models.jizda import Jizda
+from models.rezervace import Rezervace
+
+
+@pytest.fixture
+def app(tmp_path):
+    # Souběh potřebuje skutečná samostatná spojení, sdílené in-memory spojení by ho zakrylo.
+    app = create_app(
+        test_config={
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'soubeh.db'}",
+            "SQLALCHEMY_ENGINE_OPTIONS": {"connect_args": {"check_same_thread": False, "timeout": 30}},
+            "JWT_SECRET_KEY": "test-jwt-secret",
+        }
+    )
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_obsadit_mista_refuses_to_overbook(app, create_verified_user, create_auto, create_ride):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    jizda = create_ride(ridic, create_auto(ridic), pocet_mist=3)
+
+    assert jizda.obsadit_mista(2) is True
+    assert jizda.obsadit_mista(2) is False
+    assert jizda.obsadit_mista(1) is True
+    db.session.commit()
+
+    assert jizda.obsazena_mista == 3
+    assert jizda.get_volna_mista() == 0
+
+
+def test_concurrent_accepts_never_exceed_ride_capacity(
+    app, client, create_verified_user, create_auto, create_ride, reservation_factory, auth_headers
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    jizda = create_ride(ridic, create_auto(ridic), pocet_mist=3)
+    rezervace_ids = [
+        reservation_factory(
+            create_verified_user(email=f"pasazer{index}@example.com", jmeno=f"Pasazer {index}"),
+            jizda,
+        ).id
+        for index in range(10)
+    ]
+    headers = auth_headers("ridic@example.com")
+
+    # Každou rezervaci přijímají dvě vlákna naráz, takže se soupeří o místa i o stejnou rezervaci.
+    pokusy = rezervace_ids * 2
+    barrier = threading.Barrier(len(pokusy))
+    status_codes = []
+    lock = threading.Lock()
+
+    def accept(rezervace_id):
+        thread_client = app.test_client()
+        barrier.wait()
+        response = thread_client.post(f"/api/rezervace/{rezervace_id}/prijmout", headers=headers)
+        with lock:
+            status_codes.append(response.status_code)
+
+    threads = [threading.Thread(target=accept, args=(rezervace_id,)) for rezervace_id in pokusy]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(status_codes) == [200] * 3 + [400] * (len(pokusy) - 3)
+
+    db.session.expire_all()
+    jizda = db.session.get(Jizda, jizda.id)
+    prijate = Rezervace.query.filter_by(jizda_id=jizda.id, status="prijata").all()
+    assert len(prijate) == 3
+    assert jizda.obsazena_mista == 3
+    assert jizda.pocet_cekajicich == 7
+    assert {pasazer.id for pasazer in jizda.pasazeri} == {rezervace.uzivatel_id for rezervace in prijate}
+
+
+def test_zmenit_pocet_mist_refuses_to_drop_below_occupied_seats(app, create_verified_user, create_auto, create_ride):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    jizda = create_ride(ridic, create_auto(ridic), pocet_mist=3)
+    assert jizda.obsadit_mista(2) is True
+
+    assert jizda.zmenit_pocet_mist(1) is False
+    assert jizda.pocet_mist == 3
+    assert jizda.zmenit_pocet_mist(2) is True
+    db.session.commit()
+
+    assert (jizda.pocet_mist, jizda.obsazena_mista) == (2, 2)
+
+
+def test_concurrent_accepts_and_capacity_change_keep_ride_consistent(
+    app, client, create_verified_user, create_auto, create_ride, reservation_factory, auth_headers
+):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    jizda = create_ride(ridic, create_auto(ridic), pocet_mist=3)
+    rezervace_ids = [
+        reservation_factory(
+            create_verified_user(email=f"pasazer{index}@example.com", jmeno=f"Pasazer {index}"),
+            jizda,
+        ).id
+        for index in range(3)
+    ]
+    jizda_id = jizda.id
+    headers = auth_headers("ridic@example.com")
+    barrier = threading.Barrier(len(rezervace_ids) + 1)
+    status_codes = {}
+
+    def accept(rezervace_id):
+        thread_client = app.test_client()
+        barrier.wait()
+        thread_client.post(f"/api/rezervace/{rezervace_id}/prijmout", headers=headers)
+
+    def shrink():
+        thread_client = app.test_client()
+        barrier.wait()
+        response = thread_client.put(f"/api/jizdy/{jizda_id}", json={"pocet_mist": 1}, headers=headers)
+        status_codes["zmena"] = response.status_code
+
+    threads = [threading.Thread(target=accept, args=(rezervace_id,)) for rezervace_id in rezervace_ids]
+    threads.append(threading.Thread(target=shrink))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    db.session.expire_all()
+    jizda = db.session.get(Jizda, jizda_id)
+    prijate = Rezervace.query.filter_by(jizda_id=jizda_id, status="prijata").count()
+    assert status_codes["zmena"] in (200, 400)
+    assert jizda.pocet_mist == (1 if status_codes["zmena"] == 200 else 3)
+    assert jizda.obsazena_mista == prijate
+    assert jizda.obsazena_mista <= jizda.pocet_mist
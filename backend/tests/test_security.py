@@ -325,6 +325,39 @@ def test_pending_ratings_returns_completed_unrated_ride(
     assert pending[0]["jizda_id"] == jizda.id
 
 
+def test_pending_ratings_include_unswept_finished_ride_without_writing(
+    client, create_verified_user, create_auto, create_ride, create_accepted_reservation, auth_headers
+):
+    ridic = create_verified_user(email="ridic-unswept@example.com", jmeno="Ridic")
+    pasazer = create_verified_user(email="pasazer-unswept@example.com", jmeno="Pasazer")
+    auto = create_auto(ridic)
+    jizda = create_ride(
+        ridic,
+        auto,
+        departure=utc_now() - timedelta(hours=3),
+        arrival=utc_now() - timedelta(hours=1),
+        status="aktivni",
+    )
+    create_accepted_reservation(pasazer, jizda)
+
+    response = client.get("/api/hodnoceni/pending", headers=auth_headers("pasazer-unswept@example.com"))
+
+    assert response.status_code == 200
+    assert [item["jizda_id"] for item in response.get_json()["pending"]] == [jizda.id]
+    db.session.refresh(jizda)
+    assert jizda.status == "aktivni"
+    assert Oznameni.query.filter_by(prijemce_id=pasazer.id).count() == 0
+
+    rating = client.post(
+        "/api/hodnoceni/",
+        json={"jizda_id": jizda.id, "cilovy_uzivatel_id": ridic.id, "role": "ridic", "znamka": 5},
+        headers=auth_headers("pasazer-unswept@example.com"),
+    )
+    assert rating.status_code == 201, rating.get_json()
+    db.session.refresh(jizda)
+    assert jizda.status == "aktivni"
+
+
 @pytest.mark.parametrize(
     ("method", "url"),
     [
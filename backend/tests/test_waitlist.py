@@ -0,0 +1,148 @@
+import threading
+from datetime import timedelta
+
+import utils.waitlist as waitlist_module
+from models import db
+from models.jizda import Jizda
+from models.oznameni import Oznameni
+from models.rezervace import Rezervace
+from utils.datetime_utils import utc_now
+from utils.waitlist import PROMOTER_EXTENSION_KEY, init_waitlist_promoter, zpracovat_naplanovana_povyseni
+
+
+def _plna_jizda_s_frontou(create_verified_user, create_auto, create_ride, reservation_factory, *, pocet_mist=2):
+    ridic = create_verified_user(email="ridic@example.com", jmeno="Ridic")
+    jizda = create_ride(ridic, create_auto(ridic), pocet_mist=pocet_mist)
+    prijata = reservation_factory(
+        create_verified_user(email="prijaty@example.com", jmeno="Prijaty"),
+        jizda,
+        status="prijata",
+        pocet_mist=pocet_mist,
+        dalsi_pasazeri=["Doprovod"] * (pocet_mist - 1),
+    )
+
+    zakladni_cas = utc_now() - timedelta(hours=1)
+    fronta = []
+    for index, mista in enumerate([1, 3, 1, 1]):
+        rezervace = reservation_factory(
+            create_verified_user(email=f"cekajici{index}@example.com", jmeno=f"Cekajici {index}"),
+            jizda,
+            pocet_mist=mista,
+            dalsi_pasazeri=["Doprovod"] * (mista - 1),
+        )
+        rezervace.vytvoreno = zakladni_cas + timedelta(minutes=index)
+        fronta.append(rezervace)
+    db.session.commit()
+    return ridic, jizda, prijata, fronta
+
+
+def test_cancelled_seats_promote_fifo_waitlist_outside_request(
+    client, create_verified_user, create_auto, create_ride, reservation_factory, auth_headers
+):
+    _, jizda, prijata, fronta = _plna_jizda_s_frontou(
+        create_verified_user, create_auto, create_ride, reservation_factory
+    )
+
+    response = client.delete(f"/api/rezervace/{prijata.id}/zrusit", headers=auth_headers("prijaty@example.com"))
+
+    assert response.status_code == 200
+    # Request jen naplánuje povýšení, rezervace zatím čekají.
+    assert Rezervace.query.filter_by(status="prijata").count() == 0
+
+    assert zpracovat_naplanovana_povyseni() == 2
+
+    db.session.expire_all()
+    # Druhá rezervace na 3 místa se nevejde, přeskočí se a povýší se další v pořadí.
+    assert [db.session.get(Rezervace, rezervace.id).status for rezervace in fronta] == [
+        "prijata",
+        "cekajici",
+        "prijata",
+        "cekajici",
+    ]
+    jizda = db.session.get(Jizda, jizda.id)
+    assert jizda.obsazena_mista == 2
+    assert jizda.pocet_cekajicich == 2
+    assert {pasazer.id for pasazer in jizda.pasazeri} == {fronta[0].uzivatel_id, fronta[2].uzivatel_id}
+    oznameni = Oznameni.query.filter_by(typ="rezervace_prijata").all()
+    assert sorted(o.prijemce_id for o in oznameni) == sorted([fronta[0].uzivatel_id, fronta[2].uzivatel_id])
+
+    assert zpracovat_naplanovana_povyseni() == 0
+
+
+def test_seat_events_for_one_ride_are_batched(
+    app, client, create_verified_user, create_auto, create_ride, reservation_factory, auth_headers
+):
+    _, jizda, prijata, fronta = _plna_jizda_s_frontou(
+        create_verified_user, create_auto, create_ride, reservation_factory
+    )
+    headers = auth_headers("ridic@example.com")
+
+    client.put(f"/api/jizdy/{jizda.id}", json={"pocet_mist": 3}, headers=headers)
+    client.delete(f"/api/jizdy/{jizda.id}/pasazeri/{prijata.uzivatel_id}", headers=headers)
+
+    queue = app.extensions[PROMOTER_EXTENSION_KEY]
+    assert queue.drain() == {jizda.id}
+
+    queue.push([jizda.id])
+    assert zpracovat_naplanovana_povyseni() == 3
+
+    db.session.expire_all()
+    assert [db.session.get(Rezervace, rezervace.id).status for rezervace in fronta] == [
+        "prijata",
+        "cekajici",
+        "prijata",
+        "prijata",
+    ]
+    assert db.session.get(Jizda, jizda.id).obsazena_mista == 3
+
+
+def test_waitlist_promoter_worker_processes_events_in_background(
+    app, client, create_verified_user, create_auto, create_ride, reservation_factory, auth_headers, monkeypatch
+):
+    _, jizda, prijata, fronta = _plna_jizda_s_frontou(
+        create_verified_user, create_auto, create_ride, reservation_factory
+    )
+    headers = auth_headers("prijaty@example.com")
+
+    zpracovano = threading.Event()
+    puvodni = waitlist_module.zpracovat_naplanovana_povyseni
+
+    def zpracovat_a_oznamit():
+        try:
+            return puvodni()
+        finally:
+            zpracovano.set()
+
+    monkeypatch.setattr(waitlist_module, "zpracovat_naplanovana_povyseni", zpracovat_a_oznamit)
+    monkeypatch.setitem(app.config, "TESTING", False)
+    monkeypatch.setitem(app.config, "RUN_BACKGROUND_WORKERS", True)
+    monkeypatch.setitem(app.config, "WAITLIST_PROMOTION_DELAY", 0.05)
+    queue = init_waitlist_promoter(app)
+    try:
+        response = client.delete(f"/api/rezervace/{prijata.id}/zrusit", headers=headers)
+        assert response.status_code == 200
+        assert zpracovano.wait(timeout=5)
+    finally:
+        queue.stop_event.set()
+
+    db.session.expire_all()
+    assert db.session.get(Rezervace, fronta[0].id).status == "prijata"
+    assert db.session.get(Jizda, jizda.id).obsazena_mista == 2
+
+
+def test_promote_waitlist_cli_catches_up_on_rides_with_free_seats(
+    app, create_verified_user, create_auto, create_ride, reservation_factory
+):
+    _, jizda, prijata, fronta = _plna_jizda_s_frontou(
+        create_verified_user, create_auto, create_ride, reservation_factory
+    )
+    # Uvolnění míst, o kterém worker nevěděl, např. před restartem procesu.
+    prijata.zmenit_status("zrusena")
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=["povysit-cekajici"])
+
+    assert result.exit_code == 0, result.output
+    assert "Povýšených rezervací: 2" in result.output
+    db.session.expire_all()
+    assert db.session.get(Jizda, jizda.id).obsazena_mista == 2
@@ -71,6 +71,12 @@ def parse_non_negative_float(value, field_name):
     return parsed, None
 
 
+def parse_bool(value, field_name):
+    if not isinstance(value, bool):
+        return None, f"Pole {field_name} musí být true nebo false"
+    return value, None
+
+
 def parse_iso_datetime(value, field_name):
     if value is None:
         return None, f"Pole {field_name} je povinné"
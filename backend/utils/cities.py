@@ -1,14 +1,61 @@
-import json
 import hashlib
-from functools import lru_cache
+import heapq
+import json
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from functools import cached_property, lru_cache
 from pathlib import Path
 
-from utils.text_normalization import normalize_search_text
+from utils.city_index import read_city_index, write_city_index
+from utils.text_normalization import WORD_BOUNDARY_RE, normalize_search_text
 
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 CITIES_JSON_PATH = BASE_DIR / "data" / "cities.json"
+CITIES_INDEX_PATH = BASE_DIR / "data" / "cities.idx"
+CITY_FIELDS = (
+    "place_id",
+    "name",
+    "display_name",
+    "address",
+    "_search_name",
+    "_search_address",
+    "_rank_name",
+    "psc",
+    "region",
+)
 RESULT_LIMIT = 10
+# Jak často (v sekundách) requesty kontrolují mtime cities.json a artefaktu indexu.
+CITIES_WATCH_INTERVAL = 5.0
+MIN_QUERY_LENGTH = 2
+SEARCH_CACHE_SIZE = 4096
+# Fuzzy fallback: symmetric-delete index nad prefixem názvu, ověření plnou editační vzdáleností.
+FUZZY_MIN_QUERY_LENGTH = 4
+FUZZY_MAX_DISTANCE = 2
+FUZZY_PREFIX_LENGTH = 7
+NGRAM_SIZE = 3
+# Administrativni prefixy nazvu, ktere pro razeni ignorujeme ("Statutarni mesto Brno" -> "brno").
+RANK_NAME_PREFIXES = (
+    "hlavni mesto ",
+    "statutarni mesto ",
+    "mestska cast ",
+    "mestsky obvod ",
+    "mesto ",
+    "mestys ",
+    "obec ",
+)
+# PSČ v adrese ("387 73 Bavorov"); region je bucket podle prvních dvou číslic.
+PSC_RE = re.compile(r"(?<!\d)(\d{3}) ?(\d{2})(?!\d)")
+REGION_FILTER_RE = re.compile(r"^(\d{1,2})x*$", re.IGNORECASE)
+
+RANK_EXACT = 0
+RANK_NAME_PREFIX = 1
+RANK_WORD_PREFIX = 2
+RANK_NAME_SUBSTRING = 3
+RANK_ADDRESS = 4
 
 
 def build_place_id(name, address):
@@ -27,11 +74,55 @@ def get_city_display_name(name):
     return normalized_name
 
 
-@lru_cache(maxsize=1)
-def load_cities():
-    if not CITIES_JSON_PATH.exists():
-        return []
+def get_city_rank_name(search_name):
+    for prefix in RANK_NAME_PREFIXES:
+        if search_name.startswith(prefix):
+            return search_name[len(prefix):]
+    return search_name
+
+
+def get_query_rank_name(normalized_query):
+    """Odstraní z dotazu administrativní prefix, pokud po něm zbude použitelný dotaz."""
+    rank_query = get_city_rank_name(normalized_query)
+    return rank_query if len(rank_query) >= MIN_QUERY_LENGTH else normalized_query
+
+
+def parse_psc(address):
+    """Vytáhne z adresy poslední PSČ ve tvaru "38773", nebo vrátí prázdný řetězec."""
+    matches = PSC_RE.findall(address or "")
+    if not matches:
+        return ""
+    return "".join(matches[-1])
+
+
+def get_region_from_psc(psc):
+    return psc[:2] if psc else ""
+
+
+def parse_region_filter(value):
+    """Převede filtr regionu ("37", "37x" nebo "3") na množinu dvoumístných bucketů."""
+    value = (value or "").strip()
+    if not value:
+        return None, None
+
+    match = REGION_FILTER_RE.match(value)
+    if not match:
+        return None, "Neplatný region, zadejte 1–2 první číslice PSČ (např. 37)"
+
+    digits = match.group(1)
+    if len(digits) == 1:
+        return frozenset(f"{digits}{suffix}" for suffix in "0123456789"), None
+    return frozenset([digits]), None
 
+
+def cities_source_hash():
+    # Seznam polí je součástí hashe, takže změna formátu záznamů zneplatní i starý artefakt.
+    digest = hashlib.sha256(CITIES_JSON_PATH.read_bytes())
+    digest.update("|".join(CITY_FIELDS).encode("utf-8"))
+    return digest.digest()
+
+
+def _parse_cities_json():
     with CITIES_JSON_PATH.open("r", encoding="utf-8") as cities_file:
         raw_data = json.load(cities_file)
 
@@ -45,36 +136,202 @@ def load_cities():
         if not name:
             continue
 
+        search_name = normalize_search_text(name)
+        psc = parse_psc(address)
         cities.append({
             "place_id": build_place_id(name, address),
             "name": name,
             "display_name": get_city_display_name(name),
             "address": address,
-            "_search_name": normalize_search_text(name),
+            "_search_name": search_name,
             "_search_address": normalize_search_text(address),
+            "_rank_name": get_city_rank_name(search_name),
+            "psc": psc,
+            "region": get_region_from_psc(psc),
         })
 
     return cities
 
 
-def search_cities(query, *, include_address=True, limit=RESULT_LIMIT):
-    normalized_query = normalize_search_text(query)
-    if len(normalized_query) < 2:
-        return []
+def build_city_index_artifact(path=None):
+    """Postaví binární index měst z cities.json a vrátí (počet měst, cesta k artefaktu)."""
+    path = Path(path) if path else CITIES_INDEX_PATH
+    cities = _parse_cities_json()
+    write_city_index(path, cities_source_hash(), cities, CITY_FIELDS)
+    return len(cities), path
+
+
+def _query_ngrams(text):
+    """Dotaz kratší než trigram hledáme přes bigramy, delší přes trigramy."""
+    size = min(len(text), NGRAM_SIZE)
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def _text_ngrams(text):
+    return {
+        text[i:i + size]
+        for size in range(MIN_QUERY_LENGTH, NGRAM_SIZE + 1)
+        for i in range(len(text) - size + 1)
+    }
+
+
+def _build_ngram_index(cities):
+    """Invertovaný index n-gram -> pozice měst, zvlášť pro název a adresu."""
+    index = {"name": {}, "address": {}}
+    for position, city in enumerate(cities):
+        for field in ("name", "address"):
+            postings = index[field]
+            for ngram in _text_ngrams(city[f"_search_{field}"]):
+                postings.setdefault(ngram, []).append(position)
+    return index
+
+
+def _shortest_posting(postings, ngrams):
+    """Nejkratší posting list stačí: plnou shodu stejně ověřujeme nad celým textem."""
+    return min((postings.get(ngram, ()) for ngram in ngrams), key=len)
+
+
+def _public_city(city):
+    return {
+        "place_id": city["place_id"],
+        "name": city["name"],
+        "display_name": city["display_name"],
+        "address": city["address"],
+        "psc": city["psc"] or None,
+        "region": city["region"] or None,
+    }
 
+
+def _in_regions(city, regions):
+    return regions is None or city["region"] in regions
+
+
+def _build_rank_tables(cities, ngram_index):
+    """Předpočítané tabulky pro řazené vyhledávání.
+
+    Prefixové tabulky jsou seřazené (text, pozice) pro binární vyhledání prefixu
+    názvu a prefixu slov. N-gram postingy jsou seřazené podle (délka názvu, pozice),
+    takže první ověřené shody jsou rovnou nejlepší v rámci své úrovně.
+    """
+    names = []
+    words = []
+    name_postings = {}
+    for position, city in enumerate(cities):
+        rank_name = city["_rank_name"]
+        names.append((rank_name, position))
+        for boundary in WORD_BOUNDARY_RE.finditer(rank_name):
+            words.append((rank_name[boundary.end():], position))
+        for ngram in _text_ngrams(rank_name):
+            name_postings.setdefault(ngram, []).append(position)
+    names.sort()
+    words.sort()
+
+    def order(position):
+        return len(cities[position]["_rank_name"]), position
+
+    postings = {
+        "name": {ngram: sorted(posting, key=order) for ngram, posting in name_postings.items()},
+        "address": {
+            ngram: sorted(posting, key=order)
+            for ngram, posting in ngram_index["address"].items()
+        },
+    }
+    return {"names": names, "words": words, "postings": postings}
+
+
+def _prefix_range(table, prefix):
+    for index in range(bisect_left(table, (prefix,)), len(table)):
+        text, position = table[index]
+        if not text.startswith(prefix):
+            break
+        yield position
+
+
+def _rank_key(cities, position, normalized_query, include_address):
+    """Pořadí výsledku: přesná shoda > prefix názvu > prefix slova > podřetězec > adresa."""
+    city = cities[position]
+    rank_name = city["_rank_name"]
+    if rank_name == normalized_query:
+        rank = RANK_EXACT
+    elif rank_name.startswith(normalized_query):
+        rank = RANK_NAME_PREFIX
+    elif any(
+        rank_name.startswith(normalized_query, boundary.end())
+        for boundary in WORD_BOUNDARY_RE.finditer(rank_name)
+    ):
+        rank = RANK_WORD_PREFIX
+    elif normalized_query in rank_name:
+        rank = RANK_NAME_SUBSTRING
+    elif include_address and normalized_query in city["_search_address"]:
+        rank = RANK_ADDRESS
+    else:
+        return None
+    # Při stejném druhu shody vyhrává kratší název, pak pořadí v souboru.
+    return rank, len(rank_name), position
+
+
+def _ranked_search(dataset, normalized_query, *, include_address, limit, regions=None):
+    cities = dataset.cities
+    tables = dataset.rank_tables
+
+    # Prefixové shody najdeme binárním vyhledáním, top-k z nich drží omezená halda.
+    seen = set(_prefix_range(tables["names"], normalized_query))
+    seen.update(_prefix_range(tables["words"], normalized_query))
+    top = heapq.nsmallest(
+        limit,
+        (
+            _rank_key(cities, position, normalized_query, include_address)
+            for position in seen
+            if _in_regions(cities[position], regions)
+        ),
+    )
+
+    # Podřetězce a adresy jdou z postingů už ve výsledném pořadí, stačí prvních pár shod.
+    ngrams = _query_ngrams(normalized_query)
+    levels = [(RANK_NAME_SUBSTRING, "name")]
+    if include_address:
+        levels.append((RANK_ADDRESS, "address"))
+    for rank, field in levels:
+        if len(top) >= limit:
+            break
+        for position in _shortest_posting(tables["postings"][field], ngrams):
+            if position in seen or not _in_regions(cities[position], regions):
+                continue
+            key = _rank_key(cities, position, normalized_query, include_address)
+            if key is None or key[0] != rank:
+                continue
+            seen.add(position)
+            top.append(key)
+            if len(top) >= limit:
+                break
+
+    return [_public_city(cities[position]) for _rank, _length, position in top]
+
+
+def _file_order_search(dataset, normalized_query, *, include_address, limit, regions=None):
+    cities = dataset.cities
+    index = dataset.ngram_index
+    ngrams = _query_ngrams(normalized_query)
+    candidates = _shortest_posting(index["name"], ngrams)
+    if include_address:
+        candidates = heapq.merge(candidates, _shortest_posting(index["address"], ngrams))
+
+    # N-gramy jen zužují kandidáty; shodu ověřujeme na celém textu v původním pořadí souboru.
     matches = []
-    for city in load_cities():
+    last_position = None
+    for position in candidates:
+        if position == last_position:
+            continue
+        last_position = position
+        city = cities[position]
+        if not _in_regions(city, regions):
+            continue
         in_name = normalized_query in city["_search_name"]
         in_address = include_address and normalized_query in city["_search_address"]
         if not in_name and not in_address:
             continue
 
-        matches.append({
-            "place_id": city["place_id"],
-            "name": city["name"],
-            "display_name": city["display_name"],
-            "address": city["address"],
-        })
+        matches.append(_public_city(city))
 
         if len(matches) >= limit:
             break
@@ -82,12 +339,295 @@ def search_cities(query, *, include_address=True, limit=RESULT_LIMIT):
     return matches
 
 
-@lru_cache(maxsize=1)
+def _deletes(text, max_distance):
+    """Všechny varianty textu vzniklé smazáním nejvýše max_distance znaků."""
+    variants = {text}
+    frontier = {text}
+    for _ in range(max_distance):
+        frontier = {
+            variant[:index] + variant[index + 1:]
+            for variant in frontier
+            for index in range(len(variant))
+        }
+        variants |= frontier
+    return variants
+
+
+def _edit_distance(left, right, max_distance):
+    """Damerau-Levenshtein (OSA) vzdálenost; nad max_distance vrací max_distance + 1."""
+    if abs(len(left) - len(right)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(right) + 1))
+    for i, left_char in enumerate(left, start=1):
+        current = [i] + [0] * len(right)
+        for j, right_char in enumerate(right, start=1):
+            cost = 0 if left_char == right_char else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and left_char == right[j - 2] and left[i - 2] == right_char:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def _build_fuzzy_index(cities):
+    """Symmetric-delete index: smazané varianty prefixu názvu -> názvy -> pozice měst."""
+    positions_by_name = {}
+    for position, city in enumerate(cities):
+        positions_by_name.setdefault(city["_rank_name"], []).append(position)
+
+    deletes = {}
+    for name in positions_by_name:
+        for variant in _deletes(name[:FUZZY_PREFIX_LENGTH], FUZZY_MAX_DISTANCE):
+            deletes.setdefault(variant, []).append(name)
+    return {"deletes": deletes, "positions": positions_by_name}
+
+
+def _fuzzy_search(dataset, normalized_query, *, limit, exclude_place_ids=(), regions=None):
+    """Najde názvy do editační vzdálenosti 2 (u krátkých dotazů 1) seřazené jako ranked výsledky."""
+    if len(normalized_query) < FUZZY_MIN_QUERY_LENGTH:
+        return []
+
+    max_distance = 1 if len(normalized_query) <= FUZZY_MIN_QUERY_LENGTH else FUZZY_MAX_DISTANCE
+    index = dataset.fuzzy_index
+    candidates = set()
+    for variant in _deletes(normalized_query[:FUZZY_PREFIX_LENGTH], max_distance):
+        candidates.update(index["deletes"].get(variant, ()))
+
+    cities = dataset.cities
+    keys = []
+    for name in candidates:
+        distance = _edit_distance(normalized_query, name, max_distance)
+        if distance > max_distance:
+            continue
+        for position in index["positions"][name]:
+            city = cities[position]
+            if city["place_id"] not in exclude_place_ids and _in_regions(city, regions):
+                keys.append((distance, len(name), position))
+
+    return [_public_city(cities[position]) for _distance, _length, position in heapq.nsmallest(limit, keys)]
+
+
+class CityDataset:
+    """Neměnný snapshot měst se všemi indexy a LRU výsledků nad ním.
+
+    Vyhledávání si vezme jednu referenci na dataset a celé proběhne nad ní,
+    takže výměna datasetu uprostřed requestu nemůže smíchat stará a nová data.
+    """
+
+    def __init__(self, cities, source_hash):
+        self.cities = cities
+        self.source_hash = source_hash
+        self.etag = f"cities-{source_hash.hex()[:32]}" if source_hash else "cities-empty"
+        # LRU patří datasetu, po výměně tak zmizí spolu se starými daty.
+        self.cached_search = lru_cache(maxsize=SEARCH_CACHE_SIZE)(self._search)
+
+    @cached_property
+    def by_place_id(self):
+        return {city["place_id"]: city for city in self.cities}
+
+    @cached_property
+    def region_by_place_id(self):
+        return {city["place_id"]: city["region"] for city in self.cities if city["region"]}
+
+    @cached_property
+    def ngram_index(self):
+        return _build_ngram_index(self.cities)
+
+    @cached_property
+    def rank_tables(self):
+        return _build_rank_tables(self.cities, self.ngram_index)
+
+    @cached_property
+    def fuzzy_index(self):
+        return _build_fuzzy_index(self.cities)
+
+    def warm(self):
+        """Postaví všechny indexy dopředu, aby je po výměně nestavěl první request."""
+        for attribute in ("by_place_id", "region_by_place_id", "ngram_index", "rank_tables", "fuzzy_index"):
+            getattr(self, attribute)
+        return self
+
+    def _search(self, normalized_query, include_address, limit, ranked, fuzzy, regions=None):
+        # Ranked i fuzzy porovnávají názvy bez prefixu, takže "mesto brno" hledají jako "brno".
+        rank_query = get_query_rank_name(normalized_query)
+        search = _ranked_search if ranked else _file_order_search
+        results = search(
+            self,
+            rank_query if ranked else normalized_query,
+            include_address=include_address,
+            limit=limit,
+            regions=regions,
+        )
+
+        # Fuzzy fallback se zapíná, jen když přesné a podřetězcové hledání nenaplní limit.
+        if fuzzy and len(results) < limit:
+            results.extend(_fuzzy_search(
+                self,
+                rank_query,
+                limit=limit - len(results),
+                exclude_place_ids={city["place_id"] for city in results},
+                regions=regions,
+            ))
+        return tuple(results)
+
+
+_dataset = None
+_dataset_lock = threading.Lock()
+_watch_state = {"checked_at": 0.0, "mtimes": None, "reloading": False}
+
+
+def _watched_mtimes():
+    return tuple(
+        path.stat().st_mtime_ns if path.exists() else None
+        for path in (CITIES_JSON_PATH, CITIES_INDEX_PATH)
+    )
+
+
+def _load_dataset():
+    _watch_state["mtimes"] = _watched_mtimes()
+    if not CITIES_JSON_PATH.exists():
+        return CityDataset([], None)
+
+    source_hash = cities_source_hash()
+    # Předpočítaný artefakt šetří parsování, normalizaci i SHA1 place_id při startu workeru.
+    cities = read_city_index(CITIES_INDEX_PATH, source_hash, CITY_FIELDS)
+    if cities is None:
+        cities = _parse_cities_json()
+    return CityDataset(cities, source_hash)
+
+
+def reload_cities(force=False):
+    """Načte dataset měst znovu a atomicky vymění referenci používanou vyhledáváním.
+
+    Nový dataset se celý postaví vedle běžícího, requesty mezitím obsluhuje ten
+    starý. Bez force se výměna provede jen při změně obsahu cities.json.
+    Vrací True, pokud k výměně došlo.
+    """
+    global _dataset
+    with _dataset_lock:
+        current = _dataset
+        if not force and current is not None:
+            _watch_state["mtimes"] = _watched_mtimes()
+            source_hash = cities_source_hash() if CITIES_JSON_PATH.exists() else None
+            if source_hash == current.source_hash:
+                return False
+
+        _dataset = _load_dataset().warm()
+        return True
+
+
+def _reload_in_background():
+    try:
+        reload_cities()
+    except Exception:
+        logging.getLogger(__name__).exception("Nepodarilo se znovu nacist dataset mest")
+    finally:
+        _watch_state["reloading"] = False
+
+
+def _watch_for_changes():
+    """Po CITIES_WATCH_INTERVAL zkontroluje mtime souborů a případný reload pustí na pozadí."""
+    now = time.monotonic()
+    if now - _watch_state["checked_at"] < CITIES_WATCH_INTERVAL:
+        return
+    _watch_state["checked_at"] = now
+
+    if _watch_state["reloading"] or _watched_mtimes() == _watch_state["mtimes"]:
+        return
+    _watch_state["reloading"] = True
+    threading.Thread(target=_reload_in_background, name="cities-reload", daemon=True).start()
+
+
+def get_city_dataset():
+    """Vrátí aktuální dataset měst, při prvním volání ho líně načte."""
+    global _dataset
+    dataset = _dataset
+    if dataset is None:
+        with _dataset_lock:
+            if _dataset is None:
+                _dataset = _load_dataset()
+            dataset = _dataset
+    else:
+        _watch_for_changes()
+    return dataset
+
+
+def init_city_dataset(app):
+    """Při startu workeru načte dataset měst včetně všech indexů.
+
+    Artefakt šetří jen parsování cities.json, n-gram, prefixové a fuzzy indexy
+    se staví z načtených měst. Bez zahřátí by je stavěl až první request
+    na /api/mesta. Testy a CITIES_WARM_ON_START=0 (např. pro CLI) ho přeskočí.
+    """
+    if app.config.get("TESTING") or not app.config.get("CITIES_WARM_ON_START"):
+        return None
+    try:
+        return get_city_dataset().warm()
+    except Exception:
+        app.logger.exception("Nepodarilo se nacist dataset mest")
+        return None
+
+
+def load_cities():
+    return get_city_dataset().cities
+
+
+def search_cities(
+    query,
+    *,
+    include_address=True,
+    limit=RESULT_LIMIT,
+    ranked=False,
+    fuzzy=False,
+    regions=None,
+):
+    """Vrátí města odpovídající dotazu; bez ranked=True v pořadí souboru.
+
+    S fuzzy=True doplní chybějící výsledky o názvy s překlepem (editační vzdálenost <= 2).
+    Parametr regions (výstup parse_region_filter) omezí výsledky na regiony podle PSČ.
+    Výsledky populárních prefixů drží LRU podle normalizovaného dotazu.
+    """
+    normalized_query = normalize_search_text(query)
+    if len(normalized_query) < MIN_QUERY_LENGTH:
+        return []
+
+    cached = get_city_dataset().cached_search(
+        normalized_query,
+        bool(include_address),
+        limit,
+        bool(ranked),
+        bool(fuzzy),
+        frozenset(regions) if regions is not None else None,
+    )
+    return [dict(city) for city in cached]
+
+
+def search_cache_info():
+    """Vrátí hits/misses/currsize LRU výsledků vyhledávání měst aktuálního datasetu."""
+    return get_city_dataset().cached_search.cache_info()
+
+
+def cities_dataset_etag():
+    """Silný ETag odvozený z obsahu cities.json; mění se jen se změnou datasetu."""
+    return get_city_dataset().etag
+
+
 def load_cities_by_place_id():
-    return {city["place_id"]: city for city in load_cities()}
+    return get_city_dataset().by_place_id
 
 
 def get_city_by_place_id(place_id):
     if not place_id:
         return None
     return load_cities_by_place_id().get(place_id)
+
+
+def get_city_region(place_id):
+    """Region (první dvě číslice PSČ) města podle place_id, nebo None."""
+    if not place_id:
+        return None
+    return get_city_dataset().region_by_place_id.get(place_id)
@@ -0,0 +1,102 @@
+"""Kompaktní binární artefakt s předpočítanými záznamy měst.
+
+Formát (little-endian):
+    hlavička   MAGIC, SHA-256 zdrojového cities.json, počet měst, počet řetězců, velikost poolu
+    offsety    uint32 × (počet řetězců + 1) do poolu řetězců
+    sloupce    uint32 × (počet polí × počet měst), po sloupcích, ID řetězce v poolu
+    pool       UTF-8 bajty všech unikátních řetězců za sebou
+
+Každý řetězec je v poolu jen jednou, takže se opakující adresy, prefixy a
+normalizované názvy po načtení sdílí jako jediný Python objekt.
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+
+MAGIC = b"SPJCIT01"
+HEADER = struct.Struct("<8s32sIII")
+
+
+def _uint32_array(values=()):
+    return array("I", values)
+
+
+def _to_little_endian(values):
+    if sys.byteorder != "little":
+        values = _uint32_array(values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def write_city_index(path, source_hash, cities, fields):
+    """Zapíše artefakt atomicky přes dočasný soubor, aby workery nikdy nečetly polovičatý zápis."""
+    string_ids = {}
+    pool = bytearray()
+    offsets = _uint32_array([0])
+    columns = _uint32_array()
+
+    for field in fields:
+        for city in cities:
+            value = city[field]
+            string_id = string_ids.get(value)
+            if string_id is None:
+                string_id = len(string_ids)
+                string_ids[value] = string_id
+                pool.extend(value.encode("utf-8"))
+                offsets.append(len(pool))
+            columns.append(string_id)
+
+    header = HEADER.pack(MAGIC, source_hash, len(cities), len(string_ids), len(pool))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as index_file:
+        index_file.write(header)
+        index_file.write(_to_little_endian(offsets))
+        index_file.write(_to_little_endian(columns))
+        index_file.write(pool)
+    os.replace(tmp_path, path)
+
+
+def _read_uint32(buffer, start, count):
+    values = _uint32_array()
+    values.frombytes(buffer[start:start + count * values.itemsize])
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def read_city_index(path, source_hash, fields):
+    """Načte artefakt jedním mmap čtením; při chybějícím nebo zastaralém souboru vrátí None."""
+    try:
+        with open(path, "rb") as index_file, mmap.mmap(
+            index_file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as buffer:
+            magic, stored_hash, city_count, string_count, pool_size = HEADER.unpack_from(buffer, 0)
+            if magic != MAGIC or stored_hash != source_hash:
+                return None
+
+            offsets_start = HEADER.size
+            columns_start = offsets_start + (string_count + 1) * 4
+            pool_start = columns_start + len(fields) * city_count * 4
+            if pool_start + pool_size != len(buffer):
+                return None
+
+            offsets = _read_uint32(buffer, offsets_start, string_count + 1)
+            columns = _read_uint32(buffer, columns_start, len(fields) * city_count)
+            pool = buffer[pool_start:pool_start + pool_size]
+    except (OSError, ValueError, struct.error):
+        return None
+
+    strings = [
+        pool[offsets[index]:offsets[index + 1]].decode("utf-8")
+        for index in range(string_count)
+    ]
+    return [
+        {
+            field: strings[columns[column * city_count + position]]
+            for column, field in enumerate(fields)
+        }
+        for position in range(city_count)
+    ]
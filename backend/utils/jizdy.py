@@ -1,3 +1,347 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import db
+from models.bod_trasy import BodTrasy
+from models.hodnoceni import Hodnoceni
+from models.jizda import Jizda
+from models.mezistanice import Mezistanice
+from models.profil import Profil
+from models.slovo_bodu_trasy import SlovoBoduTrasy
+from models.uzivatel import Uzivatel
+from utils.ride_search_engine import snapshot_ride, track_bulk_ride_changes
+from utils.route_points import route_point_values, route_point_word_values
+
+
+# Mezi dvěma jízdami stejného řidiče musí zůstat aspoň tahle rezerva.
+MIN_ROZESTUP_JIZD = timedelta(minutes=5)
+
+# Režimy serializace seznamů jízd přes query parametr `view`.
+VIEW_FULL = "full"
+VIEW_SUMMARY = "summary"
+RIDE_LIST_VIEWS = (VIEW_FULL, VIEW_SUMMARY)
+
+
 def zrusit_jizdu(jizda):
     jizda.status = "zrusena"
     return jizda
+
+
+def najit_kolizni_jizdu(ridic_id, cas_odjezdu, cas_prijezdu, *, ignorovat_jizda_id=None):
+    """Vrátí první aktivní jízdu řidiče, která se s daným časem kryje včetně rezervy, nebo None.
+
+    Podmínky drží indexované sloupce na jedné straně porovnání, takže dotaz
+    projde jen rozsah indexu ix_jizda_ridic_status_cas místo všech jízd řidiče.
+    """
+    query = Jizda.query.filter(
+        Jizda.ridic_id == ridic_id,
+        Jizda.status == "aktivni",
+        Jizda.cas_odjezdu < cas_prijezdu + MIN_ROZESTUP_JIZD,
+        Jizda.cas_prijezdu > cas_odjezdu - MIN_ROZESTUP_JIZD,
+    )
+    if ignorovat_jizda_id is not None:
+        query = query.filter(Jizda.id != ignorovat_jizda_id)
+    return query.order_by(Jizda.cas_odjezdu, Jizda.id).first()
+
+
+def najit_kolize_terminu(ridic_id, terminy, *, ignorovat_jizda_ids=()):
+    """Ověří celou sadu termínů (cas_odjezdu, cas_prijezdu) jediným dotazem.
+
+    Načte aktivní jízdy řidiče v rozsahu od prvního do posledního termínu
+    a průniky dopočítá v paměti. Kontroluje i termíny mezi sebou. Vrací
+    první kolizi jako (index termínu, kolizní Jizda nebo index jiného termínu),
+    jinak None.
+    """
+    if not terminy:
+        return None
+
+    od = min(cas_odjezdu for cas_odjezdu, _ in terminy) - MIN_ROZESTUP_JIZD
+    do = max(cas_prijezdu for _, cas_prijezdu in terminy) + MIN_ROZESTUP_JIZD
+    query = Jizda.query.filter(
+        Jizda.ridic_id == ridic_id,
+        Jizda.status == "aktivni",
+        Jizda.cas_odjezdu < do,
+        Jizda.cas_prijezdu > od,
+    )
+    if ignorovat_jizda_ids:
+        query = query.filter(Jizda.id.not_in(list(ignorovat_jizda_ids)))
+    existujici = query.order_by(Jizda.cas_odjezdu, Jizda.id).all()
+
+    # Termíny i existující jízdy projdeme jednou podle času odjezdu jako sweep line.
+    udalosti = sorted(
+        [(cas_odjezdu, cas_prijezdu, index) for index, (cas_odjezdu, cas_prijezdu) in enumerate(terminy)]
+        + [(jizda.cas_odjezdu, jizda.cas_prijezdu, jizda) for jizda in existujici],
+        key=lambda udalost: udalost[0],
+    )
+    otevrene = []
+    for cas_odjezdu, cas_prijezdu, zdroj in udalosti:
+        otevrene = [udalost for udalost in otevrene if udalost[1] + MIN_ROZESTUP_JIZD > cas_odjezdu]
+        for _, _, jiny_zdroj in otevrene:
+            if isinstance(zdroj, int):
+                return zdroj, jiny_zdroj
+            if isinstance(jiny_zdroj, int):
+                return jiny_zdroj, zdroj
+        otevrene.append((cas_odjezdu, cas_prijezdu, zdroj))
+    return None
+
+
+def vygenerovat_jizdy_sablony(sablona, terminy):
+    """Založí termíny šablony třemi dávkovými INSERTy (jízdy, mezistanice, body trasy).
+
+    ORM by na SQLite vkládal jízdy po jedné kvůli INSERT ... RETURNING, proto
+    jdou řádky přes executemany a ID se dohledají jedním dotazem podle termínů.
+    Vrací ID nových jízd seřazená podle odjezdu.
+    """
+    if not terminy:
+        return []
+
+    db.session.flush()
+    hodnoty = sablona.hodnoty_jizdy()
+    db.session.execute(
+        insert(Jizda),
+        [
+            {**hodnoty, "cas_odjezdu": cas_odjezdu, "cas_prijezdu": cas_prijezdu}
+            for cas_odjezdu, cas_prijezdu in terminy
+        ],
+    )
+    jizda_ids = db.session.scalars(
+        select(Jizda.id)
+        .where(
+            Jizda.sablona_id == sablona.id,
+            Jizda.status == "aktivni",
+            Jizda.cas_odjezdu.in_([cas_odjezdu for cas_odjezdu, _ in terminy]),
+        )
+        .order_by(Jizda.cas_odjezdu)
+    ).all()
+
+    vzor = sablona.vzorova_jizda()
+    mezistanice = [
+        {
+            "misto": misto.misto,
+            "misto_place_id": misto.misto_place_id,
+            "misto_address": misto.misto_address,
+            "poradi": misto.poradi,
+        }
+        for misto in vzor.mezistanice
+    ]
+    if mezistanice:
+        db.session.execute(
+            insert(Mezistanice),
+            [{**values, "jizda_id": jizda_id} for jizda_id in jizda_ids for values in mezistanice],
+        )
+    body_trasy = route_point_values(vzor)
+    db.session.execute(
+        insert(BodTrasy),
+        [{**values, "jizda_id": jizda_id} for jizda_id in jizda_ids for values in body_trasy],
+    )
+    slova_bodu = route_point_word_values(body_trasy)
+    db.session.execute(
+        insert(SlovoBoduTrasy),
+        [{**values, "jizda_id": jizda_id} for jizda_id in jizda_ids for values in slova_bodu],
+    )
+
+    snapshot = snapshot_ride(vzor)
+    track_bulk_ride_changes([{**snapshot, "id": jizda_id, "status": "aktivni"} for jizda_id in jizda_ids])
+    return jizda_ids
+
+
+def _klic_mezistanice(misto, place_id, address):
+    return misto, place_id or None, address or None
+
+
+def rozdil_mezistanic(existujici, mezistanice):
+    """Spočítá minimální změnu mezistanic mezi uloženými řádky a novým pořadím.
+
+    Zastávka se stejným místem na stejné pozici zůstává beze změny, na jiné
+    pozici se jen přečísluje. Ostatní se vloží, nepoužité řádky se smažou.
+    Vrací (preradit, vlozit, smazat) jako podklady pro hromadné příkazy.
+    """
+    pozadovane = [
+        {
+            "misto": misto["text"],
+            "misto_place_id": misto.get("place_id"),
+            "misto_address": misto.get("address"),
+            "poradi": poradi,
+        }
+        for poradi, misto in enumerate(mezistanice, start=1)
+    ]
+    podle_poradi = {stanice.poradi: stanice for stanice in existujici}
+    pouzite = set()
+    zbyvajici = []
+    for values in pozadovane:
+        stanice = podle_poradi.get(values["poradi"])
+        klic = _klic_mezistanice(values["misto"], values["misto_place_id"], values["misto_address"])
+        if (
+            stanice is not None
+            and stanice.id not in pouzite
+            and _klic_mezistanice(stanice.misto, stanice.misto_place_id, stanice.misto_address) == klic
+        ):
+            pouzite.add(stanice.id)
+        else:
+            zbyvajici.append((klic, values))
+
+    volne = defaultdict(list)
+    for stanice in existujici:
+        if stanice.id not in pouzite:
+            volne[_klic_mezistanice(stanice.misto, stanice.misto_place_id, stanice.misto_address)].append(stanice)
+
+    preradit = []
+    vlozit = []
+    for klic, values in zbyvajici:
+        if volne[klic]:
+            stanice = volne[klic].pop(0)
+            pouzite.add(stanice.id)
+            preradit.append({"id": stanice.id, "poradi": values["poradi"]})
+        else:
+            vlozit.append(values)
+
+    smazat = [stanice.id for stanice in existujici if stanice.id not in pouzite]
+    return preradit, vlozit, smazat
+
+
+def _aktualizovat_mezistanice(jizda, mezistanice):
+    existujici = list(jizda.mezistanice)
+    preradit, vlozit, smazat = rozdil_mezistanic(existujici, mezistanice)
+    if not (preradit or vlozit or smazat):
+        return False
+
+    if smazat:
+        db.session.execute(delete(Mezistanice).where(Mezistanice.id.in_(smazat)))
+    if preradit:
+        db.session.execute(update(Mezistanice), preradit)
+    if vlozit:
+        db.session.execute(insert(Mezistanice), [{**values, "jizda_id": jizda.id} for values in vlozit])
+
+    preradit_ids = {values["id"] for values in preradit}
+    for stanice in existujici:
+        if stanice.id in preradit_ids:
+            db.session.expire(stanice, ["poradi"])
+    db.session.expire(jizda, ["mezistanice"])
+    return True
+
+
+def _aktualizovat_body_trasy(jizda):
+    existujici = {}
+    smazat = []
+    for bod in jizda.body_trasy:
+        if bod.poradi in existujici:
+            smazat.append(bod.id)
+        else:
+            existujici[bod.poradi] = bod
+
+    zmenit = []
+    vlozit = []
+    # Slova se přepisují jen u bodů s jiným textem, nových a odebraných.
+    nove_texty = []
+    for values in route_point_values(jizda):
+        bod = existujici.pop(values["poradi"], None)
+        if bod is None:
+            vlozit.append({**values, "jizda_id": jizda.id})
+            nove_texty.append(values)
+        elif any(getattr(bod, column) != value for column, value in values.items()):
+            if bod.normalizovany_text != values["normalizovany_text"]:
+                nove_texty.append(values)
+            zmenit.append({"id": bod.id, **values})
+            db.session.expire(bod)
+    odebrane_poradi = set(existujici)
+    smazat.extend(bod.id for bod in existujici.values())
+    if not (zmenit or vlozit or smazat):
+        return False
+
+    if smazat:
+        db.session.execute(delete(BodTrasy).where(BodTrasy.id.in_(smazat)))
+    if zmenit:
+        db.session.execute(update(BodTrasy), zmenit)
+    if vlozit:
+        db.session.execute(insert(BodTrasy), vlozit)
+    _aktualizovat_slova_bodu(jizda, odebrane_poradi | {values["poradi"] for values in nove_texty}, nove_texty)
+    db.session.expire(jizda, ["body_trasy"])
+    return True
+
+
+def _aktualizovat_slova_bodu(jizda, poradi, body):
+    if not poradi:
+        return
+    db.session.execute(
+        delete(SlovoBoduTrasy).where(
+            SlovoBoduTrasy.jizda_id == jizda.id,
+            SlovoBoduTrasy.poradi.in_(sorted(poradi)),
+        )
+    )
+    slova = route_point_word_values(body)
+    if slova:
+        db.session.execute(insert(SlovoBoduTrasy), [{**values, "jizda_id": jizda.id} for values in slova])
+    db.session.expire(jizda, ["slova_bodu_trasy"])
+
+
+def aktualizovat_trasu(jizda, mezistanice=None):
+    """Dorovná mezistanice (pokud jsou zadané) a body trasy uložené jízdy podle rozdílu.
+
+    Místo smazání a nového vložení celé trasy se hromadnými UPDATE/INSERT/DELETE
+    mění jen pozice, které se opravdu liší, takže se nemění ID zastávek ani
+    nepřepisují nedotčené řádky vyhledávacího indexu. Vrací True při změně.
+    """
+    zmeneno = False
+    if mezistanice is not None:
+        zmeneno = _aktualizovat_mezistanice(jizda, mezistanice)
+    if _aktualizovat_body_trasy(jizda):
+        zmeneno = True
+        track_bulk_ride_changes([snapshot_ride(jizda)])
+    return zmeneno
+
+
+def ride_list_load_options():
+    """Vrátí loader options přesně pro vazby, které čte `Jizda.to_dict`."""
+    # Profil.to_dict počítá hodnocení a počet aut, proto je načítáme spolu s profilem.
+    return (
+        joinedload(Jizda.ridic).joinedload(Uzivatel.profil).selectinload(Profil.auta),
+        joinedload(Jizda.ridic).selectinload(Uzivatel.hodnoceni_cilovy),
+        joinedload(Jizda.auto),
+        selectinload(Jizda.pasazeri).joinedload(Uzivatel.profil).selectinload(Profil.auta),
+        selectinload(Jizda.pasazeri).selectinload(Uzivatel.hodnoceni_cilovy),
+        selectinload(Jizda.mezistanice),
+    )
+
+
+def with_ride_list_loading(query):
+    """Přidá k dotazu na jízdy eager loading, aby serializace seznamu nedělala N+1 dotazy."""
+    return query.options(*ride_list_load_options())
+
+
+def ride_summary_load_options():
+    """Loader options pro `Jizda.to_summary_dict`: jen řidič a jméno z jeho profilu."""
+    return (
+        joinedload(Jizda.ridic).load_only(Uzivatel.id).joinedload(Uzivatel.profil).load_only(Profil.jmeno),
+    )
+
+
+def with_ride_list_view_loading(query, view):
+    """Přidá eager loading podle zvoleného režimu výpisu."""
+    if view == VIEW_SUMMARY:
+        return query.options(*ride_summary_load_options())
+    return with_ride_list_loading(query)
+
+
+def prumerna_hodnoceni_ridicu(ridic_ids):
+    """Průměrné hodnocení řidičů jedním agregačním dotazem místo načítání všech hodnocení."""
+    ridic_ids = set(ridic_ids)
+    if not ridic_ids:
+        return {}
+    rows = db.session.execute(
+        select(Hodnoceni.cilovy_uzivatel_id, func.avg(Hodnoceni.znamka))
+        .where(Hodnoceni.cilovy_uzivatel_id.in_(ridic_ids), Hodnoceni.role == "ridic")
+        .group_by(Hodnoceni.cilovy_uzivatel_id)
+    )
+    return {ridic_id: float(prumer) for ridic_id, prumer in rows}
+
+
+def serializovat_jizdy(jizdy, view=VIEW_FULL):
+    """Serializuje seznam jízd v daném režimu; souhrn dotáhne hodnocení řidičů najednou."""
+    if view != VIEW_SUMMARY:
+        return [jizda.to_dict() for jizda in jizdy]
+
+    hodnoceni = prumerna_hodnoceni_ridicu(jizda.ridic_id for jizda in jizdy)
+    return [jizda.to_summary_dict(hodnoceni.get(jizda.ridic_id, 0)) for jizda in jizdy]
@@ -11,10 +11,12 @@ DEFAULT_CATEGORY_BY_TYPE = {
     "chat": "zpravy",
     "rezervace_nova": "rezervace",
     "rezervace_prijata": "rezervace",
+    "rezervace_okamzita": "rezervace",
     "rezervace_odmitnuta": "rezervace",
     "jizda_zmena": "jizdy",
     "jizda_zrusena": "jizdy",
     "hodnoceni_ceka": "hodnoceni",
+    "ulozene_hledani": "jizdy",
 }
 
 logger = logging.getLogger(__name__)
@@ -109,3 +111,45 @@ def vytvorit_oznameni(
         db.session.rollback()
         logger.exception("Chyba pri vytvareni oznameni")
         return None
+
+
+def vytvorit_oznameni_hromadne(zaznamy):
+    """Přidá do session více oznámení najednou bez commitu.
+
+    Existující unikátní klíče ověří jedním dotazem místo dotazu na každé oznámení.
+    Vrací seznam nově přidaných oznámení.
+    """
+    klice = [zaznam["unikatni_klic"] for zaznam in zaznamy if zaznam.get("unikatni_klic")]
+    existujici = set()
+    if klice:
+        existujici = set(
+            db.session.scalars(
+                db.select(Oznameni.unikatni_klic).where(Oznameni.unikatni_klic.in_(klice))
+            )
+        )
+
+    nova = []
+    for zaznam in zaznamy:
+        klic = zaznam.get("unikatni_klic")
+        if klic:
+            if klic in existujici:
+                continue
+            existujici.add(klic)
+
+        nova.append(Oznameni(
+            prijemce_id=zaznam["prijemce_id"],
+            odesilatel_id=zaznam.get("odesilatel_id"),
+            zprava=zaznam["zprava"],
+            typ=zaznam.get("typ"),
+            kategorie=get_notification_category(zaznam.get("typ"), zaznam.get("kategorie")),
+            target_path=zaznam.get("target_path"),
+            jizda_id=zaznam.get("jizda_id"),
+            rezervace_id=zaznam.get("rezervace_id"),
+            cilovy_uzivatel_id=zaznam.get("cilovy_uzivatel_id"),
+            unikatni_klic=klic,
+            datum=utc_now(),
+            precteno=False,
+        ))
+
+    db.session.add_all(nova)
+    return nova
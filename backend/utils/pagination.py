@@ -0,0 +1,107 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+DEFAULT_PAGE_LIMIT = 20
+MAX_PAGE_LIMIT = 100
+
+
+def parse_page_limit(value, *, default=DEFAULT_PAGE_LIMIT, maximum=MAX_PAGE_LIMIT):
+    """Načte limit stránky z query parametru a drží ho v rozumných mezích."""
+    if value is None or value == "":
+        return default, None
+
+    try:
+        parsed = int(value)
+    except (TypeError, ValueError):
+        return None, "Pole limit musí být celé číslo"
+
+    if parsed <= 0:
+        return None, "Pole limit musí být větší než 0"
+
+    return min(parsed, maximum), None
+
+
+def _pack_cursor(payload):
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _unpack_cursor(value):
+    padded = value + "=" * (-len(value) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+
+
+def encode_cursor(*, cas_odjezdu, jizda_id, rank=None):
+    """Zabalí pozici poslední vrácené jízdy do neprůhledného kurzoru pro další stránku."""
+    payload = {"t": cas_odjezdu.isoformat(), "id": jizda_id}
+    if rank is not None:
+        payload["r"] = rank
+    return _pack_cursor(payload)
+
+
+def decode_cursor(value):
+    """Rozbalí kurzor z `encode_cursor`; poškozený vstup vrací chybu místo výjimky."""
+    if not value:
+        return None, None
+
+    try:
+        payload = _unpack_cursor(value)
+        cursor = {
+            "cas_odjezdu": datetime.fromisoformat(payload["t"]),
+            "jizda_id": int(payload["id"]),
+            "rank": int(payload["r"]) if "r" in payload else None,
+        }
+    except (binascii.Error, ValueError, TypeError, KeyError, UnicodeError):
+        return None, "Neplatný kurzor stránkování"
+
+    return cursor, None
+
+
+def keyset_after(cursor, cas_column, id_column, rank_expression=None):
+    """Sestaví podmínku "za kurzorem" pro řazení (rank, cas_odjezdu, id)."""
+    after_time = or_(
+        cas_column > cursor["cas_odjezdu"],
+        and_(cas_column == cursor["cas_odjezdu"], id_column > cursor["jizda_id"]),
+    )
+    if rank_expression is None or cursor["rank"] is None:
+        return after_time
+
+    return or_(
+        rank_expression > cursor["rank"],
+        and_(rank_expression == cursor["rank"], after_time),
+    )
+
+
+def encode_created_cursor(*, vytvoreno, item_id):
+    """Kurzor pro výpisy řazené od nejnovějšího záznamu podle (vytvoreno, id)."""
+    return _pack_cursor({"c": vytvoreno.isoformat(), "id": item_id})
+
+
+def decode_created_cursor(value):
+    """Rozbalí kurzor z `encode_created_cursor` stejně tolerantně jako `decode_cursor`."""
+    if not value:
+        return None, None
+
+    try:
+        payload = _unpack_cursor(value)
+        cursor = {
+            "vytvoreno": datetime.fromisoformat(payload["c"]),
+            "id": int(payload["id"]),
+        }
+    except (binascii.Error, ValueError, TypeError, KeyError, UnicodeError):
+        return None, "Neplatný kurzor stránkování"
+
+    return cursor, None
+
+
+def keyset_before_created(cursor, created_column, id_column):
+    """Podmínka "za kurzorem" pro sestupné řazení (vytvoreno, id)."""
+    return or_(
+        created_column < cursor["vytvoreno"],
+        and_(created_column == cursor["vytvoreno"], id_column < cursor["id"]),
+    )
@@ -1,68 +1,32 @@
-from datetime import datetime
-
-from models import db
-from models.hodnoceni import Hodnoceni
 from models.jizda import Jizda
 from models.uzivatel import Uzivatel
-from utils.notifications import vytvorit_oznameni
+from utils.jizdy import with_ride_list_loading
+from utils.ride_lifecycle import dokoncene_jizdy_podminka, nehodnoceny_ridic_podminka
+
 
+def get_pending_ratings_for_user(uzivatel_id):
+    """Vrátí dokončené jízdy, kde pasažér ještě neohodnotil řidiče.
 
-def sync_pending_ratings_for_user(uzivatel_id, *, create_notifications=False):
-    now = datetime.now()
+    Čistě čtecí dotaz: jízdy po příjezdu bere jako dokončené i před během
+    sweeperu, status i oznámení zakládá až `dokoncit_probehle_jizdy`.
+    """
     jizdy = (
-        Jizda.query.join(Jizda.pasazeri)
-        .filter(Uzivatel.id == uzivatel_id)
+        with_ride_list_loading(
+            Jizda.query.filter(
+                Jizda.pasazeri.any(Uzivatel.id == uzivatel_id),
+                dokoncene_jizdy_podminka(),
+                nehodnoceny_ridic_podminka(uzivatel_id),
+            )
+        )
+        .order_by(Jizda.cas_prijezdu, Jizda.id)
         .all()
     )
-
-    pending = []
-    changed = False
-
-    for jizda in jizdy:
-        if jizda.status == "aktivni" and jizda.cas_prijezdu and jizda.cas_prijezdu <= now:
-            jizda.status = "dokoncena"
-            changed = True
-
-        if jizda.status != "dokoncena":
-            continue
-
-        existujici_hodnoceni = Hodnoceni.query.filter_by(
-            autor_id=uzivatel_id,
-            cilovy_uzivatel_id=jizda.ridic_id,
-            jizda_id=jizda.id,
-            role="ridic",
-        ).first()
-
-        if existujici_hodnoceni:
-            continue
-
-        pending.append(
-            {
-                "jizda_id": jizda.id,
-                "jizda": jizda.to_dict(),
-                "cilovy_uzivatel_id": jizda.ridic_id,
-                "role": "ridic",
-            }
-        )
-
-        if create_notifications:
-            vytvorit_oznameni(
-                uzivatel_id,
-                f"Máš nevyřešené hodnocení řidiče pro jízdu {jizda.odkud} -> {jizda.kam}.",
-                "hodnoceni_ceka",
-                kategorie="hodnoceni",
-                target_path=f"/ohodnotit/{jizda.id}/{jizda.ridic_id}",
-                jizda_id=jizda.id,
-                cilovy_uzivatel_id=jizda.ridic_id,
-                unikatni_klic=f"hodnoceni:{uzivatel_id}:{jizda.id}",
-                commit=False,
-            )
-            changed = True
-
-    if changed:
-        try:
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
-
-    return pending
\ No newline at end of file
+    return [
+        {
+            "jizda_id": jizda.id,
+            "jizda": jizda.to_dict(),
+            "cilovy_uzivatel_id": jizda.ridic_id,
+            "role": "ridic",
+        }
+        for jizda in jizdy
+    ]
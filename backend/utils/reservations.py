@@ -1,33 +1,90 @@
+from sqlalchemy import func, or_, select, update
+
+from models import db
 from models.rezervace import Rezervace
 
 
 def annotate_waiting_queue_positions(rezervace_list):
-    if not rezervace_list:
-        return {}
+    """Doplní čekajícím rezervacím `poradi_cekajici` podle pořadí podání na jejich jízdě.
 
-    ride_ids = sorted({rezervace.jizda_id for rezervace in rezervace_list if rezervace.jizda_id})
-    if not ride_ids:
+    Pořadí počítá ROW_NUMBER() přímo v SQL nad indexem ix_rezervace_jizda_status_vytvoreno
+    a vrací se jen pro požadované rezervace, takže se do Pythonu nenačítá celá fronta.
+    Vrací mapu {id rezervace: pořadí}.
+    """
+    for rezervace in rezervace_list:
+        rezervace.poradi_cekajici = None
+
+    cekajici = [rezervace for rezervace in rezervace_list if rezervace.status == "cekajici" and rezervace.jizda_id]
+    if not cekajici:
         return {}
 
-    cekajici_rezervace = (
-        Rezervace.query.filter(
-            Rezervace.jizda_id.in_(ride_ids),
+    poradi = (
+        func.row_number()
+        .over(partition_by=Rezervace.jizda_id, order_by=(Rezervace.vytvoreno, Rezervace.id))
+        .label("poradi")
+    )
+    fronta = (
+        select(Rezervace.id, poradi)
+        .where(
+            Rezervace.jizda_id.in_({rezervace.jizda_id for rezervace in cekajici}),
             Rezervace.status == "cekajici",
         )
-        .order_by(Rezervace.jizda_id.asc(), Rezervace.vytvoreno.asc(), Rezervace.id.asc())
-        .all()
+        .subquery()
+    )
+    positions = dict(
+        db.session.execute(
+            select(fronta.c.id, fronta.c.poradi).where(fronta.c.id.in_({rezervace.id for rezervace in cekajici}))
+        ).all()
     )
 
-    positions = {}
-    counters = {}
+    for rezervace in cekajici:
+        rezervace.poradi_cekajici = positions.get(rezervace.id)
 
-    for rezervace in cekajici_rezervace:
-        counters[rezervace.jizda_id] = counters.get(rezervace.jizda_id, 0) + 1
-        positions[rezervace.id] = counters[rezervace.jizda_id]
+    return positions
 
-    for rezervace in rezervace_list:
-        rezervace.poradi_cekajici = (
-            positions.get(rezervace.id) if rezervace.status == "cekajici" else None
+
+def accepted_seats_subquery(jizda_id_column):
+    """Vrátí korelovaný součet přijatých míst, použitelný přímo v SQL nad jízdami."""
+    return (
+        select(func.coalesce(func.sum(Rezervace.pocet_mist), 0))
+        .where(Rezervace.jizda_id == jizda_id_column)
+        .where(Rezervace.status == "prijata")
+        .scalar_subquery()
+    )
+
+
+def waiting_reservations_subquery(jizda_id_column):
+    """Vrátí korelovaný počet čekajících rezervací dané jízdy."""
+    return (
+        select(func.count(Rezervace.id))
+        .where(Rezervace.jizda_id == jizda_id_column)
+        .where(Rezervace.status == "cekajici")
+        .scalar_subquery()
+    )
+
+
+def prepocitat_obsazenost_jizd(jizda_ids=None):
+    """Hromadně přepočítá citace obsazenosti z rezervací a vrátí počet opravených jízd."""
+    from models.jizda import Jizda
+
+    obsazena_mista = accepted_seats_subquery(Jizda.id)
+    pocet_cekajicich = waiting_reservations_subquery(Jizda.id)
+
+    # Přepisujeme jen jízdy, kde se citace rozešly, takže rowcount rovnou říká rozsah driftu.
+    statement = (
+        update(Jizda)
+        .where(
+            or_(
+                Jizda.obsazena_mista != obsazena_mista,
+                Jizda.pocet_cekajicich != pocet_cekajicich,
+            )
         )
+        .values(obsazena_mista=obsazena_mista, pocet_cekajicich=pocet_cekajicich)
+        .execution_options(synchronize_session=False)
+    )
+    if jizda_ids is not None:
+        statement = statement.where(Jizda.id.in_(list(jizda_ids)))
 
-    return positions
+    result = db.session.execute(statement)
+    db.session.expire_all()
+    return result.rowcount
@@ -0,0 +1,130 @@
+import threading
+
+from sqlalchemy import and_, exists, or_, select, update
+
+from models import db
+from models.hodnoceni import Hodnoceni
+from models.jizda import Jizda
+from models.pasazeri import pasazeri
+from utils.datetime_utils import utc_now
+from utils.notifications import vytvorit_oznameni_hromadne
+from utils.ride_search_engine import get_ride_search_engine, zaznamenat_zmeny_jizd
+
+
+DEFAULT_SWEEP_BATCH_SIZE = 500
+SWEEPER_EXTENSION_KEY = "ride_lifecycle_sweeper"
+
+
+def jizda_je_dokoncena(jizda, now=None):
+    """Jízda je dokončená i tehdy, když po příjezdu ještě neproběhl sweeper."""
+    return jizda.get_efektivni_status(now) == "dokoncena"
+
+
+def dokoncene_jizdy_podminka(now=None):
+    """SQL obdoba `jizda_je_dokoncena`, aby čtecí dotazy nemusely nic zapisovat."""
+    now = now or utc_now()
+    return or_(
+        Jizda.status == "dokoncena",
+        and_(Jizda.status == "aktivni", Jizda.cas_prijezdu <= now),
+    )
+
+
+def nehodnoceny_ridic_podminka(pasazer_id_column):
+    """Pasažér ještě neohodnotil řidiče dané jízdy."""
+    return ~exists().where(
+        Hodnoceni.autor_id == pasazer_id_column,
+        Hodnoceni.cilovy_uzivatel_id == Jizda.ridic_id,
+        Hodnoceni.jizda_id == Jizda.id,
+        Hodnoceni.role == "ridic",
+    )
+
+
+def _zalozit_povinna_hodnoceni(jizda_ids):
+    """Jedním dotazem najde pasažéry bez hodnocení řidiče a založí jim oznámení."""
+    rows = db.session.execute(
+        select(pasazeri.c.pasazer_id, Jizda.id, Jizda.ridic_id, Jizda.odkud, Jizda.kam)
+        .join(Jizda, Jizda.id == pasazeri.c.jizda_id)
+        .where(Jizda.id.in_(jizda_ids))
+        .where(nehodnoceny_ridic_podminka(pasazeri.c.pasazer_id))
+    )
+    return vytvorit_oznameni_hromadne([
+        {
+            "prijemce_id": pasazer_id,
+            "zprava": f"Máš nevyřešené hodnocení řidiče pro jízdu {odkud} -> {kam}.",
+            "typ": "hodnoceni_ceka",
+            "kategorie": "hodnoceni",
+            "target_path": f"/ohodnotit/{jizda_id}/{ridic_id}",
+            "jizda_id": jizda_id,
+            "cilovy_uzivatel_id": ridic_id,
+            "unikatni_klic": f"hodnoceni:{pasazer_id}:{jizda_id}",
+        }
+        for pasazer_id, jizda_id, ridic_id, odkud, kam in rows
+    ])
+
+
+def dokoncit_probehle_jizdy(*, now=None, batch_size=DEFAULT_SWEEP_BATCH_SIZE):
+    """Přepne aktivní jízdy po příjezdu na dokoncena a založí povinná hodnocení.
+
+    Každá dávka je jeden UPDATE a jeden commit, takže zámky drží sweeper
+    krátce a čtecí endpointy už nemusí nic zapisovat. Vrací počty změn.
+    """
+    now = now or utc_now()
+    dokonceno = 0
+    oznameni = 0
+    while True:
+        jizda_ids = db.session.scalars(
+            select(Jizda.id)
+            .where(Jizda.status == "aktivni", Jizda.cas_prijezdu <= now)
+            .order_by(Jizda.cas_prijezdu, Jizda.id)
+            .limit(batch_size)
+        ).all()
+        if not jizda_ids:
+            break
+
+        db.session.execute(
+            update(Jizda)
+            .where(Jizda.id.in_(jizda_ids), Jizda.status == "aktivni")
+            .values(status="dokoncena")
+            .execution_options(synchronize_session=False)
+        )
+        oznameni += len(_zalozit_povinna_hodnoceni(jizda_ids))
+        zaznamenat_zmeny_jizd(jizda_ids)
+        db.session.commit()
+
+        # Hromadný UPDATE obchází session eventy, in-memory vyhledávání proto čistíme ručně.
+        engine = get_ride_search_engine()
+        if engine is not None:
+            for jizda_id in jizda_ids:
+                engine.remove(jizda_id)
+        dokonceno += len(jizda_ids)
+
+    return {"dokonceno": dokonceno, "oznameni": oznameni}
+
+
+def init_ride_lifecycle_sweeper(app):
+    """Při RIDE_SWEEPER_INTERVAL > 0 a RUN_BACKGROUND_WORKERS spustí sweeper ve vlákně aplikace.
+
+    Sweeper je idempotentní, ale při více workerech je lepší ho pouštět jen
+    jednou, třeba cronem přes `flask dokoncit-jizdy`; interval proto zapínejte
+    jen v jednom obsluhujícím procesu.
+    """
+    interval = app.config.get("RIDE_SWEEPER_INTERVAL") or 0
+    if interval <= 0 or app.config.get("TESTING") or not app.config.get("RUN_BACKGROUND_WORKERS"):
+        return None
+
+    stop_event = threading.Event()
+
+    def run():
+        while not stop_event.wait(interval):
+            with app.app_context():
+                try:
+                    dokoncit_probehle_jizdy()
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception("Sweeper dokonceni jizd selhal")
+                finally:
+                    db.session.remove()
+
+    threading.Thread(target=run, name="ride-lifecycle-sweeper", daemon=True).start()
+    app.extensions[SWEEPER_EXTENSION_KEY] = stop_event
+    return stop_event
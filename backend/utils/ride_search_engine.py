@@ -0,0 +1,413 @@
+import threading
+import time
+from datetime import timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, func, or_, select
+from sqlalchemy.orm import Session, selectinload
+
+from models import db
+from models.bod_trasy import BodTrasy
+from models.jizda import Jizda
+from models.mezistanice import Mezistanice
+from models.zmena_jizdy import ZmenaJizdy
+from utils.datetime_utils import utc_now
+from utils.route_points import route_points_for_ride
+from utils.text_normalization import matches_word_start, normalize_search_text
+
+
+NGRAM_SIZE = 3
+EXTENSION_KEY = "ride_search_engine"
+_PENDING_KEY = "ride_search_pending"
+_listeners_registered = False
+
+# Jak dlouho se drží log změn jízd; proces, který ho déle nečetl, index postaví znovu.
+ZMENY_RETENCE = timedelta(hours=1)
+# Transakce s nižším ID změny se může commitnout až po vyšším, proto se čte i s překryvem.
+ZMENY_PREKRYV = timedelta(minutes=1)
+# Jízdy ze změn se načítají po dávkách, aby IN (...) nenarazil na limit parametrů.
+SYNC_BATCH_SIZE = 500
+
+
+def _ngrams(text):
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+def snapshot_ride(jizda):
+    """Převede jízdu na neměnný záznam, který engine drží v paměti."""
+    return {
+        "id": jizda.id,
+        "status": jizda.status,
+        "points": tuple(
+            (
+                point["position"],
+                point["role"],
+                point["place_id"],
+                normalize_search_text(point["text"]),
+                point["region"],
+            )
+            for point in route_points_for_ride(jizda)
+        ),
+    }
+
+
+class RideSearchEngine:
+    """In-memory index aktivních jízd: place_id a n-gramy textu -> body tras.
+
+    Engine vrací jen kandidátní ID jízd; kapacitu, časové okno i stránkování
+    dál řeší SQL nad těmito ID, takže se hydratuje jen vracená stránka.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rides = {}
+        self._place_postings = {}
+        self._region_postings = {}
+        self._ngram_postings = {}
+        self._posledni_zmena_id = 0
+        self._synchronizovano = None
+        self.stop_event = threading.Event()
+
+    def __len__(self):
+        return len(self._rides)
+
+    def _add_points(self, ride_id, points):
+        for position, _role, place_id, text, region in points:
+            key = (ride_id, position)
+            if place_id:
+                self._place_postings.setdefault(place_id, set()).add(key)
+            if region:
+                self._region_postings.setdefault(region, set()).add(key)
+            for ngram in _ngrams(text):
+                self._ngram_postings.setdefault(ngram, set()).add(key)
+
+    def _remove_points(self, ride_id, points):
+        for position, _role, place_id, text, region in points:
+            key = (ride_id, position)
+            if place_id:
+                _discard_posting(self._place_postings, place_id, key)
+            if region:
+                _discard_posting(self._region_postings, region, key)
+            for ngram in _ngrams(text):
+                _discard_posting(self._ngram_postings, ngram, key)
+
+    def upsert(self, snapshot):
+        """Vloží nebo nahradí jízdu; neaktivní jízdy z indexu rovnou vyřadí."""
+        with self._lock:
+            self.remove(snapshot["id"])
+            if snapshot["status"] != "aktivni":
+                return
+            self._rides[snapshot["id"]] = snapshot["points"]
+            self._add_points(snapshot["id"], snapshot["points"])
+
+    def remove(self, ride_id):
+        with self._lock:
+            points = self._rides.pop(ride_id, None)
+            if points is not None:
+                self._remove_points(ride_id, points)
+
+    def rebuild(self):
+        """Postaví index znovu z databáze a atomicky nahradí původní obsah."""
+        # Pozice v logu změn se čte před načtením jízd, pozdější změny dorovná `sync`.
+        synchronizovano = utc_now()
+        posledni_zmena_id = db.session.scalar(select(func.max(ZmenaJizdy.id))) or 0
+        fresh = RideSearchEngine()
+        for snapshot in load_active_ride_snapshots():
+            fresh.upsert(snapshot)
+
+        with self._lock:
+            self._rides = fresh._rides
+            self._place_postings = fresh._place_postings
+            self._region_postings = fresh._region_postings
+            self._ngram_postings = fresh._ngram_postings
+            self._posledni_zmena_id = posledni_zmena_id
+            self._synchronizovano = synchronizovano
+        return len(fresh)
+
+    def sync(self):
+        """Dorovná index podle logu změn jízd zapsaných i jinými procesy.
+
+        Změněné jízdy se přenačtou z databáze, takže nezáleží na tom, který worker
+        nebo CLI příkaz změnu udělal. Když proces log nečetl déle, než se drží,
+        postaví index znovu celý. Vrací počet přenačtených jízd.
+        """
+        zacatek = utc_now()
+        with self._lock:
+            posledni_zmena_id = self._posledni_zmena_id
+            synchronizovano = self._synchronizovano
+        if synchronizovano is None or zacatek - synchronizovano > ZMENY_RETENCE - ZMENY_PREKRYV:
+            return self.rebuild()
+
+        zmeny = db.session.execute(
+            select(ZmenaJizdy.id, ZmenaJizdy.jizda_id).where(
+                or_(
+                    ZmenaJizdy.id > posledni_zmena_id,
+                    ZmenaJizdy.vytvoreno >= synchronizovano - ZMENY_PREKRYV,
+                )
+            )
+        ).all()
+        jizda_ids = {jizda_id for _, jizda_id in zmeny}
+        snapshots = {snapshot["id"]: snapshot for snapshot in load_active_ride_snapshots(jizda_ids)}
+
+        with self._lock:
+            for jizda_id in jizda_ids:
+                if jizda_id in snapshots:
+                    self.upsert(snapshots[jizda_id])
+                else:
+                    self.remove(jizda_id)
+            self._posledni_zmena_id = max([posledni_zmena_id, *(zmena_id for zmena_id, _ in zmeny)])
+            self._synchronizovano = zacatek
+        return len(jizda_ids)
+
+    def check_consistency(self):
+        """Porovná index s databází a vrátí ID jízd, které chybí, přebývají nebo se liší."""
+        expected = {snapshot["id"]: snapshot["points"] for snapshot in load_active_ride_snapshots()}
+        with self._lock:
+            actual = dict(self._rides)
+
+        return {
+            "chybejici": sorted(set(expected) - set(actual)),
+            "prebyvajici": sorted(set(actual) - set(expected)),
+            "rozdilne": sorted(
+                ride_id
+                for ride_id in set(expected) & set(actual)
+                if expected[ride_id] != actual[ride_id]
+            ),
+        }
+
+    def _matching_positions(self, query, excluded_role):
+        """Vrátí {ride_id: [pozice]} pro body trasy odpovídající hledanému místu."""
+        query_place_id = query.get("place_id")
+        query_text = None if query_place_id else normalize_search_text(query.get("text"))
+        query_regions = query.get("regions")
+
+        if query_place_id:
+            keys = self._place_postings.get(query_place_id, set())
+        elif not query_text and query_regions:
+            keys = set().union(*(self._region_postings.get(region, set()) for region in query_regions))
+        elif not query_text:
+            return {}
+        elif len(query_text) >= NGRAM_SIZE:
+            postings = sorted(
+                (self._ngram_postings.get(ngram, set()) for ngram in _ngrams(query_text)),
+                key=len,
+            )
+            keys = set.intersection(*postings)
+        else:
+            # Krátký dotaz nemá n-gramy, proto výjimečně projdeme všechny body.
+            keys = {(ride_id, point[0]) for ride_id, points in self._rides.items() for point in points}
+
+        positions = {}
+        for ride_id, position in keys:
+            _position, role, _place_id, text, region = self._rides[ride_id][position]
+            if role == excluded_role:
+                continue
+            if query_regions and region not in query_regions:
+                continue
+            # N-gramy jen zužují kandidáty, skutečnou shodu ověřujeme od začátku slov stejně jako SQL.
+            if query_text and not matches_word_start(text, query_text):
+                continue
+            positions.setdefault(ride_id, []).append(position)
+        return positions
+
+    def match(self, odkud_query, kam_query):
+        """Rozdělí kandidátní jízdy na full a partial match stejně jako SQL vyhledávání."""
+        with self._lock:
+            odkud = self._matching_positions(odkud_query, "kam") if odkud_query else {}
+            kam = self._matching_positions(kam_query, "odkud") if kam_query else {}
+
+        if odkud_query and kam_query:
+            both = set(odkud) & set(kam)
+            full = {ride_id for ride_id in both if min(odkud[ride_id]) < max(kam[ride_id])}
+            return full, set(odkud) ^ set(kam)
+
+        return set(), set(odkud) | set(kam)
+
+
+def _discard_posting(postings, token, key):
+    keys = postings.get(token)
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del postings[token]
+
+
+def load_active_ride_snapshots(jizda_ids=None):
+    query = Jizda.query.filter_by(status="aktivni").options(selectinload(Jizda.mezistanice))
+    if jizda_ids is None:
+        return [snapshot_ride(jizda) for jizda in query.all()]
+
+    jizda_ids = sorted(jizda_ids)
+    snapshots = []
+    for start in range(0, len(jizda_ids), SYNC_BATCH_SIZE):
+        davka = jizda_ids[start:start + SYNC_BATCH_SIZE]
+        snapshots.extend(snapshot_ride(jizda) for jizda in query.filter(Jizda.id.in_(davka)).all())
+    return snapshots
+
+
+def _zaznamenat_zmeny(connection, jizda_ids):
+    """Zapíše změněné jízdy do logu ve stejné transakci, v jaké se mění."""
+    if jizda_ids:
+        vytvoreno = utc_now()
+        connection.execute(
+            ZmenaJizdy.__table__.insert(),
+            [{"jizda_id": jizda_id, "vytvoreno": vytvoreno} for jizda_id in sorted(jizda_ids)],
+        )
+
+
+def smazat_stare_zmeny(now=None):
+    """Smaže log změn starší než ZMENY_RETENCE; vrací počet smazaných záznamů."""
+    now = now or utc_now()
+    result = db.session.execute(delete(ZmenaJizdy).where(ZmenaJizdy.vytvoreno < now - ZMENY_RETENCE))
+    db.session.commit()
+    return result.rowcount
+
+
+def get_ride_search_engine():
+    """Vrátí engine aktuální aplikace, nebo None pokud běží čistě SQL vyhledávání."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get(EXTENSION_KEY)
+
+
+def zaznamenat_zmeny_jizd(jizda_ids):
+    """Zapíše do logu jízdy změněné hromadným SQL, aby je dorovnaly i ostatní procesy."""
+    if get_ride_search_engine() is not None:
+        _zaznamenat_zmeny(db.session.connection(), set(jizda_ids))
+
+
+def track_bulk_ride_changes(snapshots):
+    """Předá enginu jízdy zapsané hromadným SQL mimo unit of work; použije je po commitu."""
+    if get_ride_search_engine() is None:
+        return
+
+    pending = db.session.info.setdefault(_PENDING_KEY, {})
+    for snapshot in snapshots:
+        pending[snapshot["id"]] = snapshot
+    zaznamenat_zmeny_jizd(snapshot["id"] for snapshot in snapshots)
+
+
+def _collect_changed_rides(session, flush_context):
+    engine = get_ride_search_engine()
+    if engine is None:
+        return
+
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    zmenene = set()
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Jizda):
+            zmenene.add(obj.id)
+        elif isinstance(obj, (Mezistanice, BodTrasy)) and obj.jizda_id:
+            zmenene.add(obj.jizda_id)
+    for jizda_id in zmenene:
+        pending.setdefault(jizda_id, None)
+    for obj in session.deleted:
+        if isinstance(obj, Jizda):
+            zmenene.add(obj.id)
+            pending[obj.id] = {"id": obj.id, "status": "smazana", "points": ()}
+    _zaznamenat_zmeny(session.connection(), zmenene)
+
+
+def _snapshot_changed_rides(session, flush_context):
+    pending = session.info.get(_PENDING_KEY)
+    if not pending:
+        return
+
+    # Snapshot děláme ještě uvnitř transakce, po commitu už session nesmí posílat SQL.
+    for ride_id, snapshot in list(pending.items()):
+        if snapshot is not None and snapshot["status"] == "smazana":
+            continue
+        jizda = session.get(Jizda, ride_id)
+        if jizda is not None:
+            pending[ride_id] = snapshot_ride(jizda)
+
+
+def _apply_committed_rides(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    engine = get_ride_search_engine()
+    if not pending or engine is None:
+        return
+
+    for ride_id, snapshot in pending.items():
+        if snapshot is None:
+            continue
+        if snapshot["status"] == "smazana":
+            engine.remove(ride_id)
+        else:
+            engine.upsert(snapshot)
+
+
+def _discard_pending_rides(session, previous_transaction=None):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _register_session_listeners():
+    global _listeners_registered
+    if _listeners_registered:
+        return
+
+    event.listen(Session, "after_flush", _collect_changed_rides)
+    event.listen(Session, "after_flush_postexec", _snapshot_changed_rides)
+    event.listen(Session, "after_commit", _apply_committed_rides)
+    event.listen(Session, "after_rollback", _discard_pending_rides)
+    _listeners_registered = True
+
+
+def _synchronizovat(app, engine, kontrolovat):
+    with app.app_context():
+        try:
+            engine.sync()
+            smazat_stare_zmeny()
+            if kontrolovat:
+                rozdily = engine.check_consistency()
+                if any(rozdily.values()):
+                    app.logger.warning("In-memory index jizd se rozesel s databazi: %s", rozdily)
+                    engine.rebuild()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Synchronizace in-memory indexu jizd selhala")
+        finally:
+            db.session.remove()
+
+
+def init_ride_search_engine(app):
+    """Při RIDE_SEARCH_ENGINE=memory postaví index při startu workeru a zapne jeho průběžné udržování.
+
+    Vlastní commity se do indexu propíší hned, změny z ostatních workerů a CLI
+    příkazů si vlákno dorovná z logu `zmena_jizdy` každých
+    RIDE_SEARCH_SYNC_INTERVAL sekund. Jednou za RIDE_SEARCH_RECONCILE_INTERVAL
+    navíc porovná celý index s databází a při rozdílu ho postaví znovu.
+    Vlákno běží jen při RUN_BACKGROUND_WORKERS.
+    """
+    if app.config.get("RIDE_SEARCH_ENGINE") != "memory":
+        return None
+
+    engine = RideSearchEngine()
+    app.extensions[EXTENSION_KEY] = engine
+    _register_session_listeners()
+
+    with app.app_context():
+        try:
+            engine.rebuild()
+        except Exception:
+            app.logger.exception("Nepodarilo se postavit in-memory index jizd")
+        finally:
+            db.session.remove()
+
+    # Bez vlákna se index drží jen vlastními commity; CLI a testy ho nepotřebují.
+    if app.config.get("TESTING") or not app.config.get("RUN_BACKGROUND_WORKERS"):
+        return engine
+
+    interval = app.config.get("RIDE_SEARCH_SYNC_INTERVAL") or 5
+    reconcile_interval = app.config.get("RIDE_SEARCH_RECONCILE_INTERVAL") or 0
+
+    def run():
+        zkontrolovano = time.monotonic()
+        while not engine.stop_event.wait(interval):
+            kontrolovat = bool(reconcile_interval) and time.monotonic() - zkontrolovano >= reconcile_interval
+            if kontrolovat:
+                zkontrolovano = time.monotonic()
+            _synchronizovat(app, engine, kontrolovat)
+
+    threading.Thread(target=run, name="ride-search-sync", daemon=True).start()
+    return engine
@@ -0,0 +1,148 @@
+from sqlalchemy import and_, false, select, tuple_
+from sqlalchemy.orm import aliased
+
+from models.bod_trasy import BodTrasy
+from models.jizda import Jizda
+from models.slovo_bodu_trasy import SlovoBoduTrasy
+from utils.cities import get_city_region
+from utils.datetime_utils import utc_now
+from utils.text_normalization import normalize_search_text, word_start_suffixes
+
+
+def route_points_for_ride(ride):
+    """Složí celou trasu do pořadí odkud -> mezistanice -> kam pro vyhledávání."""
+    points = [{
+        "role": "odkud",
+        "position": 0,
+        "text": ride.odkud,
+        "place_id": ride.odkud_place_id,
+        "region": get_city_region(ride.odkud_place_id),
+    }]
+
+    stops_sorted = sorted(list(ride.mezistanice), key=lambda m: (m.poradi or 0))
+    for index, stop in enumerate(stops_sorted, start=1):
+        points.append({
+            "role": "mezistanice",
+            "position": index,
+            "text": stop.misto,
+            "place_id": stop.misto_place_id,
+            "region": get_city_region(stop.misto_place_id),
+        })
+
+    points.append({
+        "role": "kam",
+        "position": len(points),
+        "text": ride.kam,
+        "place_id": ride.kam_place_id,
+        "region": get_city_region(ride.kam_place_id),
+    })
+    return points
+
+
+def route_point_values(ride):
+    """Vrátí body trasy jako hodnoty sloupců BodTrasy, použitelné i pro hromadný INSERT."""
+    return [
+        {
+            "poradi": point["position"],
+            "role": point["role"],
+            "place_id": point["place_id"],
+            "normalizovany_text": normalize_search_text(point["text"]),
+            "region": point["region"],
+        }
+        for point in route_points_for_ride(ride)
+    ]
+
+
+def route_point_word_values(body):
+    """Vrátí řádky SlovoBoduTrasy (bez jizda_id) pro text každého bodu od začátku každého slova."""
+    return [
+        {"poradi": bod["poradi"], "normalizovany_text": suffix}
+        for bod in body
+        for suffix in word_start_suffixes(bod["normalizovany_text"])
+    ]
+
+
+def sync_route_points(jizda):
+    """Přepíše uložené body trasy a jejich slova podle aktuálního odkud, mezistanic a kam."""
+    body = route_point_values(jizda)
+    jizda.body_trasy = [BodTrasy(**values) for values in body]
+    jizda.slova_bodu_trasy = [SlovoBoduTrasy(**values) for values in route_point_word_values(body)]
+
+
+def _text_prefix_matches(column, prefix):
+    """Prefixová shoda zapsaná i jako rozsah, aby šla přes B-tree index i bez LIKE optimalizace databáze."""
+    upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(column >= prefix, column < upper_bound, column.startswith(prefix, autoescape=True))
+
+
+def _location_matches(bod, query):
+    """Porovná hledanou lokaci buď přes place_id, nebo fallbackem přes text.
+
+    Text odpovídá, když dotaz začíná na začátku některého slova bodu, takže
+    "budejovice" najde "České Budějovice". Shoda se hledá prefixem nad
+    slovy bodů trasy přes index, ne průchodem všech bodů.
+    """
+    query_place_id = query.get("place_id")
+    if query_place_id:
+        return bod.place_id == query_place_id
+
+    query_text = normalize_search_text(query.get("text"))
+    if not query_text:
+        return None
+    return tuple_(bod.jizda_id, bod.poradi).in_(
+        select(SlovoBoduTrasy.jizda_id, SlovoBoduTrasy.poradi).where(
+            _text_prefix_matches(SlovoBoduTrasy.normalizovany_text, query_text)
+        )
+    )
+
+
+def _point_matches(bod, query):
+    """Spojí shodu lokace s volitelným filtrem regionu; samotný region stačí jako dotaz."""
+    conditions = []
+    location_condition = _location_matches(bod, query)
+    if location_condition is not None:
+        conditions.append(location_condition)
+    if query.get("regions"):
+        conditions.append(bod.region.in_(sorted(query["regions"])))
+
+    if not conditions:
+        return false()
+    return and_(*conditions)
+
+
+def _searchable_ride_conditions():
+    # Vyhledávání vrací jen aktivní budoucí jízdy, body starých jízd tak poddotaz vůbec nečte.
+    return Jizda.status == "aktivni", Jizda.cas_odjezdu > utc_now()
+
+
+def matching_ride_ids(query, *, excluded_role):
+    """Vrátí select ID jízd, jejichž trasa obsahuje hledané místo mimo vyloučenou roli."""
+    return (
+        select(BodTrasy.jizda_id)
+        .join(Jizda, Jizda.id == BodTrasy.jizda_id)
+        .where(*_searchable_ride_conditions())
+        .where(BodTrasy.role != excluded_role)
+        .where(_point_matches(BodTrasy, query))
+    )
+
+
+def ordered_match_ride_ids(odkud_query, kam_query):
+    """Vrátí select ID jízd, kde hledané odkud leží na trase před hledaným kam."""
+    bod_odkud = aliased(BodTrasy)
+    bod_kam = aliased(BodTrasy)
+    return (
+        select(bod_odkud.jizda_id)
+        .join(
+            bod_kam,
+            and_(
+                bod_kam.jizda_id == bod_odkud.jizda_id,
+                bod_kam.poradi > bod_odkud.poradi,
+            ),
+        )
+        .join(Jizda, Jizda.id == bod_odkud.jizda_id)
+        .where(*_searchable_ride_conditions())
+        .where(bod_odkud.role != "kam")
+        .where(bod_kam.role != "odkud")
+        .where(_point_matches(bod_odkud, odkud_query))
+        .where(_point_matches(bod_kam, kam_query))
+    )
@@ -0,0 +1,136 @@
+from sqlalchemy import or_
+
+from models import db
+from models.blokace import Blokace
+from models.ulozene_hledani import UlozeneHledani
+from utils.notifications import vytvorit_oznameni_hromadne
+from utils.route_points import route_point_values
+from utils.text_normalization import matches_word_start, normalize_search_text, word_start_suffixes
+
+
+def _pozice_shody(body, place_id, text, excluded_role):
+    """Pozice bodů trasy, které odpovídají místu stejně jako SQL vyhledávání jízd (text od začátku slov)."""
+    normalized_text = normalize_search_text(text) if not place_id else None
+    if not place_id and not normalized_text:
+        return None
+    return [
+        bod["poradi"]
+        for bod in body
+        if bod["role"] != excluded_role
+        and (bod["place_id"] == place_id if place_id else matches_word_start(bod["normalizovany_text"], normalized_text))
+    ]
+
+
+def hledani_odpovida_trase(hledani, body):
+    """Ověří, že trasa projíždí odkud i kam hledání ve správném pořadí."""
+    odkud = _pozice_shody(body, hledani.odkud_place_id, hledani.odkud, "kam")
+    kam = _pozice_shody(body, hledani.kam_place_id, hledani.kam, "odkud")
+    if odkud is None and kam is None:
+        return False
+    if odkud is None:
+        return bool(kam)
+    if kam is None:
+        return bool(odkud)
+    return any(start < cil for start in odkud for cil in kam)
+
+
+def _textove_prefixy(text):
+    # Textové hledání odpovídá bodu, když jeho text od začátku některého slova začíná hledaným textem.
+    return {suffix[:delka] for suffix in word_start_suffixes(text) for delka in range(1, len(suffix) + 1)}
+
+
+def _kandidatni_hledani(jizdy, body_podle_jizdy):
+    """Kandidáti z indexů podle place_id a normalizovaných textů bodů tras.
+
+    Každé shodné hledání má aspoň jedno vyplněné místo, které odpovídá některému
+    bodu trasy, takže stačí dotaz na rovnost přes indexy místo procházení všech
+    textových hledání v daném období.
+    """
+    odkud_place_ids = set()
+    kam_place_ids = set()
+    odkud_texty = set()
+    kam_texty = set()
+    for body in body_podle_jizdy.values():
+        for bod in body:
+            prefixy = _textove_prefixy(bod["normalizovany_text"])
+            if bod["role"] != "kam":
+                odkud_texty |= prefixy
+            if bod["role"] != "odkud":
+                kam_texty |= prefixy
+            if not bod["place_id"]:
+                continue
+            if bod["role"] != "kam":
+                odkud_place_ids.add(bod["place_id"])
+            if bod["role"] != "odkud":
+                kam_place_ids.add(bod["place_id"])
+
+    dny = [jizda.cas_odjezdu.date() for jizda in jizdy]
+    return UlozeneHledani.query.filter(
+        or_(UlozeneHledani.datum_od.is_(None), UlozeneHledani.datum_od <= max(dny)),
+        or_(UlozeneHledani.datum_do.is_(None), UlozeneHledani.datum_do >= min(dny)),
+        UlozeneHledani.pocet_mist <= max(jizda.get_volna_mista() for jizda in jizdy),
+        or_(
+            UlozeneHledani.odkud_place_id.in_(sorted(odkud_place_ids)),
+            UlozeneHledani.kam_place_id.in_(sorted(kam_place_ids)),
+            UlozeneHledani.odkud_normalizovany.in_(sorted(odkud_texty)),
+            UlozeneHledani.kam_normalizovany.in_(sorted(kam_texty)),
+        ),
+    ).all()
+
+
+def _blokovani_uzivatele(ridic_ids):
+    rows = db.session.query(Blokace.blokujici_id, Blokace.blokovany_id).filter(
+        or_(Blokace.blokujici_id.in_(ridic_ids), Blokace.blokovany_id.in_(ridic_ids))
+    )
+    return {(blokujici, blokovany) for blokujici, blokovany in rows}
+
+
+def upozornit_na_ulozena_hledani(jizdy):
+    """Porovná nové nebo upravené jízdy s uloženými hledáními a založí oznámení.
+
+    Volá se před commitem jízdy, takže oznámení vznikají ve stejné transakci.
+    Každý uživatel dostane k jedné jízdě nejvýš jedno oznámení, i při více
+    shodných hledáních nebo opakované úpravě jízdy. Vrací počet nových oznámení.
+    """
+    jizdy = [jizda for jizda in jizdy if jizda.status == "aktivni"]
+    if not jizdy:
+        return 0
+
+    body_podle_jizdy = {jizda.id: route_point_values(jizda) for jizda in jizdy}
+    kandidati = _kandidatni_hledani(jizdy, body_podle_jizdy)
+    if not kandidati:
+        return 0
+
+    blokace = _blokovani_uzivatele({jizda.ridic_id for jizda in jizdy})
+    zaznamy = {}
+    for jizda in jizdy:
+        den = jizda.cas_odjezdu.date()
+        volna_mista = jizda.get_volna_mista()
+        pasazer_ids = {pasazer.id for pasazer in jizda.pasazeri}
+        for hledani in kandidati:
+            uzivatel_id = hledani.uzivatel_id
+            if (
+                uzivatel_id == jizda.ridic_id
+                or uzivatel_id in pasazer_ids
+                or (uzivatel_id, jizda.id) in zaznamy
+                or (uzivatel_id, jizda.ridic_id) in blokace
+                or (jizda.ridic_id, uzivatel_id) in blokace
+                or (hledani.datum_od and den < hledani.datum_od)
+                or (hledani.datum_do and den > hledani.datum_do)
+                or hledani.pocet_mist > volna_mista
+                or not hledani_odpovida_trase(hledani, body_podle_jizdy[jizda.id])
+            ):
+                continue
+
+            zaznamy[(uzivatel_id, jizda.id)] = {
+                "prijemce_id": uzivatel_id,
+                "odesilatel_id": jizda.ridic_id,
+                "zprava": f"Nová jízda {jizda.odkud} -> {jizda.kam} odpovídá tvému uloženému hledání.",
+                "typ": "ulozene_hledani",
+                "kategorie": "jizdy",
+                "target_path": f"/?focusRide={jizda.id}",
+                "jizda_id": jizda.id,
+                "unikatni_klic": f"ulozene_hledani:{uzivatel_id}:{jizda.id}",
+            }
+
+    return len(vytvorit_oznameni_hromadne(list(zaznamy.values())))
@@ -3,6 +3,7 @@ import unicodedata
 
 
 LOCATION_ALLOWED_RE = re.compile(r"[^A-Za-zÀ-ž0-9\s-]")
+WORD_BOUNDARY_RE = re.compile(r"[ -]")
 
 
 def normalize_search_text(value):
@@ -18,3 +19,20 @@ def sanitize_location_text(value):
     if not isinstance(value, str):
         return ""
     return " ".join(value.strip().split())
+
+
+def word_start_suffixes(normalized_text):
+    """Vrátí text od začátku každého slova: "ceske budejovice" -> ["ceske budejovice", "budejovice"]."""
+    if not normalized_text:
+        return []
+    suffixes = [normalized_text]
+    for boundary in WORD_BOUNDARY_RE.finditer(normalized_text):
+        suffix = normalized_text[boundary.end():]
+        if suffix and not WORD_BOUNDARY_RE.match(suffix):
+            suffixes.append(suffix)
+    return list(dict.fromkeys(suffixes))
+
+
+def matches_word_start(normalized_text, normalized_query):
+    """Textová shoda místa: dotaz začíná na začátku některého slova textu."""
+    return any(suffix.startswith(normalized_query) for suffix in word_start_suffixes(normalized_text))
@@ -0,0 +1,159 @@
+import threading
+from collections import defaultdict
+
+from flask import current_app, has_app_context
+
+from models import db
+from models.jizda import Jizda
+from models.rezervace import Rezervace
+from utils.datetime_utils import utc_now
+from utils.notifications import vytvorit_oznameni_hromadne
+
+
+PROMOTER_EXTENSION_KEY = "waitlist_promoter"
+
+
+class WaitlistPromotionQueue:
+    """Množina jízd s uvolněnými místy; opakované události stejné jízdy se slučují."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._event = threading.Event()
+        self.stop_event = threading.Event()
+
+    def push(self, jizda_ids):
+        with self._lock:
+            self._pending.update(jizda_ids)
+        self._event.set()
+
+    def drain(self):
+        with self._lock:
+            jizda_ids, self._pending = self._pending, set()
+            self._event.clear()
+        return jizda_ids
+
+    def wait(self, timeout=None):
+        return self._event.wait(timeout)
+
+
+def _get_queue():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get(PROMOTER_EXTENSION_KEY)
+
+
+def naplanovat_povyseni(jizda_ids):
+    """Po commitu zařadí jízdy s uvolněnými místy ke zpracování mimo request."""
+    queue = _get_queue()
+    if queue is not None and jizda_ids:
+        queue.push(jizda_ids)
+
+
+def _kandidatni_jizdy_podminka():
+    return (
+        Jizda.status == "aktivni",
+        Jizda.cas_odjezdu > utc_now(),
+        Jizda.obsazena_mista < Jizda.pocet_mist,
+        Jizda.pocet_cekajicich > 0,
+    )
+
+
+def povysit_cekajici(jizda_ids=None):
+    """Projde frontu čekajících rezervací podle `vytvoreno` a přijme ty, které se vejdou.
+
+    Rezervace, která se nevejde, zůstává čekat a pokračuje se další menší.
+    Místa se zabírají atomicky přes `Rezervace.prijmout`, takže souběh s ručním
+    přijetím řidičem kapacitu nepřekročí. Povýšení pasažéři dostanou oznámení
+    jedním hromadným zápisem. Vrací počet povýšených rezervací.
+    """
+    query = Jizda.query.filter(*_kandidatni_jizdy_podminka())
+    if jizda_ids is not None:
+        if not jizda_ids:
+            return 0
+        query = query.filter(Jizda.id.in_(list(jizda_ids)))
+    jizdy = {jizda.id: jizda for jizda in query.all()}
+    if not jizdy:
+        return 0
+
+    fronty = defaultdict(list)
+    for rezervace in (
+        Rezervace.query.filter(Rezervace.jizda_id.in_(list(jizdy)), Rezervace.status == "cekajici")
+        .order_by(Rezervace.jizda_id, Rezervace.vytvoreno, Rezervace.id)
+        .all()
+    ):
+        fronty[rezervace.jizda_id].append(rezervace)
+
+    povysene = []
+    for jizda_id, fronta in fronty.items():
+        jizda = jizdy[jizda_id]
+        for rezervace in fronta:
+            volna_mista = jizda.get_volna_mista()
+            if not volna_mista:
+                break
+            if rezervace.pocet_mist > volna_mista:
+                continue
+            prijato, _ = rezervace.prijmout()
+            if prijato:
+                povysene.append(rezervace)
+
+    vytvorit_oznameni_hromadne([
+        {
+            "prijemce_id": rezervace.uzivatel_id,
+            "zprava": (
+                f"Uvolnilo se místo a tvoje rezervace na jízdu "
+                f"{jizdy[rezervace.jizda_id].odkud} -> {jizdy[rezervace.jizda_id].kam} byla přijata."
+            ),
+            "typ": "rezervace_prijata",
+            "kategorie": "rezervace",
+            "target_path": f"/moje-rezervace?focusReservation={rezervace.id}",
+            "jizda_id": rezervace.jizda_id,
+            "rezervace_id": rezervace.id,
+            "unikatni_klic": f"povyseni:{rezervace.id}",
+        }
+        for rezervace in povysene
+    ])
+    db.session.commit()
+    return len(povysene)
+
+
+def zpracovat_naplanovana_povyseni():
+    """Zpracuje všechny zatím nasbírané jízdy najednou; vrací počet povýšených rezervací."""
+    queue = _get_queue()
+    if queue is None:
+        return 0
+    jizda_ids = queue.drain()
+    if not jizda_ids:
+        return 0
+    return povysit_cekajici(jizda_ids)
+
+
+def init_waitlist_promoter(app):
+    """Založí frontu povýšení a při RUN_BACKGROUND_WORKERS ji zpracovává ve vlákně aplikace.
+
+    Po první události čeká worker WAITLIST_PROMOTION_DELAY sekund, aby více
+    uvolnění míst na stejné jízdě zpracoval jedním průchodem. Ztracené události
+    (např. po restartu) dožene `flask povysit-cekajici`.
+    """
+    queue = WaitlistPromotionQueue()
+    app.extensions[PROMOTER_EXTENSION_KEY] = queue
+    if app.config.get("TESTING") or not app.config.get("RUN_BACKGROUND_WORKERS"):
+        return queue
+
+    delay = app.config.get("WAITLIST_PROMOTION_DELAY") or 0
+
+    def run():
+        while not queue.stop_event.is_set():
+            if not queue.wait(timeout=1) or queue.stop_event.wait(delay):
+                continue
+            with app.app_context():
+                try:
+                    zpracovat_naplanovana_povyseni()
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception("Povyseni cekajicich rezervaci selhalo")
+                finally:
+                    db.session.remove()
+
+    threading.Thread(target=run, name="waitlist-promoter", daemon=True).start()
+    return queue
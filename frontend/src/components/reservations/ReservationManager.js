@@ -25,7 +25,8 @@ const ReservationManager = () => {
             const response = await axios.get('http://localhost:5000/api/rezervace/moje', {
                 headers: { Authorization: `Bearer ${token}` }
             });
-            setRezervace(response.data);
+            const jizdy = response.data?.jizdy || {};
+            setRezervace((response.data?.rezervace || []).map((item) => ({ ...item, jizda: jizdy[item.jizda_id] || null })));
         } catch (err) {
             setError('Chyba při načítání rezervací');
         } finally {
@@ -72,7 +72,7 @@ const LocationAutocompleteInput = ({
 
             try {
                 const response = await axios.get('http://localhost:5000/api/mesta', {
-                    params: { q: normalizedQuery }
+                    params: { q: normalizedQuery, ranked: 1, fuzzy: 1 }
                 });
                 const nextResults = Array.isArray(response.data) ? response.data.slice(0, MAX_RESULTS) : [];
                 setResults(nextResults);
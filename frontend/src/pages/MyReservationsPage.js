@@ -115,7 +115,10 @@ const MyReservationsPage = () => {
     try {
       const response = await axios.get('http://localhost:5000/api/rezervace/moje', { headers });
       const raw = Array.isArray(response.data) ? response.data : response.data?.rezervace || [];
-      const moje = raw.filter((item) => !item.typ || item.typ === 'odeslana');
+      const jizdy = response.data?.jizdy || {};
+      const moje = raw
+        .filter((item) => !item.typ || item.typ === 'odeslana')
+        .map((item) => ({ ...item, jizda: item.jizda || jizdy[item.jizda_id] || null }));
       setRezervace(moje);
     } catch (requestError) {
       setError(TEXT.loadError);